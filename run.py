@@ -1,4 +1,6 @@
 #!/usr/bin/env python3
 import tumpasrc
 
-tumpasrc.main()
+# The guard is needed, the crypto worker process imports this module again
+if __name__ == "__main__":
+    tumpasrc.main()
@@ -21,7 +21,8 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     license="GPLv3+",
-    python_requires=">=3.5",
+    python_requires=">=3.10",
+    install_requires=["johnnycanencrypt>=0.18.0", "cryptography"],
     url="https://github.com/kushaldas/tumpa",
     packages=["tumpasrc", "tumpasrc.resources"],
     include_package_data=True,
@@ -33,5 +34,17 @@ setuptools.setup(
         "Intended Audience :: Developers",
         "Operating System :: OS Independent",
         ],
-    entry_points={"console_scripts": ["tumpa = tumpasrc:main"]},
+    entry_points={
+        "console_scripts": [
+            "tumpa = tumpasrc:main",
+            "tumpa-verify = tumpasrc.verify:main",
+            "tumpa-benchmark = tumpasrc.benchmark:main",
+            "tumpa-wkd = tumpasrc.wkd:main",
+            "tumpa-backup = tumpasrc.backup:main",
+            "tumpa-daemon = tumpasrc.daemon:main",
+            "tumpa-batch = tumpasrc.jobs:main",
+            "tumpa-certify = tumpasrc.certify:main",
+            "tumpa-wot = tumpasrc.wot:main",
+        ]
+    },
 )
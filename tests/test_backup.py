@@ -0,0 +1,122 @@
+import os
+
+import pytest
+
+from tumpasrc.backup import CHUNK_SIZE, BackupError, BackupRepository
+
+
+class Wrapper:
+    "Stands in for the OpenPGP encryption of the data keys, counts the calls"
+
+    def __init__(self):
+        self.encrypted = 0
+        self.decrypted = 0
+
+    def encrypt(self, data):
+        self.encrypted += 1
+        return data[::-1]
+
+    def decrypt(self, data):
+        self.decrypted += 1
+        return data[::-1]
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as fobj:
+        fobj.write(data)
+
+
+def read(path):
+    with open(path, "rb") as fobj:
+        return fobj.read()
+
+
+def open_repository(path, passphrase="secret"):
+    repository = BackupRepository(str(path))
+    repository.unlock(passphrase)
+    return repository
+
+
+@pytest.fixture
+def source(tmp_path):
+    source = tmp_path / "source"
+    write(str(source / "small.txt"), b"hello")
+    write(str(source / "sub" / "big.bin"), os.urandom(CHUNK_SIZE * 2 + 100))
+    return source
+
+
+def test_backup_and_restore(tmp_path, source):
+    repository = open_repository(tmp_path / "repo")
+    wrapper = Wrapper()
+    stats = repository.backup(str(source), wrapper.encrypt)
+    assert stats["files"] == 2
+    # Three chunks for the big file, one for the small one
+    assert stats["new_chunks"] == 4
+    assert wrapper.encrypted == 1
+
+    target = tmp_path / "target"
+    assert repository.restore(str(target), wrapper.decrypt) == 2
+    for name in ("small.txt", os.path.join("sub", "big.bin")):
+        assert read(str(target / name)) == read(str(source / name))
+    assert wrapper.decrypted == 1
+
+
+def test_incremental_backup(tmp_path, source):
+    repository = open_repository(tmp_path / "repo")
+    wrapper = Wrapper()
+    repository.backup(str(source), wrapper.encrypt)
+    stats = repository.backup(str(source), wrapper.encrypt)
+    assert stats["unchanged_files"] == 2
+    assert stats["new_chunks"] == 0
+
+    # Only the changed chunk of the big file is new
+    bigpath = str(source / "sub" / "big.bin")
+    data = bytearray(read(bigpath))
+    data[CHUNK_SIZE + 1] ^= 0xFF
+    write(bigpath, bytes(data))
+    stats = repository.backup(str(source), wrapper.encrypt)
+    assert stats["new_chunks"] == 1
+    assert stats["reused_chunks"] == 2
+    assert len(repository.snapshots()) == 3
+
+    # One data key decryption per backup run which is still in use
+    target = tmp_path / "target"
+    repository.restore(str(target), wrapper.decrypt)
+    assert read(str(target / "sub" / "big.bin")) == bytes(data)
+    assert wrapper.decrypted == 2
+
+    old = tmp_path / "old"
+    repository.restore(str(old), Wrapper().decrypt, repository.snapshots()[0])
+    assert read(str(old / "sub" / "big.bin")) != bytes(data)
+
+
+def test_wrong_passphrase(tmp_path, source):
+    open_repository(tmp_path / "repo").backup(str(source), Wrapper().encrypt)
+    with pytest.raises(BackupError):
+        open_repository(tmp_path / "repo", "other")
+
+
+def test_tampered_blob(tmp_path, source):
+    repository = open_repository(tmp_path / "repo")
+    repository.backup(str(source), Wrapper().encrypt)
+    blobdir = tmp_path / "repo" / "blobs"
+    blobpath = next(path for path in blobdir.rglob("*") if path.is_file())
+    data = bytearray(blobpath.read_bytes())
+    data[-1] ^= 0x01
+    blobpath.write_bytes(bytes(data))
+    with pytest.raises(BackupError):
+        repository.restore(str(tmp_path / "target"), Wrapper().decrypt)
+
+
+def test_wrong_data_key(tmp_path, source):
+    repository = open_repository(tmp_path / "repo")
+    repository.backup(str(source), Wrapper().encrypt)
+    with pytest.raises(BackupError):
+        repository.restore(str(tmp_path / "target"), lambda data: bytes(len(data)))
+
+
+def test_no_snapshot(tmp_path):
+    repository = open_repository(tmp_path / "repo")
+    with pytest.raises(BackupError):
+        repository.restore(str(tmp_path / "target"), Wrapper().decrypt)
@@ -0,0 +1,97 @@
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+
+import pytest
+
+from tumpasrc.daemon import MAX_REQUEST, KeyCache, LookupServer
+
+DATA = os.path.join(os.path.dirname(__file__), "data")
+
+ALICE = "CEBFC3965726737DDDC8C4EFD54390BD13B1E6E5"
+BOB = "1CE2CF5572A4E307AB4C3EBA3C72C12BF5E259EF"
+
+
+@pytest.fixture
+def keystore(tmp_path):
+    path = tmp_path / "keys"
+    path.mkdir()
+    return str(path)
+
+
+@pytest.fixture
+def client(keystore):
+    # Unix socket paths have to be short
+    tmpdir = tempfile.mkdtemp()
+    socket_path = os.path.join(tmpdir, "tumpa.sock")
+    server = LookupServer(socket_path, KeyCache(keystore))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.connect(socket_path)
+    rfile = conn.makefile("rb")
+
+    def request(line: bytes) -> dict:
+        conn.sendall(line + b"\n")
+        return json.loads(rfile.readline())
+
+    yield request
+    rfile.close()
+    conn.close()
+    server.shutdown()
+    server.server_close()
+    shutil.rmtree(tmpdir)
+
+
+def import_keys(keystore, *names):
+    cache = KeyCache(keystore)
+    for name in names:
+        cache.ks.import_key(os.path.join(DATA, name))
+
+
+def test_ping(client):
+    assert client(b"PING") == {"ok": True}
+
+
+def test_empty_keystore(client):
+    assert client(b"KEY a@x.org") == {"ok": False, "error": "No key found."}
+
+
+def test_key(keystore, client):
+    import_keys(keystore, "alice.asc", "bob.asc")
+    reply = client(b"KEY A@X.ORG")
+    assert reply["ok"]
+    assert [key["fingerprint"] for key in reply["keys"]] == [ALICE]
+    assert reply["keys"][0]["emails"] == ["a@x.org"]
+    assert "digest" not in reply["keys"][0]
+    reply = client(("KEY " + BOB[-16:]).encode("ascii"))
+    assert reply["keys"][0]["uids"] == ["B <b@x.org>", "B2 <b2@x.org>"]
+
+
+def test_pubkey(keystore, client):
+    import_keys(keystore, "alice.asc")
+    reply = client(("PUBKEY " + ALICE).encode("ascii"))
+    assert reply["ok"]
+    assert reply["public_keys"][0].startswith("-----BEGIN PGP PUBLIC KEY BLOCK-----")
+
+
+def test_reload(keystore, client):
+    import_keys(keystore, "alice.asc")
+    assert not client(b"KEY b@x.org")["ok"]
+    import_keys(keystore, "bob.asc")
+    assert client(b"KEY b@x.org")["keys"][0]["fingerprint"] == BOB
+
+
+def test_unknown_request(client):
+    assert not client(b"DELETE a@x.org")["ok"]
+    assert not client(b"KEY")["ok"]
+
+
+def test_request_too_long(client):
+    reply = client(b"KEY " + b"a" * (MAX_REQUEST * 3))
+    assert reply == {"ok": False, "error": "Request too long."}
+    # One reply for the whole line, the connection keeps working
+    assert client(b"PING") == {"ok": True}
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from tumpasrc.jobs import Journal, run_job
+
+
+def test_journal_resume(tmp_path):
+    path = str(tmp_path / "job.journal")
+    journal = Journal(path, "export")
+    journal.record("a", 1)
+    journal.record("b", {"path": "b.asc"})
+    started = journal.started
+
+    journal = Journal(path, "export")
+    assert journal.started == started
+    assert journal.done == {"a": 1, "b": {"path": "b.asc"}}
+
+
+def test_journal_torn_line(tmp_path):
+    path = tmp_path / "job.journal"
+    journal = Journal(str(path), "export")
+    journal.record("a", 1)
+    with open(path, "a") as fobj:
+        fobj.write('{"unit": "b", "res')
+
+    journal = Journal(str(path), "export")
+    assert journal.done == {"a": 1}
+    # The torn line is cut off, the next entry starts on its own line
+    journal.record("b", 2)
+    lines = path.read_text().splitlines()
+    assert [json.loads(line) for line in lines[1:]] == [
+        {"unit": "a", "result": 1},
+        {"unit": "b", "result": 2},
+    ]
+    assert Journal(str(path), "export").done == {"a": 1, "b": 2}
+
+
+def test_journal_other_job(tmp_path):
+    path = str(tmp_path / "job.journal")
+    Journal(path, "export")
+    with pytest.raises(ValueError):
+        Journal(path, "generate")
+
+
+def test_journal_remove(tmp_path):
+    path = tmp_path / "job.journal"
+    journal = Journal(str(path), "export")
+    journal.remove()
+    assert not path.exists()
+    journal.remove()
+
+
+def test_run_job_skips_finished_units(tmp_path):
+    path = str(tmp_path / "job.journal")
+    calls = []
+
+    def handler(value):
+        calls.append(value)
+        if value == 3:
+            raise RuntimeError("crash")
+        return value * 10
+
+    units = [("a", 1), ("b", 2), ("c", 3)]
+    with pytest.raises(RuntimeError):
+        run_job(Journal(path, "export"), units, handler)
+    assert calls == [1, 2, 3]
+
+    calls.clear()
+    progress = []
+    results = run_job(
+        Journal(path, "export"),
+        units[:2] + [("c", 4)],
+        handler,
+        lambda unit, count, total, skipped: progress.append((unit, skipped)),
+    )
+    assert calls == [4]
+    assert results == {"a": 10, "b": 20, "c": 40}
+    assert progress == [("a", True), ("b", True), ("c", False)]
@@ -0,0 +1,144 @@
+import os
+
+import pytest
+
+from tumpasrc.packets import (
+    SIGNATURE_PACKET,
+    PacketError,
+    certifications,
+    dearmor,
+    iter_packets,
+    key_signatures,
+    public_keys,
+    signature_issuers,
+)
+
+DATA = os.path.join(os.path.dirname(__file__), "data")
+
+ALICE = "CEBFC3965726737DDDC8C4EFD54390BD13B1E6E5"
+BOB = "1CE2CF5572A4E307AB4C3EBA3C72C12BF5E259EF"
+CAROL = "AD2ADC457BA724BB774127396FEF6B224B63A434"
+
+
+def read(name):
+    with open(os.path.join(DATA, name), "rb") as fobj:
+        return fobj.read()
+
+
+def packet(tag, body):
+    "Encodes a new format packet with a five byte length"
+    return bytes([0xC0 | tag, 255]) + len(body).to_bytes(4, "big") + body
+
+
+def rebuild(data, replace):
+    "Re-encodes the packets, with replace(tag, body) for every body"
+    return b"".join(packet(tag, replace(tag, body)) for tag, body in iter_packets(data))
+
+
+def test_certifications():
+    found = certifications(read("carol.asc"))
+    assert [(c["uid"], c["issuer"]) for c in found] == [
+        ("C <c@x.org>", CAROL),
+        ("C <c@x.org>", BOB),
+    ]
+    self_signature, by_bob = found
+    assert self_signature["flags"] & 0x01
+    assert by_bob["algorithm"] == 1
+    assert by_bob["hash"] == "sha512"
+    assert not by_bob["revocation"]
+
+
+def test_key_signatures():
+    found = key_signatures(read("alice.asc"))
+    assert [(s["issuer"], s["type"]) for s in found] == [(ALICE, 0x1F)]
+
+
+def test_public_keys():
+    keys = public_keys(read("alice.asc"))
+    assert ALICE in keys
+    algorithm, material = keys[ALICE]
+    assert algorithm == 22
+    assert len(material[0]) == 32
+    algorithm, material = public_keys(read("bob.asc"))[BOB]
+    assert algorithm == 1
+    assert len(material[0]) == 256
+
+
+def test_signature_issuers():
+    data = dearmor(read("bob.asc"))
+    signatures = b"".join(
+        packet(tag, body) for tag, body in iter_packets(data) if tag == SIGNATURE_PACKET
+    )
+    issuers = signature_issuers(signatures)
+    assert ALICE in issuers
+    assert BOB in issuers
+
+
+def test_binary_and_armored_are_the_same():
+    armored = read("carol.asc")
+    assert certifications(dearmor(armored)) == certifications(armored)
+
+
+def test_truncated_packet():
+    data = dearmor(read("carol.asc"))
+    for cut in (1, 5, len(data) // 2, len(data) - 1):
+        with pytest.raises(PacketError):
+            list(iter_packets(data[:cut]))
+        with pytest.raises(PacketError):
+            certifications(data[:cut])
+
+
+def test_invalid_packet_header():
+    with pytest.raises(PacketError):
+        list(iter_packets(b"\x00\x01\x02"))
+
+
+def test_partial_body_length():
+    with pytest.raises(PacketError):
+        list(iter_packets(bytes([0xC0 | SIGNATURE_PACKET, 0xE1]) + b"\0" * 2))
+
+
+def test_invalid_armor():
+    data = b"-----BEGIN PGP PUBLIC KEY BLOCK-----\n\n*not base64*\n-----END PGP"
+    with pytest.raises(PacketError):
+        dearmor(data)
+
+
+def test_invalid_subpacket_length():
+    data = dearmor(read("carol.asc"))
+
+    def replace(tag, body):
+        if tag == SIGNATURE_PACKET and body[1] == 0x13:
+            # The first hashed subpacket claims more than the hashed area
+            return body[:6] + b"\xbf" + body[7:]
+        return body
+
+    with pytest.raises(PacketError):
+        certifications(rebuild(data, replace))
+
+
+def test_unknown_critical_subpacket_is_skipped():
+    data = dearmor(read("carol.asc"))
+
+    def replace(tag, body):
+        if tag != SIGNATURE_PACKET or body[1] != 0x13:
+            return body
+        # Mark the first hashed subpacket critical with an unknown type
+        return body[:7] + bytes([0x80 | 100]) + body[8:]
+
+    found = certifications(rebuild(data, replace))
+    assert CAROL not in [c["issuer"] for c in found]
+
+
+def test_wrong_hash_prefix_is_skipped():
+    data = dearmor(read("carol.asc"))
+
+    def replace(tag, body):
+        if tag != SIGNATURE_PACKET or bytes.fromhex(BOB) not in body:
+            return body
+        hashed_end = 6 + int.from_bytes(body[4:6], "big")
+        pos = hashed_end + 2 + int.from_bytes(body[hashed_end : hashed_end + 2], "big")
+        return body[:pos] + bytes([body[pos] ^ 0xFF]) + body[pos + 1 :]
+
+    found = certifications(rebuild(data, replace))
+    assert BOB not in [c["issuer"] for c in found]
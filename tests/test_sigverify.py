@@ -0,0 +1,110 @@
+import os
+
+import pytest
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding, rsa, utils
+
+from tumpasrc.packets import certifications, public_keys
+from tumpasrc.sigverify import verify_certification, verify_ed25519, verify_rsa
+
+DATA = os.path.join(os.path.dirname(__file__), "data")
+
+ALICE = "CEBFC3965726737DDDC8C4EFD54390BD13B1E6E5"
+BOB = "1CE2CF5572A4E307AB4C3EBA3C72C12BF5E259EF"
+
+# RFC 8032 section 7.1, tests 1 to 3: public key, message, signature
+RFC8032_VECTORS = [
+    (
+        "d75a980182b10ab7d54bfed3c964073a0ee172f3daa62325af021a68f707511a",
+        "",
+        "e5564300c360ac729086e2cc806e828a84877f1eb8e5d974d873e06522490155"
+        "5fb8821590a33bacc61e39701cf9b46bd25bf5f0595bbe24655141438e7a100b",
+    ),
+    (
+        "3d4017c3e843895a92b70aa74d1b7ebc9c982ccf2ec4968cc0cd55f12af4660c",
+        "72",
+        "92a009a9f0d4cab8720e820b5f642540a2b27b5416503f8fb3762223ebdb69da"
+        "085ac1e43e15996e458f3613d0f11d8c387b2eaeb4302aeeb00d291612bb0c00",
+    ),
+    (
+        "fc51cd8e6218a1a38da47ed00230f0580816ed13ba3303ac5deb911548908025",
+        "af82",
+        "6291d657deec24024827e69c3abe01a30ce548a284743a445e3680d7db5ac3ac"
+        "18ff9b538d16f290ae67f760984dc6594a7c15e9716ed28dc027beceea1ec40a",
+    ),
+]
+
+
+def read(name):
+    with open(os.path.join(DATA, name), "rb") as fobj:
+        return fobj.read()
+
+
+def certification_by(name, issuer):
+    return next(c for c in certifications(read(name)) if c["issuer"] == issuer)
+
+
+@pytest.mark.parametrize("public,message,signature", RFC8032_VECTORS)
+def test_ed25519_rfc8032(public, message, signature):
+    public = bytes.fromhex(public)
+    message = bytes.fromhex(message)
+    signature = bytes.fromhex(signature)
+    assert verify_ed25519(public, message, signature)
+    assert not verify_ed25519(public, message + b"x", signature)
+    tampered = bytes([signature[0] ^ 1]) + signature[1:]
+    assert not verify_ed25519(public, message, tampered)
+
+
+def test_ed25519_malformed():
+    public, message, signature = (bytes.fromhex(v) for v in RFC8032_VECTORS[1])
+    assert not verify_ed25519(public, message, signature[:63])
+    assert not verify_ed25519(public[:31], message, signature)
+    # S larger than the group order
+    assert not verify_ed25519(public, message, signature[:32] + b"\xff" * 32)
+
+
+def test_rsa_pkcs1v15():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=1024)
+    numbers = key.public_key().public_numbers()
+    modulus = numbers.n.to_bytes(128, "big")
+    exponent = numbers.e.to_bytes(3, "big")
+    # Find a signature with a leading zero byte, the MPI in the packet
+    # drops it
+    for count in range(4096):
+        digest = hashes.Hash(hashes.SHA256())
+        digest.update(count.to_bytes(4, "big"))
+        digest = digest.finalize()
+        signature = key.sign(
+            digest, padding.PKCS1v15(), utils.Prehashed(hashes.SHA256())
+        )
+        if signature[0] == 0:
+            break
+    assert verify_rsa(modulus, exponent, "sha256", digest, signature)
+    assert verify_rsa(modulus, exponent, "sha256", digest, signature.lstrip(b"\0"))
+    assert not verify_rsa(modulus, exponent, "sha512", digest, signature)
+    assert not verify_rsa(modulus, exponent, "md5", digest, signature)
+    assert not verify_rsa(modulus, exponent, "sha256", bytes(32), signature)
+    assert not verify_rsa(modulus, exponent, "sha256", digest, signature + b"\0")
+
+
+def test_certification_vectors():
+    "Certifications made by sequoia, EdDSA from alice and RSA from bob"
+    keys = {}
+    for name in ("alice.asc", "bob.asc"):
+        keys.update(public_keys(read(name)))
+    eddsa = certification_by("bob.asc", ALICE)
+    assert verify_certification(eddsa, *keys[ALICE])
+    rsa_certification = certification_by("carol.asc", BOB)
+    assert verify_certification(rsa_certification, *keys[BOB])
+    # Signed by somebody else
+    assert not verify_certification(eddsa, *keys[BOB])
+    assert not verify_certification(rsa_certification, *keys[ALICE])
+
+
+def test_certification_tampered_digest():
+    keys = public_keys(read("bob.asc"))
+    certification = certification_by("carol.asc", BOB)
+    digest = bytearray.fromhex(certification["digest"])
+    digest[-1] ^= 1
+    certification["digest"] = digest.hex()
+    assert not verify_certification(certification, *keys[BOB])
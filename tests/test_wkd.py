@@ -0,0 +1,29 @@
+import hashlib
+
+from tumpasrc.wkd import ZBASE32_ALPHABET, uid_email, wkd_hash, zbase32
+
+
+def test_zbase32():
+    assert zbase32(b"") == ""
+    assert zbase32(b"\x00") == "yy"
+    assert zbase32(b"\xff") == "9h"
+    assert zbase32(b"\x00" * 5) == "y" * 8
+    assert zbase32(b"\xff" * 5) == "9" * 8
+    # Every 5 bit group maps to its alphabet position
+    assert zbase32(bytes.fromhex("00443214c7")) == ZBASE32_ALPHABET[:8]
+
+
+def test_zbase32_sha1_length():
+    assert len(zbase32(hashlib.sha1(b"").digest())) == 32
+
+
+def test_wkd_hash():
+    # From the Web Key Directory draft, for Joe.Doe@Example.ORG
+    assert wkd_hash("Joe.Doe") == "iy9q119eutrkn8s1mk4r39qejnbu3n5q"
+    assert wkd_hash("joe.doe") == wkd_hash("JOE.DOE")
+
+
+def test_uid_email():
+    assert uid_email({"email": " a@x.org "}) == "a@x.org"
+    assert uid_email({"value": "A <a@x.org>"}) == "a@x.org"
+    assert uid_email({"value": "A"}) == ""
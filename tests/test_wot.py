@@ -0,0 +1,87 @@
+import os
+
+import johnnycanencrypt as jce
+import pytest
+
+from tumpasrc.wot import CACHE_NAME, WebOfTrust, build_graph, update_graph
+
+DATA = os.path.join(os.path.dirname(__file__), "data")
+
+ALICE = "CEBFC3965726737DDDC8C4EFD54390BD13B1E6E5"
+BOB = "1CE2CF5572A4E307AB4C3EBA3C72C12BF5E259EF"
+CAROL = "AD2ADC457BA724BB774127396FEF6B224B63A434"
+
+
+@pytest.fixture
+def ks(tmp_path):
+    ks = jce.KeyStore(str(tmp_path))
+    for name in ("alice.asc", "bob.asc", "carol.asc"):
+        ks.import_key(os.path.join(DATA, name))
+    return ks
+
+
+@pytest.fixture
+def web(ks):
+    web = WebOfTrust()
+    web.sync(ks.get_all_keys())
+    return web
+
+
+def certification(web, target, issuer):
+    return next(
+        c for c in web.records[target]["certifications"] if c["issuer"] == issuer
+    )
+
+
+def test_path(ks):
+    graph = build_graph(ks.get_all_keys())
+    assert graph.shortest_path(ALICE, CAROL) == [ALICE, BOB, CAROL]
+    assert graph.shortest_path(CAROL, ALICE) is None
+
+
+def test_incremental_matches_full(ks):
+    keys = {key.fingerprint: key for key in ks.get_all_keys()}
+    for fingerprint in (CAROL, BOB, ALICE):
+        graph = update_graph(ks.path, [keys[fingerprint]])
+    assert graph.shortest_path(ALICE, CAROL) == [ALICE, BOB, CAROL]
+    web = WebOfTrust(os.path.join(ks.path, CACHE_NAME))
+    assert web.records[CAROL]["certifiers"] == [BOB]
+    assert certification(web, CAROL, BOB)["verified"] == {BOB: True}
+
+
+def test_remove_key(web):
+    web.remove_key(BOB)
+    assert web.graph.shortest_path(ALICE, CAROL) is None
+    assert web.records[CAROL]["certifiers"] == []
+
+
+def test_issuer_without_certify_flag(web):
+    web.records[BOB]["signer"]["certify"] = False
+    web._link(CAROL)
+    assert web.records[CAROL]["certifiers"] == []
+
+
+def test_issuer_expired_or_revoked(web):
+    created = certification(web, CAROL, BOB)["created"]
+    state = web.records[BOB]["signer"]
+    state["expires"] = created
+    web._link(CAROL)
+    assert web.records[CAROL]["certifiers"] == []
+
+    state["expires"] = None
+    # Soft revocation after the certification keeps it
+    state["revoked"] = created + 1
+    web._link(CAROL)
+    assert web.records[CAROL]["certifiers"] == [BOB]
+    # Hard revocation invalidates every certification
+    state["revoked"] = 0
+    web._link(CAROL)
+    assert web.records[CAROL]["certifiers"] == []
+
+
+def test_subkey_issuer(ks, web):
+    bob = ks.get_key(BOB)
+    subkey = bob.othervalues["subkeys_sorted"][0]["fingerprint"].upper()
+    certification(web, CAROL, BOB)["issuer"] = subkey
+    web._link(CAROL)
+    assert web.records[CAROL]["certifiers"] == []
@@ -0,0 +1,409 @@
+import os
+import sys
+import json
+import hmac
+import zlib
+import getpass
+import sqlite3
+import hashlib
+import argparse
+import datetime
+import tempfile
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import johnnycanencrypt as jce
+import johnnycanencrypt.johnnycanencrypt as rjce
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from tumpasrc.configuration import get_keystore_directory
+
+# Fixed size chunks line up with the SQLite pages of the keystore database,
+# so a change in the database only creates a few new chunks.
+CHUNK_SIZE = 64 * 1024
+CACHE_NAME = "cache.json"
+CONFIG_NAME = "config.json"
+# Repository format, bumped when the blobs can not be read by older versions
+VERSION = 2
+# Every blob starts with the data key id and the AES-GCM nonce
+KEY_ID_SIZE = 8
+NONCE_SIZE = 12
+# Associated data of the snapshots, the chunks use their id
+SNAPSHOT_AAD = b"tumpa-backup-snapshot"
+# scrypt parameters for the chunk id key
+SCRYPT_N = 2 ** 15
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+
+class BackupError(Exception):
+    "Raised when a backup repository can not be read or restored"
+
+
+def _walk(source: str) -> Iterator[Tuple[str, str]]:
+    "Yields (relative path, full path) for every file in the source directory"
+    for dirpath, dirnames, filenames in os.walk(source):
+        dirnames.sort()
+        for name in sorted(filenames):
+            fullpath = os.path.join(dirpath, name)
+            yield os.path.relpath(fullpath, source), fullpath
+
+
+def _read_chunks(path: str) -> Iterator[bytes]:
+    with open(path, "rb") as fobj:
+        while True:
+            chunk = fobj.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _write_atomic(path: str, data: bytes):
+    tmppath = path + ".tmp"
+    with open(tmppath, "wb") as fobj:
+        fobj.write(data)
+    os.replace(tmppath, path)
+
+
+class BackupRepository:
+    """
+    A content addressed backup repository. Every file is split in fixed
+    size chunks, each chunk is stored once as blobs/<id>, compressed and
+    encrypted with AES-GCM. A snapshot lists the chunks of every file and
+    is encrypted the same way.
+
+    Every backup run encrypts its new chunks and its snapshot with a fresh
+    data key, which is stored as keys/<key id> encrypted to the OpenPGP
+    backup key. A restore decrypts every data key it needs only once, so
+    restoring with the smartcard takes one card operation per backup run
+    whose chunks are still in use, not one per chunk.
+
+    The chunk ids are HMAC-SHA256 of the chunk, keyed from the backup
+    passphrase, so the blob names do not let anyone confirm guessed
+    content of the keystore.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.blobdir = os.path.join(path, "blobs")
+        self.keydir = os.path.join(path, "keys")
+        self.snapshotdir = os.path.join(path, "snapshots")
+        self.mac_key: Optional[bytes] = None
+
+    def unlock(self, passphrase: str):
+        "Derives the chunk id key, creates the repository configuration if needed"
+        config_path = os.path.join(self.path, CONFIG_NAME)
+        try:
+            with open(config_path) as fobj:
+                config = json.load(fobj)
+        except FileNotFoundError:
+            if os.path.isdir(self.blobdir):
+                raise BackupError("The repository was created by an older version.")
+            config = {"version": VERSION, "salt": os.urandom(16).hex()}
+        if config.get("version") != VERSION:
+            raise BackupError("The repository was created by another version.")
+        key = hashlib.scrypt(
+            passphrase.encode("utf-8"),
+            salt=bytes.fromhex(config["salt"]),
+            n=SCRYPT_N,
+            r=SCRYPT_R,
+            p=SCRYPT_P,
+            maxmem=64 * 1024 * 1024,
+        )
+        check = hmac.new(key, b"tumpa-backup", hashlib.sha256).hexdigest()
+        if "check" not in config:
+            config["check"] = check
+            os.makedirs(self.path, exist_ok=True)
+            _write_atomic(config_path, json.dumps(config).encode("utf-8"))
+        elif not hmac.compare_digest(config["check"], check):
+            raise BackupError("Wrong backup passphrase.")
+        self.mac_key = key
+
+    def _chunk_id(self, chunk: bytes) -> str:
+        if self.mac_key is None:
+            raise BackupError("The repository is not unlocked.")
+        return hmac.new(self.mac_key, chunk, hashlib.sha256).hexdigest()
+
+    def _blobpath(self, digest: str) -> str:
+        return os.path.join(self.blobdir, digest[:2], digest)
+
+    def _load_cache(self) -> Dict[str, dict]:
+        try:
+            with open(os.path.join(self.path, CACHE_NAME)) as fobj:
+                return json.load(fobj)
+        except (OSError, ValueError):
+            return {}
+
+    def snapshots(self) -> List[str]:
+        "Returns the snapshot names, oldest first"
+        if not os.path.isdir(self.snapshotdir):
+            return []
+        return sorted(
+            name[:-5] for name in os.listdir(self.snapshotdir) if name.endswith(".snap")
+        )
+
+    def _new_data_key(self, encrypt: Callable[[bytes], bytes]) -> Tuple[bytes, AESGCM]:
+        """
+        Creates the data key of a backup run and stores it encrypted to the
+        OpenPGP key, returns the key id and the cipher.
+        """
+        data_key = AESGCM.generate_key(bit_length=256)
+        os.makedirs(self.keydir, exist_ok=True)
+        while True:
+            key_id = os.urandom(KEY_ID_SIZE)
+            keypath = os.path.join(self.keydir, key_id.hex())
+            if not os.path.exists(keypath):
+                break
+        _write_atomic(keypath, encrypt(data_key))
+        return key_id, AESGCM(data_key)
+
+    @staticmethod
+    def _seal(key_id: bytes, cipher: AESGCM, data: bytes, aad: bytes) -> bytes:
+        nonce = os.urandom(NONCE_SIZE)
+        return key_id + nonce + cipher.encrypt(nonce, zlib.compress(data), aad)
+
+    def _store_file(self, path: str, key_id: bytes, cipher: AESGCM, stats: dict):
+        "Stores the new chunks of the file, returns the list of chunk digests"
+        chunks = []
+        for chunk in _read_chunks(path):
+            digest = self._chunk_id(chunk)
+            chunks.append(digest)
+            blobpath = self._blobpath(digest)
+            if os.path.exists(blobpath):
+                stats["reused_chunks"] += 1
+                continue
+            os.makedirs(os.path.dirname(blobpath), exist_ok=True)
+            data = self._seal(key_id, cipher, chunk, digest.encode("ascii"))
+            _write_atomic(blobpath, data)
+            stats["new_chunks"] += 1
+            stats["bytes_written"] += len(data)
+        return chunks
+
+    def backup(self, source: str, encrypt: Callable[[bytes], bytes]) -> dict:
+        """
+        Creates a new snapshot of the source directory. Files with the same
+        size and modification time as in the last backup are not read again,
+        and only the chunks which are not in the repository yet get encrypted
+        and written, so the time taken depends on what changed. encrypt
+        encrypts the data key of this run to the OpenPGP key, it gets
+        called once.
+        """
+        os.makedirs(self.snapshotdir, exist_ok=True)
+        key_id, cipher = self._new_data_key(encrypt)
+        cache = self._load_cache()
+        new_cache = {}
+        files = {}
+        stats = {
+            "files": 0,
+            "unchanged_files": 0,
+            "new_chunks": 0,
+            "reused_chunks": 0,
+            "bytes_written": 0,
+        }
+        for relpath, fullpath in _walk(source):
+            st = os.stat(fullpath)
+            stats["files"] += 1
+            cached = cache.get(relpath)
+            if (
+                cached
+                and cached["size"] == st.st_size
+                and cached["mtime_ns"] == st.st_mtime_ns
+                and all(os.path.exists(self._blobpath(d)) for d in cached["chunks"])
+            ):
+                chunks = cached["chunks"]
+                stats["unchanged_files"] += 1
+            elif relpath.endswith(".db"):
+                # Take a consistent copy of the SQLite database first
+                with tempfile.TemporaryDirectory() as tmpdir:
+                    copypath = os.path.join(tmpdir, "copy.db")
+                    src = sqlite3.connect(fullpath)
+                    dst = sqlite3.connect(copypath)
+                    try:
+                        src.backup(dst)
+                    finally:
+                        dst.close()
+                        src.close()
+                    chunks = self._store_file(copypath, key_id, cipher, stats)
+            else:
+                chunks = self._store_file(fullpath, key_id, cipher, stats)
+            files[relpath] = {"mode": st.st_mode & 0o777, "chunks": chunks}
+            new_cache[relpath] = {
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "chunks": chunks,
+            }
+
+        name = datetime.datetime.now().strftime("%Y%m%dT%H%M%S.%f")
+        snapshot = {"created": name, "files": files}
+        data = self._seal(
+            key_id, cipher, json.dumps(snapshot).encode("utf-8"), SNAPSHOT_AAD
+        )
+        name = self._write_snapshot(name, data)
+        _write_atomic(
+            os.path.join(self.path, CACHE_NAME), json.dumps(new_cache).encode("utf-8")
+        )
+        stats["snapshot"] = name
+        return stats
+
+    def _write_snapshot(self, name: str, data: bytes) -> str:
+        "Writes the snapshot under a new name, never replacing one, returns the name"
+        tmppath = os.path.join(self.snapshotdir, name + ".tmp")
+        with open(tmppath, "wb") as fobj:
+            fobj.write(data)
+        try:
+            for count in range(100):
+                final = name if count == 0 else f"{name}-{count}"
+                try:
+                    # Fails if the snapshot exists, unlike os.replace
+                    os.link(tmppath, os.path.join(self.snapshotdir, final + ".snap"))
+                    return final
+                except FileExistsError:
+                    continue
+            raise BackupError(f"Could not find a free name for the snapshot {name}.")
+        finally:
+            os.remove(tmppath)
+
+    def _opener(
+        self, decrypt: Callable[[bytes], bytes]
+    ) -> Callable[[bytes, bytes], bytes]:
+        "Returns a function to open blobs, which decrypts every data key once"
+        ciphers: Dict[bytes, AESGCM] = {}
+
+        def unseal(data: bytes, aad: bytes) -> bytes:
+            key_id = data[:KEY_ID_SIZE]
+            nonce = data[KEY_ID_SIZE : KEY_ID_SIZE + NONCE_SIZE]
+            if key_id not in ciphers:
+                try:
+                    with open(os.path.join(self.keydir, key_id.hex()), "rb") as fobj:
+                        ciphers[key_id] = AESGCM(decrypt(fobj.read()))
+                except FileNotFoundError:
+                    raise BackupError(f"Missing data key {key_id.hex()}.")
+            try:
+                return zlib.decompress(
+                    ciphers[key_id].decrypt(
+                        nonce, data[KEY_ID_SIZE + NONCE_SIZE :], aad
+                    )
+                )
+            except (InvalidTag, zlib.error):
+                raise BackupError("Corrupted or tampered data.")
+
+        return unseal
+
+    def restore(
+        self,
+        target: str,
+        decrypt: Callable[[bytes], bytes],
+        snapshot: Optional[str] = None,
+    ) -> int:
+        """
+        Restores the given (default latest) snapshot into target, returns the
+        number of files. decrypt decrypts a data key with the OpenPGP key, it
+        gets called once per data key.
+        """
+        names = self.snapshots()
+        if not names:
+            raise BackupError("There is no snapshot in the repository.")
+        name = snapshot or names[-1]
+        if name not in names:
+            raise BackupError(f"There is no snapshot named {name}.")
+        unseal = self._opener(decrypt)
+        with open(os.path.join(self.snapshotdir, name + ".snap"), "rb") as fobj:
+            data = json.loads(unseal(fobj.read(), SNAPSHOT_AAD))
+
+        target = os.path.abspath(target)
+        for relpath, entry in data["files"].items():
+            fullpath = os.path.abspath(os.path.join(target, relpath))
+            if os.path.commonpath([target, fullpath]) != target:
+                raise BackupError(f"Invalid path in the snapshot: {relpath}")
+            os.makedirs(os.path.dirname(fullpath), mode=0o700, exist_ok=True)
+            tmppath = fullpath + ".tmp"
+            with open(tmppath, "wb") as fobj:
+                for digest in entry["chunks"]:
+                    with open(self._blobpath(digest), "rb") as blob:
+                        chunk = unseal(blob.read(), digest.encode("ascii"))
+                    if not hmac.compare_digest(self._chunk_id(chunk), digest):
+                        raise BackupError(f"Corrupted chunk {digest} for {relpath}")
+                    fobj.write(chunk)
+            os.chmod(tmppath, entry["mode"])
+            os.replace(tmppath, fullpath)
+        return len(data["files"])
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="tumpa-backup",
+        description="Incremental, compressed and encrypted backup of the keystore.",
+    )
+    parser.add_argument(
+        "--keystore", help="Path to the keystore directory.", default=None
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    backup_parser = subparsers.add_parser("backup", help="Create a new snapshot.")
+    backup_parser.add_argument("repository", help="Backup repository directory.")
+    backup_parser.add_argument(
+        "-k", "--key", required=True, help="Fingerprint of the key to encrypt to."
+    )
+    restore_parser = subparsers.add_parser("restore", help="Restore a snapshot.")
+    restore_parser.add_argument("repository", help="Backup repository directory.")
+    restore_parser.add_argument("target", help="Directory to restore into.")
+    restore_parser.add_argument(
+        "-k", "--key", required=True, help="Fingerprint of the key to decrypt with."
+    )
+    restore_parser.add_argument(
+        "-s", "--snapshot", help="Snapshot to restore (default: latest)."
+    )
+    restore_parser.add_argument(
+        "--card", action="store_true", help="Decrypt using the smartcard."
+    )
+    list_parser = subparsers.add_parser("list", help="List the snapshots.")
+    list_parser.add_argument("repository", help="Backup repository directory.")
+    options = parser.parse_args(args)
+
+    repository = BackupRepository(options.repository)
+    if options.command == "list":
+        for name in repository.snapshots():
+            print(name)
+        return 0
+
+    try:
+        repository.unlock(getpass.getpass("Backup passphrase: "))
+    except BackupError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    keystore_path = options.keystore or get_keystore_directory()
+    ks = jce.KeyStore(keystore_path)
+    key = ks.get_key(options.key)
+    if options.command == "backup":
+        stats = repository.backup(
+            keystore_path, lambda data: ks.encrypt(key, data, armor=False)
+        )
+        print(
+            "Snapshot {snapshot}: {files} files ({unchanged_files} unchanged), "
+            "{new_chunks} new chunks, {reused_chunks} reused, "
+            "{bytes_written} bytes written.".format(**stats)
+        )
+        return 0
+
+    if options.card:
+        pin = getpass.getpass("User pin: ").encode("utf-8")
+
+        def decrypt(data):
+            return rjce.decrypt_bytes_on_card(key.keyvalue, data, pin)
+
+    else:
+        password = getpass.getpass("Key passphrase: ")
+
+        def decrypt(data):
+            return ks.decrypt(key, data, password)
+
+    try:
+        count = repository.restore(options.target, decrypt, options.snapshot)
+    except BackupError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"Restored {count} files.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import sys
+import json
+import time
+import getpass
+import argparse
+import tempfile
+import statistics
+from typing import Callable, List, Optional
+
+import johnnycanencrypt as jce
+import johnnycanencrypt.johnnycanencrypt as rjce
+from tumpasrc.ciphersuites import CIPHERSUITES, ciphersuite_label
+from tumpasrc.configuration import get_keystore_directory
+
+PASSWORD = "tumpa-benchmark"
+UID = "Tumpa Benchmark <benchmark@example.org>"
+# Data to sign and decrypt in every round
+DATA = b"Tumpa benchmark data." * 64
+
+
+def measure(func: Callable, rounds: int) -> float:
+    "Returns the median time in seconds of calling func rounds times"
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def benchmark_software(label: str, cipher, rounds: int, generate_rounds: int) -> dict:
+    "Benchmarks key generation, signing and decryption in software"
+    with tempfile.TemporaryDirectory() as tmpdir:
+        ks = jce.KeyStore(tmpdir)
+        keys = []
+
+        def generate():
+            keys.append(ks.create_key(PASSWORD, [UID], ciphersuite=cipher))
+
+        generation = measure(generate, generate_rounds)
+        key = keys[0]
+        encrypted = ks.encrypt(key, DATA, armor=False)
+        return {
+            "ciphersuite": label,
+            "where": "software",
+            "generate": generation,
+            "sign": measure(lambda: ks.sign_detached(key, DATA, PASSWORD), rounds),
+            "decrypt": measure(lambda: ks.decrypt(key, encrypted, PASSWORD), rounds),
+        }
+
+
+def benchmark_card(ks: jce.KeyStore, key: jce.Key, pin: str, rounds: int) -> dict:
+    """
+    Benchmarks signing and decryption on the smartcard holding the subkeys
+    of key. Only that key's ciphersuite gets measured on the card, other
+    ciphersuites would need their keys uploaded over the ones on the card.
+    """
+    pin_bytes = pin.encode("utf-8")
+    encrypted = ks.encrypt(key, DATA, armor=False)
+    return {
+        "ciphersuite": ciphersuite_label(key),
+        "where": "card",
+        # Keys can not be generated on the card
+        "generate": None,
+        "sign": measure(
+            lambda: rjce.sign_bytes_detached_on_card(key.keyvalue, DATA, pin_bytes),
+            rounds,
+        ),
+        "decrypt": measure(
+            lambda: rjce.decrypt_bytes_on_card(key.keyvalue, encrypted, pin_bytes),
+            rounds,
+        ),
+    }
+
+
+def format_results(results: List[dict]) -> str:
+    "Returns the results as a table with the timings in milliseconds"
+
+    def ms(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value * 1000:.2f}"
+
+    lines = [f"{'Ciphersuite':<42} {'Where':<9} {'Generate':>10} {'Sign':>10} {'Decrypt':>10}"]
+    for result in results:
+        lines.append(
+            f"{result['ciphersuite']:<42} {result['where']:<9} "
+            f"{ms(result['generate']):>10} {ms(result['sign']):>10} {ms(result['decrypt']):>10}"
+        )
+    return "\n".join(lines)
+
+
+def main(args=None):
+    labels = [label for label, _ in CIPHERSUITES]
+    parser = argparse.ArgumentParser(
+        prog="tumpa-benchmark",
+        description="Measures key generation, signing and decryption cost (in ms) for each "
+        "ciphersuite in software, and for the one key on the smartcard.",
+    )
+    parser.add_argument(
+        "-c",
+        "--ciphersuite",
+        action="append",
+        choices=labels,
+        help="Ciphersuite to benchmark, can be given multiple times (default: all).",
+    )
+    parser.add_argument(
+        "-r", "--rounds", type=int, default=10, help="Rounds for sign and decrypt."
+    )
+    parser.add_argument(
+        "--generate-rounds", type=int, default=1, help="Rounds for key generation."
+    )
+    parser.add_argument(
+        "--card-key",
+        help="Fingerprint of the key on the smartcard, to also benchmark on the card; "
+        "this covers only the ciphersuite of that key.",
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="Print the results as JSON."
+    )
+    options = parser.parse_args(args)
+
+    selected = options.ciphersuite or labels
+    results = []
+    for label, cipher in CIPHERSUITES:
+        if label in selected:
+            results.append(
+                benchmark_software(
+                    label, cipher, options.rounds, options.generate_rounds
+                )
+            )
+
+    if options.card_key:
+        if not rjce.is_smartcard_connected():
+            print("No smartcard connected, skipping the card benchmark.", file=sys.stderr)
+        else:
+            ks = jce.KeyStore(get_keystore_directory())
+            key = ks.get_key(options.card_key)
+            pin = getpass.getpass("User pin: ")
+            results.append(benchmark_card(ks, key, pin, options.rounds))
+
+    if options.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(format_results(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
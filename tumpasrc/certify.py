@@ -0,0 +1,261 @@
+import sys
+import time
+import logging
+import sqlite3
+import getpass
+import argparse
+from typing import Callable, Dict, List, Optional, Tuple
+
+import johnnycanencrypt as jce
+import johnnycanencrypt.johnnycanencrypt as rjce
+from tumpasrc.configuration import get_keystore_directory
+from tumpasrc.wkd import uid_email
+from tumpasrc.wot import update_graph
+
+logger = logging.getLogger(__name__)
+
+# Label shown in the UI and the certification level
+CERTIFICATION_TYPES = [
+    ("Generic", jce.SignatureType.GenericCertification),
+    ("Persona", jce.SignatureType.PersonaCertification),
+    ("Casual", jce.SignatureType.CasualCertification),
+    ("Positive", jce.SignatureType.PositiveCertification),
+]
+
+
+class CertificationError(Exception):
+    "Raised when the certification can not even start"
+
+
+def select_uids(key: jce.Key, emails: Optional[List[str]] = None) -> List[str]:
+    "Returns the non revoked UIDs of the key, only those with the given emails"
+    uids = []
+    for uid in key.uids:
+        if uid.get("revoked"):
+            continue
+        if emails and uid_email(uid).lower() not in emails:
+            continue
+        uids.append(uid["value"])
+    return uids
+
+
+def certify_keys(
+    certifier: bytes,
+    targets: List[Tuple[str, bytes, List[str]]],
+    sig_type: jce.SignatureType,
+    pin: str,
+    oncard: bool = True,
+    progress: Optional[Callable[[int, int, str, float], None]] = None,
+) -> Tuple[Dict[str, bytes], Dict[str, str], Dict[str, float]]:
+    """
+    Certifies the given UIDs of every (fingerprint, certificate, uids) target
+    with the certifier key, on the smartcard or with the key passphrase as pin.
+    Returns the certified certificates, the errors and the seconds taken,
+    all keyed by fingerprint.
+
+    If the very first certification fails, nothing is certified yet and the
+    most likely reason is a wrong pin, so we stop instead of using up all the
+    retries of the card.
+    """
+    certified: Dict[str, bytes] = {}
+    errors: Dict[str, str] = {}
+    timings: Dict[str, float] = {}
+    pinbytes = pin.encode("utf-8")
+    for count, (fingerprint, certdata, uids) in enumerate(targets, start=1):
+        start = time.monotonic()
+        try:
+            certdata = rjce.certify_key(
+                certifier, certdata, sig_type.value, uids, pinbytes, oncard
+            )
+        except Exception as e:
+            if not certified:
+                raise CertificationError(f"Failed to certify {fingerprint}: {e}")
+            errors[fingerprint] = str(e)
+        else:
+            certified[fingerprint] = certdata
+        timings[fingerprint] = time.monotonic() - start
+        if progress:
+            progress(count, len(targets), fingerprint, timings[fingerprint])
+    return certified, errors, timings
+
+
+def _timestamp(value) -> str:
+    return str(value.timestamp()) if value else ""
+
+
+def save_certified(
+    ks: jce.KeyStore, keys: List[jce.Key], certified: Dict[str, bytes]
+) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Writes all the certified certificates to the keystore database in one
+    transaction, returns the saved fingerprints and the errors. A
+    certification only adds signatures, so the key rows are updated in
+    place and only the UID certifications get replaced, in the same tables
+    johnnycanencrypt uses. A secret key is never replaced by a certificate
+    without its secret key material.
+    """
+    saved = []
+    errors = {}
+    con = sqlite3.connect(ks.dbpath)
+    try:
+        with con:
+            cursor = con.cursor()
+            for key in keys:
+                cert = certified.get(key.fingerprint)
+                if cert is None:
+                    continue
+                uids, _, secret, *_ = rjce.parse_cert_bytes(cert)
+                if key.keytype == jce.KeyType.SECRET and not secret:
+                    errors[key.fingerprint] = "The certification lost the secret key."
+                    continue
+                cursor.execute(
+                    "SELECT id FROM keys WHERE fingerprint=?", (key.fingerprint,)
+                )
+                key_id = cursor.fetchone()[0]
+                cursor.execute(
+                    "UPDATE keys SET keyvalue=? WHERE id=?", (cert, key_id)
+                )
+                for uid in uids:
+                    cursor.execute(
+                        "SELECT id FROM uidvalues WHERE key_id=? AND value=?",
+                        (key_id, uid["value"]),
+                    )
+                    row = cursor.fetchone()
+                    if row is None:
+                        continue
+                    value_id = row[0]
+                    cursor.execute("DELETE FROM uidcerts WHERE value_id=?", (value_id,))
+                    cursor.execute(
+                        "DELETE FROM uidcertlist WHERE value_id=?", (value_id,)
+                    )
+                    for ucert in uid["certifications"]:
+                        cursor.execute(
+                            "INSERT INTO uidcerts (ctype, creation, key_id, value_id) "
+                            "VALUES (?, ?, ?, ?)",
+                            (
+                                ucert["certification_type"],
+                                _timestamp(ucert["creationtime"]),
+                                key_id,
+                                value_id,
+                            ),
+                        )
+                        cert_id = cursor.lastrowid
+                        for datatype, value in ucert["certification_list"]:
+                            cursor.execute(
+                                "INSERT INTO uidcertlist "
+                                "(value, datatype, key_id, value_id, cert_id) "
+                                "VALUES (?, ?, ?, ?, ?)",
+                                (value, datatype, key_id, value_id, cert_id),
+                            )
+                saved.append(key.fingerprint)
+    finally:
+        con.close()
+    return saved, errors
+
+
+def certify_and_commit(
+    ks: jce.KeyStore,
+    certifier: jce.Key,
+    keys: List[jce.Key],
+    sig_type: jce.SignatureType,
+    pin: str,
+    oncard: bool = True,
+    emails: Optional[List[str]] = None,
+    progress: Optional[Callable[[int, int, str, float], None]] = None,
+) -> Tuple[List[str], Dict[str, str], Dict[str, float]]:
+    """
+    Certifies all the keys and writes them back to the keystore, then
+    updates the cached trust graph for them. Returns the updated
+    fingerprints, the errors and the timings.
+    """
+    targets = []
+    errors = {}
+    for key in keys:
+        uids = select_uids(key, emails)
+        if uids:
+            targets.append((key.fingerprint, key.keyvalue, uids))
+        else:
+            errors[key.fingerprint] = "No matching UID to certify."
+    certified, failed, timings = certify_keys(
+        certifier.keyvalue, targets, sig_type, pin, oncard, progress
+    )
+    errors.update(failed)
+    saved, failed = save_certified(ks, keys, certified)
+    errors.update(failed)
+    try:
+        # The certifier first, it may not be in the cached graph yet
+        update_graph(
+            ks.path, [certifier] + [ks.get_key(fingerprint) for fingerprint in saved]
+        )
+    except OSError:
+        # The certifications are saved, tumpa-wot catches up on its next run
+        logger.warning("Failed to update the trust graph", exc_info=True)
+    return saved, errors, timings
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="tumpa-certify",
+        description="Certify many keys at once, for example after a key signing party.",
+    )
+    parser.add_argument(
+        "--keystore", help="Path to the keystore directory.", default=None
+    )
+    parser.add_argument(
+        "-k", "--key", required=True, help="Fingerprint of the certifying key."
+    )
+    parser.add_argument(
+        "--card", action="store_true", help="Certify using the smartcard."
+    )
+    parser.add_argument(
+        "--type",
+        choices=[label.lower() for label, _ in CERTIFICATION_TYPES],
+        default="generic",
+        help="Certification level.",
+    )
+    parser.add_argument(
+        "--email",
+        action="append",
+        default=[],
+        help="Only certify the UIDs with this email, can be repeated.",
+    )
+    parser.add_argument("fingerprints", nargs="+", help="Keys to certify.")
+    options = parser.parse_args(args)
+
+    ks = jce.KeyStore(options.keystore or get_keystore_directory())
+    certifier = ks.get_key(options.key)
+    keys = [ks.get_key(fingerprint) for fingerprint in options.fingerprints]
+    sig_type = {label.lower(): value for label, value in CERTIFICATION_TYPES}[
+        options.type
+    ]
+    prompt = "User pin: " if options.card else "Key passphrase: "
+    pin = getpass.getpass(prompt)
+
+    def report(count, total, fingerprint, seconds):
+        print(f"[{count}/{total}] {fingerprint}: {seconds:.2f}s")
+
+    start = time.monotonic()
+    try:
+        updated, errors, _ = certify_and_commit(
+            ks,
+            certifier,
+            keys,
+            sig_type,
+            pin,
+            oncard=options.card,
+            emails=[email.lower() for email in options.email],
+            progress=report,
+        )
+    except CertificationError as e:
+        print(e, file=sys.stderr)
+        return 1
+    for fingerprint, error in errors.items():
+        print(f"{fingerprint}: {error}", file=sys.stderr)
+    print(
+        "Certified {} key(s) in {:.2f}s.".format(len(updated), time.monotonic() - start)
+    )
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,26 @@
+import johnnycanencrypt as jce
+import johnnycanencrypt.johnnycanencrypt as rjce
+
+# Label shown in the UI and the johnnycanencrypt ciphersuite
+CIPHERSUITES = [
+    ("Curve25519", jce.Cipher.Cv25519),
+    ("RSA 4096", jce.Cipher.RSA4k),
+    ("RSA 2048", jce.Cipher.RSA2k),
+]
+
+
+def ciphersuite_label(key: jce.Key) -> str:
+    "Returns the ciphersuite label of an existing key, from its primary key algorithm"
+    try:
+        details = rjce.get_key_cipher_details(key.keyvalue)
+    except jce.CryptoError:
+        return "Unknown"
+    for fingerprint, algorithm, bits in details:
+        if fingerprint.upper() != key.fingerprint.upper():
+            continue
+        if algorithm == "EdDSA":
+            return "Curve25519"
+        if algorithm == "RSA":
+            return f"RSA {bits}"
+        return algorithm
+    return "Unknown"
@@ -1,8 +1,14 @@
 import os
 import pathlib
+import logging
 import configparser
+from typing import Tuple
 
 OS_RELEASE = "/etc/os-release"
+DEFAULT_KEYSERVER = "https://keys.openpgp.org"
+DEFAULT_KEYSERVER_PROTOCOL = "vks"
+
+logger = logging.getLogger(__name__)
 
 
 def is_tails() -> bool:
@@ -44,7 +50,7 @@ def get_configuration_file() -> str:
             try:
                 os.mkdir(dirpath, 0o700)
             except Exception as e:
-                print("Failed to create configuration directory {}".format(e))
+                logger.error("Failed to create configuration directory %s", e)
                 return ""
 
     # If the filepath does not exits, means new setup, we will write the default value there.
@@ -64,3 +70,28 @@ def get_keystore_directory() -> str:
     if not os.path.exists(dirpath):
         os.mkdir(dirpath, 0o700)
     return dirpath
+
+
+def get_keyserver() -> Tuple[str, str]:
+    "Returns the keyserver URL and protocol (hkp or vks) from the configuration file"
+    config = configparser.ConfigParser()
+    filepath = get_configuration_file()
+    if filepath:
+        try:
+            config.read(filepath)
+        except configparser.Error as e:
+            logger.error("Failed to read the configuration file %s", e)
+    if not config.has_section("default"):
+        return DEFAULT_KEYSERVER, DEFAULT_KEYSERVER_PROTOCOL
+    section = config["default"]
+    return (
+        section.get("keyserver", DEFAULT_KEYSERVER),
+        section.get("keyserver_protocol", DEFAULT_KEYSERVER_PROTOCOL),
+    )
+
+
+def get_crash_log_file() -> str:
+    "Returns the path where the log buffer gets written on a crash"
+    if has_persistent():
+        return "/home/amnesia/Persistent/tumpa-crash.log"
+    return os.path.join(pathlib.Path.home(), ".config/tumpa-crash.log")
@@ -0,0 +1,123 @@
+import logging
+import itertools
+import multiprocessing
+from typing import Callable, Dict, Optional
+
+from PySide2.QtCore import QObject, Signal, QThread
+
+from tumpasrc.worker import DONE, PROGRESS, serve
+
+logger = logging.getLogger(__name__)
+
+
+class _ReplyThread(QThread):
+    "Reads the replies from the worker process"
+
+    reply = Signal((object,))
+    # Emitted when the worker process dies
+    died = Signal()
+
+    def __init__(self, conn):
+        QThread.__init__(self)
+        self.conn = conn
+
+    def run(self):
+        while True:
+            try:
+                self.reply.emit(self.conn.recv())
+            except (EOFError, OSError):
+                self.died.emit()
+                return
+
+
+class CryptoWorker(QObject):
+    """
+    Runs the johnnycanencrypt key and card operations in a separate process,
+    so that they use another core, keep the secret material out of the GUI
+    process, and a crash in the native code does not take down the GUI.
+
+    The results are delivered asynchronously to the callbacks in the GUI
+    thread, as callback(success, result or error message).
+    """
+
+    def __init__(self, keystore_path: str):
+        super(CryptoWorker, self).__init__()
+        self.keystore_path = keystore_path
+        self.context = multiprocessing.get_context("spawn")
+        self.ids = itertools.count(1)
+        # request id -> (callback, progress callback)
+        self.pending: Dict[int, tuple] = {}
+        self.process = None
+        self.conn = None
+        self.reader = None
+        self.start()
+
+    def start(self):
+        parent_conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(
+            target=serve,
+            args=(child_conn, self.keystore_path),
+            name="tumpa-crypto-worker",
+            # Not a daemon, the expiry and integrity handlers start their own
+            # process pools. The worker exits when the pipe to the GUI closes.
+            daemon=False,
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.reader = _ReplyThread(parent_conn)
+        self.reader.reply.connect(self.on_reply)
+        self.reader.died.connect(self.on_died)
+        self.reader.start()
+
+    def submit(
+        self,
+        operation: str,
+        callback: Callable[[bool, object], None],
+        progress: Optional[Callable[[object], None]] = None,
+        **kwargs,
+    ) -> int:
+        "Sends the request to the worker process, returns the request id"
+        request_id = next(self.ids)
+        self.pending[request_id] = (callback, progress)
+        try:
+            self.conn.send((request_id, operation, kwargs))
+        except (OSError, ValueError) as e:
+            del self.pending[request_id]
+            callback(False, str(e))
+        return request_id
+
+    def on_reply(self, reply):
+        request_id, kind, value = reply
+        if request_id not in self.pending:
+            return
+        callback, progress = self.pending[request_id]
+        if kind == PROGRESS:
+            if progress:
+                progress(value)
+            return
+        del self.pending[request_id]
+        callback(kind == DONE, value)
+
+    def on_died(self):
+        "Fails all the pending requests and starts a new worker process"
+        self.process.join(1)
+        logger.error(
+            "Crypto worker stopped unexpectedly, exit code %s", self.process.exitcode
+        )
+        pending = self.pending
+        self.pending = {}
+        self.conn.close()
+        self.start()
+        for callback, _ in pending.values():
+            callback(False, "The crypto worker stopped unexpectedly.")
+
+    def stop(self):
+        self.reader.died.disconnect(self.on_died)
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
@@ -0,0 +1,246 @@
+import os
+import sys
+import json
+import hashlib
+import logging
+import argparse
+import threading
+import socketserver
+from typing import Dict, List, Optional, Tuple
+
+import johnnycanencrypt as jce
+from tumpasrc.configuration import get_keystore_directory
+from tumpasrc.keyindex import KeyIndex
+from tumpasrc.wkd import uid_email
+
+logger = logging.getLogger(__name__)
+
+SOCKET_NAME = "tumpa.sock"
+# Do not let one client send us an endless line
+MAX_REQUEST = 4096
+
+
+def default_socket_path() -> str:
+    "Returns $XDG_RUNTIME_DIR/tumpa.sock, or the socket in the keystore directory"
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, SOCKET_NAME)
+    return os.path.join(get_keystore_directory(), SOCKET_NAME)
+
+
+class KeyCache:
+    """
+    Keeps the metadata of all the keys in memory, and the armored public keys
+    once they were asked for. The cache gets reloaded when any file in the
+    keystore directory changes; the armored public keys of the unchanged
+    keys are kept.
+    """
+
+    def __init__(self, keystore_path: str):
+        self.keystore_path = keystore_path
+        self.ks = jce.KeyStore(keystore_path)
+        self.lock = threading.Lock()
+        self.state: Optional[Tuple[int, int]] = None
+        self.keys: Dict[str, dict] = {}
+        self.index = KeyIndex()
+        # email -> list of primary fingerprints
+        self.emails: Dict[str, List[str]] = {}
+        # fingerprint -> (hash of the key data, armored public key)
+        self.public_keys: Dict[str, Tuple[str, str]] = {}
+        self.jce_keys: Dict[str, jce.Key] = {}
+
+    def _keystore_state(self) -> Tuple[int, int]:
+        "Returns the latest modification time and the total size of the keystore"
+        mtime = 0
+        size = 0
+        with os.scandir(self.keystore_path) as entries:
+            for entry in entries:
+                if entry.name == SOCKET_NAME or not entry.is_file():
+                    continue
+                st = entry.stat()
+                mtime = max(mtime, st.st_mtime_ns)
+                size += st.st_size
+        return mtime, size
+
+    def _reload(self):
+        keys = {}
+        index = KeyIndex()
+        emails: Dict[str, List[str]] = {}
+        jce_keys = {}
+        try:
+            all_keys = self.ks.get_all_keys()
+        except jce.KeyNotFoundError:
+            # Empty keystore
+            all_keys = []
+        for key in all_keys:
+            jce_keys[key.fingerprint] = key
+            index.add_key(key)
+            addresses = []
+            for uid in key.uids:
+                email = uid_email(uid).lower()
+                if email and not uid.get("revoked"):
+                    addresses.append(email)
+                    emails.setdefault(email, []).append(key.fingerprint)
+            keys[key.fingerprint] = {
+                "fingerprint": key.fingerprint,
+                "uids": [uid["value"] for uid in key.uids],
+                "emails": addresses,
+                "created": key.creationtime.isoformat() if key.creationtime else None,
+                "expires": key.expirationtime.isoformat()
+                if key.expirationtime
+                else None,
+                "digest": hashlib.sha256(key.keyvalue).hexdigest(),
+            }
+        # Armored public keys stay cached only if the key did not change
+        self.public_keys = {
+            fingerprint: value
+            for fingerprint, value in self.public_keys.items()
+            if fingerprint in keys and keys[fingerprint]["digest"] == value[0]
+        }
+        self.keys = keys
+        self.index = index
+        self.emails = emails
+        self.jce_keys = jce_keys
+        logger.info("Loaded %d keys", len(keys))
+
+    def refresh(self):
+        "Reloads the cache if the keystore changed, caller must hold the lock"
+        state = self._keystore_state()
+        if state != self.state:
+            self._reload()
+            self.state = state
+
+    def _find(self, query: str) -> List[str]:
+        "Returns the primary fingerprints for the query, caller must hold the lock"
+        if "@" in query:
+            return list(self.emails.get(query.lower(), []))
+        fingerprint = self.index.lookup(query.replace(" ", ""))
+        return [fingerprint] if fingerprint else []
+
+    def _metadata(self, fingerprint: str) -> dict:
+        "Caller must hold the lock"
+        data = dict(self.keys[fingerprint])
+        del data["digest"]
+        return data
+
+    def _public_key(self, fingerprint: str) -> str:
+        "Caller must hold the lock"
+        digest = self.keys[fingerprint]["digest"]
+        cached = self.public_keys.get(fingerprint)
+        if cached and cached[0] == digest:
+            return cached[1]
+        armored = self.jce_keys[fingerprint].get_pub_key()
+        self.public_keys[fingerprint] = (digest, armored)
+        return armored
+
+    def lookup(self, query: str, public: bool = False) -> list:
+        """
+        Returns the metadata, or the armored public keys, of the keys for a
+        fingerprint, key id or email. Everything is read under one lock, so
+        a reload can not remove the keys between the search and the read.
+        """
+        with self.lock:
+            self.refresh()
+            if public:
+                return [self._public_key(fp) for fp in self._find(query)]
+            return [self._metadata(fp) for fp in self._find(query)]
+
+
+class LookupHandler(socketserver.StreamRequestHandler):
+    """
+    One request per line, one JSON reply per line:
+
+        KEY <fingerprint, key id or email>     the key metadata
+        PUBKEY <fingerprint, key id or email>  the armored public keys
+        PING
+    """
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline(MAX_REQUEST)
+            if not line:
+                return
+            if len(line) == MAX_REQUEST and not line.endswith(b"\n"):
+                # Answer once for the whole line, not for every piece of it
+                if not self.discard_line():
+                    return
+                reply = {"ok": False, "error": "Request too long."}
+            else:
+                try:
+                    reply = self.answer(line.decode("utf-8").strip())
+                except Exception as e:
+                    logger.exception("Failed to answer %r", line)
+                    reply = {"ok": False, "error": str(e)}
+            self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+    def discard_line(self) -> bool:
+        "Reads up to the end of the current line, False if the client went away"
+        while True:
+            rest = self.rfile.readline(MAX_REQUEST)
+            if not rest:
+                return False
+            if rest.endswith(b"\n"):
+                return True
+
+    def answer(self, line: str) -> dict:
+        command, _, query = line.partition(" ")
+        command = command.upper()
+        cache = self.server.cache
+        if command == "PING":
+            return {"ok": True}
+        if command not in ("KEY", "PUBKEY") or not query:
+            return {"ok": False, "error": f"Unknown request: {line}"}
+        results = cache.lookup(query.strip(), public=command == "PUBKEY")
+        if not results:
+            return {"ok": False, "error": "No key found."}
+        if command == "KEY":
+            return {"ok": True, "keys": results}
+        return {"ok": True, "public_keys": results}
+
+
+class LookupServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, cache: KeyCache):
+        self.cache = cache
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        # Only the current user can talk to the socket
+        oldmask = os.umask(0o177)
+        try:
+            super(LookupServer, self).__init__(socket_path, LookupHandler)
+        finally:
+            os.umask(oldmask)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="tumpa-daemon",
+        description="Answers key lookups over a Unix socket from an in-memory cache.",
+    )
+    parser.add_argument("--socket", help="Path of the Unix socket.", default=None)
+    parser.add_argument(
+        "--keystore", help="Path to the keystore directory.", default=None
+    )
+    options = parser.parse_args(args)
+    logging.basicConfig(level=logging.INFO)
+
+    cache = KeyCache(options.keystore or get_keystore_directory())
+    with cache.lock:
+        # Warm up the cache before the first request
+        cache.refresh()
+    socket_path = options.socket or default_socket_path()
+    with LookupServer(socket_path, cache) as server:
+        logger.info("Listening on %s", socket_path)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(socket_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import time
+import sqlite3
+import datetime
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+import johnnycanencrypt as jce
+import johnnycanencrypt.johnnycanencrypt as rjce
+
+
+def subkey_fingerprints(key: jce.Key) -> List[str]:
+    "Returns the fingerprints of all the non revoked subkeys"
+    return [
+        subkey["fingerprint"]
+        for subkey in key.othervalues.get("subkeys_sorted", [])
+        if not subkey.get("revoked")
+    ]
+
+
+def _extend(certdata: bytes, subkeys: List[str], expiration: int, password: str):
+    "Runs in the worker process, returns the updated certificate"
+    # johnnycanencrypt wants the seconds from now, not a timestamp
+    expiration = expiration - int(time.time())
+    certdata = rjce.update_primary_expiry_in_cert(certdata, expiration, password)
+    if subkeys:
+        certdata = rjce.update_subkeys_expiry_in_cert(
+            certdata, subkeys, expiration, password
+        )
+    return certdata
+
+
+def extend_expiry(
+    keys: List[jce.Key],
+    expiration: datetime.datetime,
+    passwords: Dict[str, str],
+    progress: Optional[Callable[[int, int], None]] = None,
+    jobs: Optional[int] = None,
+) -> Tuple[Dict[str, bytes], Dict[str, str]]:
+    """
+    Updates the expiry of the given keys and their subkeys on a process pool.
+    passwords maps the fingerprint to the key passphrase. Returns the updated
+    certificates and the errors, both keyed by fingerprint. Nothing gets
+    written to the keystore, see commit_certificates.
+    """
+    timestamp = int(expiration.timestamp())
+    updated: Dict[str, bytes] = {}
+    errors: Dict[str, str] = {}
+    # Spawned, not forked from the GUI process; the workers only import this
+    # module, which does not pull in Qt
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as executor:
+        futures = {
+            executor.submit(
+                _extend,
+                key.keyvalue,
+                subkey_fingerprints(key),
+                timestamp,
+                passwords[key.fingerprint],
+            ): key.fingerprint
+            for key in keys
+        }
+        for future in as_completed(futures):
+            fingerprint = futures[future]
+            try:
+                updated[fingerprint] = future.result()
+            except Exception as e:
+                errors[fingerprint] = str(e)
+            if progress:
+                progress(len(updated) + len(errors), len(keys))
+    return updated, errors
+
+
+def _timestamp(value: Optional[datetime.datetime]) -> str:
+    "The expiration as johnnycanencrypt stores it in the database"
+    return str(value.timestamp()) if value else ""
+
+
+def commit_certificates(ks: jce.KeyStore, certificates: Dict[str, bytes]) -> List[jce.Key]:
+    """
+    Writes the certificates with updated expiry to the keystore database in
+    one transaction, returns the new keys. Only the certificate and the
+    expiration times change, so this updates the rows in place like
+    johnnycanencrypt does for a single key.
+    """
+    con = sqlite3.connect(ks.dbpath)
+    try:
+        with con:
+            cursor = con.cursor()
+            for fingerprint, certdata in certificates.items():
+                _, _, _, expiration, _, othervalues = rjce.parse_cert_bytes(certdata)
+                cursor.execute(
+                    "UPDATE keys SET keyvalue=?, expiration=? WHERE fingerprint=?",
+                    (certdata, _timestamp(expiration), fingerprint),
+                )
+                for subkey in othervalues["subkeys"]:
+                    cursor.execute(
+                        "UPDATE subkeys SET expiration=? WHERE fingerprint=?",
+                        (_timestamp(subkey[3]), subkey[1]),
+                    )
+    finally:
+        con.close()
+    return [ks.get_key(fingerprint) for fingerprint in certificates]
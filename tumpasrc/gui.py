@@ -0,0 +1,2268 @@
+import io
+import os
+import abc
+import sys
+import time
+import logging
+import datetime
+from PySide2 import QtWidgets
+from PySide2.QtCore import QObject, Signal, QSize, Qt, QThread, QTimer
+from PySide2 import QtGui
+
+import johnnycanencrypt as jce
+import johnnycanencrypt.johnnycanencrypt as rjce
+from tumpasrc.resources import load_icon, load_css
+from tumpasrc.configuration import (
+    get_keystore_directory,
+    get_crash_log_file,
+    get_keyserver,
+)
+from tumpasrc.keyserver import KeyServer
+from tumpasrc.certify import CERTIFICATION_TYPES
+from tumpasrc.integrity import CACHE_NAME as INTEGRITY_CACHE_NAME
+from tumpasrc.ciphersuites import CIPHERSUITES
+from tumpasrc.keyindex import KeyIndex
+from tumpasrc.keydetails import LRUCache, details_text
+from tumpasrc.signing import collect_files, signature_path
+from tumpasrc.cryptoworker import CryptoWorker
+from tumpasrc import logbuffer, watchdog
+
+css = load_css("mainwindow.css")
+logger = logging.getLogger(__name__)
+
+def card_fingerprint(card: dict, slot: str) -> str:
+    "Returns the fingerprint in the given slot (sig_f, enc_f or auth_f) of the card"
+    value = card.get(slot) or ""
+    if isinstance(value, bytes):
+        value = value.hex()
+    # An empty slot is all zeros
+    if not value.strip("0"):
+        return ""
+    return value.upper()
+
+
+def card_name(card: dict) -> str:
+    "Returns the cardholder name as First Middle Last"
+    name = card.get("name") or ""
+    if isinstance(name, bytes):
+        name = name.decode("utf-8", errors="replace")
+    return " ".join(name.split("<<")[::-1]).strip()
+
+
+def pin_retries_text(card: dict) -> str:
+    return "User pin: {}, Reset code: {}, Admin pin: {}".format(
+        card.get("PW1", "?"), card.get("RC", "?"), card.get("PW3", "?")
+    )
+
+
+class HardwareThread(QThread):
+    signal = Signal((bool,))
+    # The card details read once per insertion, None when the card is removed
+    cardsignal = Signal((object,))
+
+    def __init__(self, nextsteps_slot, carddetails_slot=None):
+        QThread.__init__(self)
+        self.flag = True
+        self.connected = False
+        self.stale = False
+        self.signal.connect(nextsteps_slot)
+        if carddetails_slot:
+            self.cardsignal.connect(carddetails_slot)
+
+    def invalidate(self):
+        "Marks the cached card details as stale, they will be read again"
+        self.stale = True
+
+    def run(self):
+        while self.flag:
+            time.sleep(1)
+            result = rjce.is_smartcard_connected()
+            if result and (not self.connected or self.stale):
+                self.stale = False
+                try:
+                    details = rjce.get_card_details()
+                except Exception:
+                    details = None
+                self.cardsignal.emit(details)
+            elif not result and self.connected:
+                self.cardsignal.emit(None)
+            self.connected = result
+            self.signal.emit(result)
+
+
+class PublishKeysThread(QThread):
+    "Publishes public keys to a keyserver away from the GUI thread"
+    # keys done, total keys, fingerprint, error message (empty on success)
+    progress = Signal((int, int, str, str))
+    # number of failed keys
+    done = Signal((int,))
+
+    def __init__(self, url, protocol, keys):
+        QThread.__init__(self)
+        self.url = url
+        self.protocol = protocol
+        self.keys = keys
+
+    def run(self):
+        def report(count, total, fingerprint, error):
+            self.progress.emit(count, total, fingerprint, error or "")
+
+        try:
+            keyserver = KeyServer(self.url, self.protocol)
+            public_keys = [(key.fingerprint, key.get_pub_key()) for key in self.keys]
+            results = keyserver.publish_keys(public_keys, report)
+        except Exception as e:
+            logger.exception("Failed to publish the keys")
+            self.progress.emit(0, len(self.keys), "", str(e))
+            self.done.emit(len(self.keys))
+            return
+        self.done.emit(sum(1 for error in results.values() if error))
+
+
+class PasswordEdit(QtWidgets.QLineEdit):
+    """
+    A LineEdit with icons to show/hide password entries
+    """
+
+    CSS = """QLineEdit {
+        border-radius: 10px;
+        height: 30px;
+        margin: 0px 0px 0px 0px;
+    }
+    """
+
+    def __init__(self):
+        super().__init__()
+
+        # Set styles
+        self.setStyleSheet(self.CSS)
+
+        self.visibleIcon = load_icon("eye_visible.svg")
+        self.hiddenIcon = load_icon("eye_hidden.svg")
+
+        self.setEchoMode(QtWidgets.QLineEdit.Password)
+        self.togglepasswordAction = self.addAction(
+            self.visibleIcon, QtWidgets.QLineEdit.TrailingPosition
+        )
+        self.togglepasswordAction.triggered.connect(self.on_toggle_password_Action)
+        self.password_shown = False
+
+    def on_toggle_password_Action(self):
+        if not self.password_shown:
+            self.setEchoMode(QtWidgets.QLineEdit.Normal)
+            self.password_shown = True
+            self.togglepasswordAction.setIcon(self.hiddenIcon)
+        else:
+            self.setEchoMode(QtWidgets.QLineEdit.Password)
+            self.password_shown = False
+            self.togglepasswordAction.setIcon(self.visibleIcon)
+
+
+class MessageDialogs:
+    """
+    A class that contains dialogue QMessageBoxes for success, error, etc.
+    """
+
+    @classmethod
+    def success_dialog(cls, msg: str):
+        success_dialog = QtWidgets.QMessageBox()
+        success_dialog.setText(f"{msg}")
+        success_dialog.setIcon(QtWidgets.QMessageBox.Information)
+        success_dialog.setWindowTitle("Success")
+        success_dialog.setStyleSheet(css)
+        return success_dialog
+
+    @classmethod
+    def error_dialog(cls, where: str, msg: str):
+        error_dialog = QtWidgets.QMessageBox()
+        error_dialog.setText(msg)
+        error_dialog.setIcon(QtWidgets.QMessageBox.Critical)
+        error_dialog.setWindowTitle(f"Error during {where}")
+        error_dialog.setStyleSheet(css)
+        return error_dialog
+
+
+class SmartCardConfirmationDialog(QtWidgets.QDialog):
+    # passphrase, adminpin
+    writetocard = Signal(
+        (str, str, int),
+    )
+
+    def __init__(
+        self,
+        nextsteps_slot,
+        title="Enter passphrase and pin for the smartcard",
+        firstinput="Key passphrase",
+        key=None,
+        enable_window=None,
+        card=None,
+    ):
+        super(SmartCardConfirmationDialog, self).__init__()
+        self.setModal(True)
+        self.setFixedSize(600, 220)
+        self.setWindowTitle(title)
+        if enable_window:
+            self.rejected.connect(enable_window)
+        layout = QtWidgets.QFormLayout(self)
+        label = QtWidgets.QLabel(firstinput)
+        self.firstinput = firstinput
+        self.key = key
+        self.card = card
+        self.encryptionSubkey = QtWidgets.QCheckBox("Encryption")
+        self.encryptionSubkey.setEnabled(False)
+        self.signingSubkey = QtWidgets.QCheckBox("Signing")
+        self.signingSubkey.setEnabled(False)
+        self.authenticationSubkey = QtWidgets.QCheckBox("Authentication")
+        self.authenticationSubkey.setEnabled(False)
+        self.passphraseEdit = PasswordEdit()
+        layout.addRow(label, self.passphraseEdit)
+        label = QtWidgets.QLabel("Current Admin Pin")
+        self.addminPinEdit = PasswordEdit()
+        layout.addRow(label, self.addminPinEdit)
+        if self.card is not None:
+            layout.addRow(
+                QtWidgets.QLabel("Pin retries left"),
+                QtWidgets.QLabel(pin_retries_text(self.card)),
+            )
+        if self.key is not None:
+            label = QtWidgets.QLabel("Choose subkeys to upload:")
+            inhlayout = QtWidgets.QHBoxLayout()
+            got_enc, got_sign, got_auth = self.key.available_subkeys()
+            inhlayout.addWidget(self.encryptionSubkey)
+            inhlayout.addWidget(self.signingSubkey)
+            inhlayout.addWidget(self.authenticationSubkey)
+
+            if got_enc:
+                self.encryptionSubkey.setCheckState(Qt.Checked)
+                self.encryptionSubkey.setEnabled(True)
+            if got_sign:
+                self.signingSubkey.setCheckState(Qt.Checked)
+                self.signingSubkey.setEnabled(True)
+            if got_auth:
+                self.authenticationSubkey.setCheckState(Qt.Checked)
+                self.authenticationSubkey.setEnabled(True)
+            if any([got_enc, got_auth, got_sign]):  # Means we have at least one subkey
+                widget = QtWidgets.QWidget()
+                widget.setLayout(inhlayout)
+                # Now add in the formlayout
+                layout.addRow(label, widget)
+        widget = QtWidgets.QWidget()
+        widget.setLayout(layout)
+        # now the button
+        self.finalButton = QtWidgets.QPushButton(text="Write to smartcard")
+        self.finalButton.clicked.connect(self.getPassphrases)
+        vboxlayout = QtWidgets.QVBoxLayout()
+        vboxlayout.addWidget(widget)
+        vboxlayout.addWidget(self.finalButton)
+        self.setLayout(vboxlayout)
+        self.writetocard.connect(nextsteps_slot)
+        self.setStyleSheet(css)
+
+    def getPassphrases(self):
+        passphrase = self.passphraseEdit.text().strip()
+        adminpin = self.addminPinEdit.text().strip()
+        if self.card is not None and self.card.get("PW3") == 0:
+            self.error_dialog = MessageDialogs.error_dialog(
+                "Editing smart card details",
+                "Admin pin is blocked, the card must be reset.",
+            )
+            self.error_dialog.show()
+            return
+        if len(adminpin) < 8:
+            self.error_dialog = MessageDialogs.error_dialog(
+                "Editing smart card details", "Admin pin must be 8 character or more."
+            )
+            self.error_dialog.show()
+            return
+        if len(passphrase) < 6:
+            self.error_dialog = MessageDialogs.error_dialog(
+                "Editing smart card details",
+                "{} must be 6 character or more.".format(self.firstinput),
+            )
+            self.error_dialog.show()
+            return
+
+        whichkeys = 0
+        if self.encryptionSubkey.checkState():
+            whichkeys += 1
+        if self.signingSubkey.checkState():
+            whichkeys += 2
+        if self.authenticationSubkey.checkState():
+            whichkeys += 4
+
+        # At least one subkey must be selected
+        if whichkeys == 0:
+            self.error_dialog = MessageDialogs.error_dialog(
+                "Editing smart card details", "At least one subkey must be selected"
+            )
+            self.error_dialog.show()
+            return
+
+        self.hide()
+
+        self.writetocard.emit(passphrase, adminpin, whichkeys)
+
+
+class SmartPinDialog(QtWidgets.QDialog):
+    # passphrase, adminpin
+    writetocard = Signal(
+        (str, str),
+    )
+
+    def __init__(
+        self,
+        nextsteps_slot,
+        title="Change user pin",
+        firstinput="New user pin",
+        enable_window=None,
+        card=None,
+    ):
+        super(SmartPinDialog, self).__init__()
+        self.setModal(True)
+        self.setFixedSize(600, 220)
+        self.setWindowTitle(title)
+        if enable_window:
+            self.rejected.connect(enable_window)
+        layout = QtWidgets.QFormLayout(self)
+        label = QtWidgets.QLabel(firstinput)
+        self.firstinput = firstinput
+        self.card = card
+        self.passphraseEdit = PasswordEdit()
+        layout.addRow(label, self.passphraseEdit)
+        label = QtWidgets.QLabel("Current Admin Pin")
+        self.addminPinEdit = PasswordEdit()
+        layout.addRow(label, self.addminPinEdit)
+        if self.card is not None:
+            layout.addRow(
+                QtWidgets.QLabel("Pin retries left"),
+                QtWidgets.QLabel(pin_retries_text(self.card)),
+            )
+        widget = QtWidgets.QWidget()
+        widget.setLayout(layout)
+        # now the button
+        self.finalButton = QtWidgets.QPushButton(text="Write to smartcard")
+        self.finalButton.clicked.connect(self.getPassphrases)
+        vboxlayout = QtWidgets.QVBoxLayout()
+        vboxlayout.addWidget(widget)
+        vboxlayout.addWidget(self.finalButton)
+        self.setLayout(vboxlayout)
+        self.writetocard.connect(nextsteps_slot)
+        self.setStyleSheet(css)
+
+    def getPassphrases(self):
+        passphrase = self.passphraseEdit.text().strip()
+        adminpin = self.addminPinEdit.text().strip()
+        if self.card is not None and self.card.get("PW3") == 0:
+            self.error_dialog = MessageDialogs.error_dialog(
+                "Editing smart card details",
+                "Admin pin is blocked, the card must be reset.",
+            )
+            self.error_dialog.show()
+            return
+        if len(adminpin) < 8:
+            self.error_dialog = MessageDialogs.error_dialog(
+                "Editing smart card details", "Admin pin must be 8 character or more."
+            )
+            self.error_dialog.show()
+            return
+        if self.firstinput == "New Admin pin" and len(passphrase) < 8:
+            self.error_dialog = MessageDialogs.error_dialog(
+                "Editing smart card details", "Admin pin must be 8 character or more."
+            )
+            self.error_dialog.show()
+            return
+        if len(passphrase) < 6:
+            self.error_dialog = MessageDialogs.error_dialog(
+                "Editing smart card details",
+                "{} must be 6 character or more.".format(self.firstinput),
+            )
+            self.error_dialog.show()
+            return
+
+        self.hide()
+
+        self.writetocard.emit(passphrase, adminpin)
+
+
+class SmartCardTextDialog(QtWidgets.QDialog):
+    # Public URL and Name
+    writetocard = Signal(
+        (str, str),
+    )
+
+    CSS = """QLineEdit {
+        border-radius: 10px;
+        height: 30px;
+        margin: 0px 0px 0px 0px;
+    }
+    """
+
+    def __init__(
+        self,
+        nextsteps_slot,
+        title="Enter public URL",
+        textInput="Public URL",
+        enable_window=None,
+        card=None,
+        value="",
+    ):
+        super(SmartCardTextDialog, self).__init__()
+        self.setModal(True)
+        self.setFixedSize(600, 200)
+        self.setWindowTitle(title)
+        if enable_window:
+            self.rejected.connect(enable_window)
+        layout = QtWidgets.QFormLayout(self)
+        label = QtWidgets.QLabel(textInput)
+        self.textInput = textInput
+        self.card = card
+        # Pre-filled with the current value on the card
+        self.textField = QtWidgets.QLineEdit(value)
+        self.textField.setStyleSheet(self.CSS)
+        layout.addRow(label, self.textField)
+        label = QtWidgets.QLabel("Admin Pin")
+        self.adminPinEdit = PasswordEdit()
+        layout.addRow(label, self.adminPinEdit)
+        if self.card is not None:
+            layout.addRow(
+                QtWidgets.QLabel("Pin retries left"),
+                QtWidgets.QLabel(pin_retries_text(self.card)),
+            )
+        widget = QtWidgets.QWidget()
+        widget.setLayout(layout)
+        # now the button
+        self.finalButton = QtWidgets.QPushButton(text="Write to smartcard")
+        self.finalButton.clicked.connect(self.getTextValue)
+        vboxlayout = QtWidgets.QVBoxLayout()
+        vboxlayout.addWidget(widget)
+        vboxlayout.addWidget(self.finalButton)
+        self.setLayout(vboxlayout)
+        self.writetocard.connect(nextsteps_slot)
+        self.setStyleSheet(css)
+
+    def getTextValue(self):
+        text = self.textField.text().strip()
+        adminpin = self.adminPinEdit.text().strip()
+        if self.card is not None and self.card.get("PW3") == 0:
+            self.error_dialog = MessageDialogs.error_dialog(
+                "Editing smart card details",
+                "Admin pin is blocked, the card must be reset.",
+            )
+            self.error_dialog.show()
+            return
+        if len(adminpin) < 8:
+            self.error_dialog = MessageDialogs.error_dialog(
+                "Editing smart card details", "Admin pin must be 8 character or more."
+            )
+            self.error_dialog.show()
+            return
+        if len(text) > 35:
+            self.error_dialog = MessageDialogs.error_dialog(
+                "Editing smart card details",
+                "{} must be less than 35 characters.".format(self.textInput),
+            )
+            self.error_dialog.show()
+            return
+        if not len(text):
+            self.error_dialog = MessageDialogs.error_dialog(
+                "Editing smart card details",
+                "{} cannot be blank.".format(self.textInput),
+            )
+            self.error_dialog.show()
+            return
+
+        self.hide()
+        self.writetocard.emit(text, adminpin)
+
+
+class NewKeyDialog(QtWidgets.QDialog):
+    update_ui = Signal((jce.Key,))
+    disable_button = Signal()
+    enable_button = Signal()
+
+    def __init__(
+        self,
+        ks: jce.KeyStore,
+        crypto: CryptoWorker,
+        newkey_slot,
+        disable_slot,
+        enable_slot,
+        enable_window=None,
+    ):
+        super(NewKeyDialog, self).__init__()
+        self.setModal(True)
+        self.update_ui.connect(newkey_slot)
+        self.disable_button.connect(disable_slot)
+        self.enable_button.connect(enable_slot)
+        self.ks = ks  # jce.KeyStore
+        self.crypto = crypto
+        self.setFixedSize(QSize(800, 600))
+        vboxlayout = QtWidgets.QVBoxLayout()
+        name_label = QtWidgets.QLabel("Your name:")
+        self.name_box = QtWidgets.QLineEdit("")
+        if enable_window:
+            self.rejected.connect(enable_window)
+
+        vboxlayout.addWidget(name_label)
+        vboxlayout.addWidget(self.name_box)
+
+        email_label = QtWidgets.QLabel("Email addresses (one email per line)")
+        self.email_box = QtWidgets.QPlainTextEdit()
+        self.email_box.setTabChangesFocus(True)
+
+        vboxlayout.addWidget(email_label)
+        vboxlayout.addWidget(self.email_box)
+        passphrase_label = QtWidgets.QLabel(
+            "Key Passphrase (recommended: 12+ chars in length):"
+        )
+        self.passphrase_box = PasswordEdit()
+
+        vboxlayout.addWidget(passphrase_label)
+        vboxlayout.addWidget(self.passphrase_box)
+
+        ciphersuite_label = QtWidgets.QLabel("Ciphersuite:")
+        self.ciphersuite_box = QtWidgets.QComboBox()
+        for label, _ in CIPHERSUITES:
+            self.ciphersuite_box.addItem(label)
+        vboxlayout.addWidget(ciphersuite_label)
+        vboxlayout.addWidget(self.ciphersuite_box)
+
+        # now the checkboxes for subkey
+        self.encryptionSubkey = QtWidgets.QCheckBox("Encryption subkey")
+        self.encryptionSubkey.setCheckState(Qt.Checked)
+        self.signingSubkey = QtWidgets.QCheckBox("Signing subkey")
+        self.signingSubkey.setCheckState(Qt.Checked)
+        self.authenticationSubkey = QtWidgets.QCheckBox("Authentication subkey")
+
+        hboxlayout = QtWidgets.QHBoxLayout()
+        hboxlayout.addWidget(self.encryptionSubkey)
+        hboxlayout.addWidget(self.signingSubkey)
+        hboxlayout.addWidget(self.authenticationSubkey)
+
+        widget = QtWidgets.QWidget()
+        widget.setLayout(hboxlayout)
+        vboxlayout.addWidget(widget)
+
+        self.generateButton = QtWidgets.QPushButton("Generate")
+        self.generateButton.clicked.connect(self.generate)
+        self.generateButton.setMaximumWidth(50)
+        vboxlayout.addWidget(self.generateButton)
+
+        self.setLayout(vboxlayout)
+        self.setWindowTitle("Generate a new OpenPGP key")
+        self.setStyleSheet(css)
+
+    def generate(self):
+        self.generateButton.setEnabled(False)
+        emails = self.email_box.toPlainText()
+        name = self.name_box.text().strip()
+        password = self.passphrase_box.text().strip()
+
+        if not len(name):
+            self.error_dialog = MessageDialogs.error_dialog(
+                "generating new key", "Name cannot be blank."
+            )
+            self.error_dialog.show()
+            self.generateButton.setEnabled(True)
+            return
+
+        if not len(emails):
+            self.error_dialog = MessageDialogs.error_dialog(
+                "generating new key", "There must be at least one email."
+            )
+            self.error_dialog.show()
+            self.generateButton.setEnabled(True)
+            return
+
+        if not len(password):
+            self.error_dialog = MessageDialogs.error_dialog(
+                "generating new key", "Key passphrase cannot be blank."
+            )
+            self.error_dialog.show()
+            self.generateButton.setEnabled(True)
+            return
+
+        if len(password) < 6:
+            self.error_dialog = MessageDialogs.error_dialog(
+                "generating new key",
+                "Key Passphrase must be at least 6 characters long.",
+            )
+            self.error_dialog.show()
+            self.generateButton.setEnabled(True)
+            return
+
+        # Now check which all subkeys are required
+        whichkeys = 0
+        if self.encryptionSubkey.checkState():
+            whichkeys += 1
+        if self.signingSubkey.checkState():
+            whichkeys += 2
+        if self.authenticationSubkey.checkState():
+            whichkeys += 4
+
+        # At least one subkey must be selected
+        if whichkeys == 0:
+            self.error_dialog = MessageDialogs.error_dialog(
+                "Generating new key", "At least one subkey must be selected"
+            )
+            self.error_dialog.show()
+            return
+
+        uids = []
+        for email in emails.split("\n"):
+            value = f"{name} <{email}>"
+            uids.append(value)
+        edate = datetime.datetime.now() + datetime.timedelta(days=3 * 365)
+        self.disable_button.emit()
+        # To make sure that the Generate button is disabled first
+        self.generateButton.setEnabled(False)
+        self.update()
+        self.repaint()
+        _, ciphersuite = CIPHERSUITES[self.ciphersuite_box.currentIndex()]
+        # Now let us try to create a key in the crypto worker process
+        self.crypto.submit(
+            "generate",
+            self.on_generated,
+            password=password,
+            uids=uids,
+            ciphersuite=ciphersuite,
+            expiration=edate,
+            whichkeys=whichkeys,
+        )
+
+    def on_generated(self, success, result):
+        "Gets the fingerprint of the new key, or the error, from the crypto worker"
+        if not success:
+            self.enable_button.emit()
+            self.generateButton.setEnabled(True)
+            self.error_dialog = MessageDialogs.error_dialog(
+                "generating new key", result
+            )
+            self.error_dialog.show()
+            return
+        newk = self.ks.get_key(result)
+        self.update_ui.emit(newk)
+        self.hide()
+        self.enable_button.emit()
+        self.success_dialog = MessageDialogs.success_dialog(
+            "Generated keys successfully!"
+        )
+        self.success_dialog.show()
+
+
+def confirm_overwrite(parent, outputpaths) -> bool:
+    "Asks before replacing any existing output file"
+    existing = [path for path in outputpaths if os.path.exists(path)]
+    if not existing:
+        return True
+    reply = QtWidgets.QMessageBox.question(
+        parent,
+        "Overwrite files?",
+        "These files already exist and will be overwritten:\n{}".format(
+            "\n".join(existing)
+        ),
+    )
+    return reply == QtWidgets.QMessageBox.StandardButton.Yes
+
+
+class QABCMeta(type(QtWidgets.QDialog), abc.ABCMeta):
+    "Metaclass for the Qt widgets with abstract methods"
+
+
+class BusyDialog(QtWidgets.QDialog):
+    """
+    Dialog which can not be closed while its worker is running, so that the
+    main window and the smartcard polling only come back after the worker
+    replied.
+    """
+
+    def __init__(self):
+        super(BusyDialog, self).__init__()
+        self.busy = False
+
+    def reject(self):
+        "Escape and the close button end up here"
+        if self.busy:
+            return
+        super(BusyDialog, self).reject()
+
+
+class FileCryptoDialog(BusyDialog, metaclass=QABCMeta):
+    """
+    Base dialog to choose files and show the progress of the encryption or
+    decryption running in the crypto worker.
+    """
+
+    def __init__(
+        self, ks: jce.KeyStore, crypto: CryptoWorker, title: str, enable_window=None
+    ):
+        super(FileCryptoDialog, self).__init__()
+        self.setModal(True)
+        self.setMinimumWidth(600)
+        self.setWindowTitle(title)
+        if enable_window:
+            self.rejected.connect(enable_window)
+        self.ks = ks
+        self.crypto = crypto
+        self.enable_window = enable_window
+        self.filepaths = []
+        self.total_bytes = 0
+        self.done_bytes = 0
+        self.done_files = 0
+        self.current_output = ""
+        self.current_size = 0
+        self.start_time = 0.0
+
+        self.vboxlayout = QtWidgets.QVBoxLayout()
+        self.filesButton = QtWidgets.QPushButton(text="Select files")
+        self.filesButton.clicked.connect(self.select_files)
+        self.files_label = QtWidgets.QLabel("No file selected.")
+        self.files_label.setWordWrap(True)
+        self.progressbar = QtWidgets.QProgressBar()
+        self.progressbar.setRange(0, 1000)
+        self.progressbar.setValue(0)
+        self.speed_label = QtWidgets.QLabel("")
+        self.finalButton = QtWidgets.QPushButton(text="Start")
+        self.finalButton.clicked.connect(self.start)
+
+        # To poll the size of the file being written by the worker
+        self.timer = QTimer(self)
+        self.timer.setInterval(250)
+        self.timer.timeout.connect(self.update_progress)
+        self.setStyleSheet(css)
+
+    def finish_layout(self):
+        "Adds the common widgets at the bottom of the dialog"
+        self.vboxlayout.addWidget(self.filesButton)
+        self.vboxlayout.addWidget(self.files_label)
+        self.vboxlayout.addWidget(self.progressbar)
+        self.vboxlayout.addWidget(self.speed_label)
+        self.vboxlayout.addWidget(self.finalButton)
+        self.setLayout(self.vboxlayout)
+
+    def select_files(self):
+        filepaths, _ = QtWidgets.QFileDialog.getOpenFileNames(
+            self, "Select files", "."
+        )
+        if filepaths:
+            self.filepaths = filepaths
+            self.files_label.setText("\n".join(filepaths))
+
+    @abc.abstractmethod
+    def output_path(self, inputpath: str) -> str:
+        "Returns the output file path for the given input file"
+
+    @abc.abstractmethod
+    def worker_arguments(self):
+        "Returns the keyword arguments for the crypto worker, or None on error"
+
+    def start(self):
+        if not self.filepaths:
+            self.error_dialog = MessageDialogs.error_dialog(
+                self.windowTitle(), "Please select at least one file."
+            )
+            self.error_dialog.show()
+            return
+        jobs = [(path, self.output_path(path)) for path in self.filepaths]
+        if not confirm_overwrite(self, [outputpath for _, outputpath in jobs]):
+            return
+        kwargs = self.worker_arguments()
+        if kwargs is None:
+            return
+        self.total_bytes = sum(os.path.getsize(path) for path in self.filepaths)
+        self.done_bytes = 0
+        self.done_files = 0
+        self.busy = True
+        self.finalButton.setEnabled(False)
+        self.filesButton.setEnabled(False)
+        self.start_time = time.monotonic()
+        self.timer.start()
+        self.crypto.submit(
+            "file_crypto", self.on_done, progress=self.on_progress, jobs=jobs, **kwargs
+        )
+
+    def on_progress(self, value):
+        "Gets the started and finished reports of every file from the crypto worker"
+        if value[0] == "started":
+            _, inputpath, outputpath = value
+            self.current_output = outputpath
+            self.current_size = os.path.getsize(inputpath)
+        else:
+            _, inputpath, outputpath, size, seconds = value
+            self.done_bytes += size
+            self.done_files += 1
+            self.current_output = ""
+            self.update_progress()
+
+    def on_done(self, success, result):
+        "Gets the result of the whole job from the crypto worker"
+        self.busy = False
+        self.timer.stop()
+        if not success:
+            self.error_dialog = MessageDialogs.error_dialog(self.windowTitle(), result)
+            self.error_dialog.show()
+            self.finalButton.setEnabled(True)
+            self.filesButton.setEnabled(True)
+            return
+        self.hide()
+        if self.enable_window:
+            self.enable_window()
+        self.success_dialog = MessageDialogs.success_dialog(
+            "Processed {} file(s) successfully.".format(len(self.filepaths))
+        )
+        self.success_dialog.show()
+
+    def update_progress(self):
+        "Updates the progress bar and the throughput from the bytes written so far"
+        done = self.done_bytes
+        if self.current_output and os.path.exists(self.current_output):
+            # The output grows as the worker streams through the input file
+            done += min(os.path.getsize(self.current_output), self.current_size)
+        if self.total_bytes:
+            self.progressbar.setValue(int(done * 1000 / self.total_bytes))
+        elapsed = time.monotonic() - self.start_time
+        if elapsed > 0:
+            speed = done / elapsed / (1024 * 1024)
+            self.speed_label.setText(f"{speed:.2f} MiB/s")
+
+
+class EncryptFileDialog(FileCryptoDialog):
+    def __init__(self, ks: jce.KeyStore, crypto: CryptoWorker, enable_window=None):
+        super(EncryptFileDialog, self).__init__(
+            ks, crypto, "Encrypt files", enable_window=enable_window
+        )
+        label = QtWidgets.QLabel("Select the recipients:")
+        self.recipients = QtWidgets.QListWidget()
+        for key in ks.get_all_keys():
+            uids = ", ".join(uid["value"] for uid in key.uids)
+            item = QtWidgets.QListWidgetItem(f"{key.fingerprint}\n{uids}")
+            item.setData(Qt.UserRole, key.fingerprint)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Unchecked)
+            self.recipients.addItem(item)
+        self.vboxlayout.addWidget(label)
+        self.vboxlayout.addWidget(self.recipients)
+        self.finalButton.setText("Encrypt")
+        self.finish_layout()
+
+    def output_path(self, inputpath: str) -> str:
+        return inputpath + ".gpg"
+
+    def worker_arguments(self):
+        recipients = []
+        for row in range(self.recipients.count()):
+            item = self.recipients.item(row)
+            if item.checkState() == Qt.Checked:
+                recipients.append(item.data(Qt.UserRole))
+        if not recipients:
+            self.error_dialog = MessageDialogs.error_dialog(
+                "encrypting files", "Please select at least one recipient."
+            )
+            self.error_dialog.show()
+            return None
+        return {"recipients": recipients}
+
+
+class DecryptFileDialog(FileCryptoDialog):
+    def __init__(
+        self, ks: jce.KeyStore, key: jce.Key, crypto: CryptoWorker, enable_window=None
+    ):
+        super(DecryptFileDialog, self).__init__(
+            ks, crypto, "Decrypt files", enable_window=enable_window
+        )
+        self.key = key
+        layout = QtWidgets.QFormLayout()
+        layout.addRow(QtWidgets.QLabel("Key"), QtWidgets.QLabel(key.fingerprint))
+        self.passphraseEdit = PasswordEdit()
+        layout.addRow(QtWidgets.QLabel("Key passphrase"), self.passphraseEdit)
+        widget = QtWidgets.QWidget()
+        widget.setLayout(layout)
+        self.vboxlayout.addWidget(widget)
+        self.finalButton.setText("Decrypt")
+        self.finish_layout()
+
+    def output_path(self, inputpath: str) -> str:
+        root, ext = os.path.splitext(inputpath)
+        if ext in (".gpg", ".asc", ".pgp"):
+            return root
+        return inputpath + ".decrypted"
+
+    def worker_arguments(self):
+        passphrase = self.passphraseEdit.text().strip()
+        if not len(passphrase):
+            self.error_dialog = MessageDialogs.error_dialog(
+                "decrypting files", "Key passphrase cannot be blank."
+            )
+            self.error_dialog.show()
+            return None
+        return {"fingerprint": self.key.fingerprint, "password": passphrase}
+
+
+class SignFilesDialog(BusyDialog):
+    "Dialog to create detached signatures of many files using the smartcard"
+
+    def __init__(
+        self, key: jce.Key, crypto: CryptoWorker, enable_window=None, card=None
+    ):
+        super(SignFilesDialog, self).__init__()
+        self.setModal(True)
+        self.setMinimumWidth(600)
+        self.setWindowTitle("Sign files using the smartcard")
+        if enable_window:
+            self.rejected.connect(enable_window)
+        self.enable_window = enable_window
+        self.key = key
+        self.crypto = crypto
+        self.card = card
+        self.paths = []
+
+        layout = QtWidgets.QFormLayout()
+        layout.addRow(QtWidgets.QLabel("Key"), QtWidgets.QLabel(key.fingerprint))
+        self.pinEdit = PasswordEdit()
+        layout.addRow(QtWidgets.QLabel("User pin"), self.pinEdit)
+        if self.card is not None:
+            layout.addRow(
+                QtWidgets.QLabel("Pin retries left"),
+                QtWidgets.QLabel(pin_retries_text(self.card)),
+            )
+        widget = QtWidgets.QWidget()
+        widget.setLayout(layout)
+
+        self.filesButton = QtWidgets.QPushButton(text="Select files")
+        self.filesButton.clicked.connect(self.select_files)
+        self.directoryButton = QtWidgets.QPushButton(text="Select directory")
+        self.directoryButton.clicked.connect(self.select_directory)
+        hlayout = QtWidgets.QHBoxLayout()
+        hlayout.addWidget(self.filesButton)
+        hlayout.addWidget(self.directoryButton)
+        buttons = QtWidgets.QWidget()
+        buttons.setLayout(hlayout)
+
+        self.files_label = QtWidgets.QLabel("No file selected.")
+        self.files_label.setWordWrap(True)
+        self.progressbar = QtWidgets.QProgressBar()
+        self.speed_label = QtWidgets.QLabel("")
+        self.finalButton = QtWidgets.QPushButton(text="Sign")
+        self.finalButton.clicked.connect(self.start)
+
+        vboxlayout = QtWidgets.QVBoxLayout()
+        vboxlayout.addWidget(widget)
+        vboxlayout.addWidget(buttons)
+        vboxlayout.addWidget(self.files_label)
+        vboxlayout.addWidget(self.progressbar)
+        vboxlayout.addWidget(self.speed_label)
+        vboxlayout.addWidget(self.finalButton)
+        self.setLayout(vboxlayout)
+        self.setStyleSheet(css)
+
+    def set_paths(self, paths):
+        self.paths = collect_files(paths)
+        self.files_label.setText("{} file(s) selected.".format(len(self.paths)))
+
+    def select_files(self):
+        filepaths, _ = QtWidgets.QFileDialog.getOpenFileNames(
+            self, "Select files to sign", "."
+        )
+        if filepaths:
+            self.set_paths(filepaths)
+
+    def select_directory(self):
+        select_path = QtWidgets.QFileDialog.getExistingDirectory(
+            self,
+            "Select directory to sign",
+            ".",
+            QtWidgets.QFileDialog.ShowDirsOnly,
+        )
+        if select_path:
+            self.set_paths([select_path])
+
+    def start(self):
+        pin = self.pinEdit.text().strip()
+        if self.card is not None and self.card.get("PW1") == 0:
+            self.error_dialog = MessageDialogs.error_dialog(
+                "signing files", "User pin is blocked, use the admin pin to reset it."
+            )
+            self.error_dialog.show()
+            return
+        if len(pin) < 6:
+            self.error_dialog = MessageDialogs.error_dialog(
+                "signing files", "User pin must be 6 character or more."
+            )
+            self.error_dialog.show()
+            return
+        if not self.paths:
+            self.error_dialog = MessageDialogs.error_dialog(
+                "signing files", "Please select at least one file."
+            )
+            self.error_dialog.show()
+            return
+        if not confirm_overwrite(self, [signature_path(path) for path in self.paths]):
+            return
+        self.progressbar.setRange(0, len(self.paths))
+        self.progressbar.setValue(0)
+        self.busy = True
+        self.finalButton.setEnabled(False)
+        self.crypto.submit(
+            "sign",
+            self.on_done,
+            progress=self.on_progress,
+            fingerprint=self.key.fingerprint,
+            filepaths=self.paths,
+            pin=pin,
+        )
+
+    def on_progress(self, value):
+        count, total, rate = value
+        self.progressbar.setValue(count)
+        self.speed_label.setText(f"{count}/{total} files, {rate:.2f} files/s")
+
+    def on_done(self, success, result):
+        self.busy = False
+        if not success:
+            self.on_failed(result)
+            return
+        rate = result
+        self.hide()
+        if self.enable_window:
+            self.enable_window()
+        self.success_dialog = MessageDialogs.success_dialog(
+            f"Signed {len(self.paths)} file(s) at {rate:.2f} files/s."
+        )
+        self.success_dialog.show()
+
+    def on_failed(self, msg):
+        self.error_dialog = MessageDialogs.error_dialog("signing files", msg)
+        self.error_dialog.show()
+        self.finalButton.setEnabled(True)
+
+
+class CertifyKeysDialog(BusyDialog):
+    "Dialog to certify many keys using the smartcard, after a key signing party"
+    # fingerprints of the certified keys
+    keys_updated = Signal((list,))
+
+    def __init__(
+        self,
+        ks: jce.KeyStore,
+        key: jce.Key,
+        crypto: CryptoWorker,
+        keys_updated_slot,
+        enable_window=None,
+        card=None,
+    ):
+        super(CertifyKeysDialog, self).__init__()
+        self.setModal(True)
+        self.setMinimumWidth(600)
+        self.setWindowTitle("Certify keys using the smartcard")
+        if enable_window:
+            self.rejected.connect(enable_window)
+        self.enable_window = enable_window
+        self.keys_updated.connect(keys_updated_slot)
+        self.key = key
+        self.crypto = crypto
+        self.card = card
+
+        layout = QtWidgets.QFormLayout()
+        layout.addRow(QtWidgets.QLabel("Key"), QtWidgets.QLabel(key.fingerprint))
+        self.typeBox = QtWidgets.QComboBox()
+        for label, _ in CERTIFICATION_TYPES:
+            self.typeBox.addItem(label)
+        layout.addRow(QtWidgets.QLabel("Certification"), self.typeBox)
+        self.pinEdit = PasswordEdit()
+        layout.addRow(QtWidgets.QLabel("User pin"), self.pinEdit)
+        if self.card is not None:
+            layout.addRow(
+                QtWidgets.QLabel("Pin retries left"),
+                QtWidgets.QLabel(pin_retries_text(self.card)),
+            )
+        widget = QtWidgets.QWidget()
+        widget.setLayout(layout)
+
+        # All the other keys, checked ones get certified
+        self.keysList = QtWidgets.QListWidget()
+        for otherkey in ks.get_all_keys():
+            if otherkey.fingerprint == key.fingerprint:
+                continue
+            uids = ", ".join(uid["value"] for uid in otherkey.uids)
+            item = QtWidgets.QListWidgetItem(f"{otherkey.fingerprint}\n{uids}")
+            item.setData(Qt.UserRole, otherkey.fingerprint)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Unchecked)
+            self.keysList.addItem(item)
+
+        self.progressbar = QtWidgets.QProgressBar()
+        self.timings = QtWidgets.QPlainTextEdit()
+        self.timings.setReadOnly(True)
+        self.timings.setMaximumHeight(120)
+        self.finalButton = QtWidgets.QPushButton(text="Certify")
+        self.finalButton.clicked.connect(self.start)
+
+        vboxlayout = QtWidgets.QVBoxLayout()
+        vboxlayout.addWidget(widget)
+        vboxlayout.addWidget(
+            QtWidgets.QLabel("Keys to certify, all their UIDs get certified")
+        )
+        vboxlayout.addWidget(self.keysList)
+        vboxlayout.addWidget(self.progressbar)
+        vboxlayout.addWidget(self.timings)
+        vboxlayout.addWidget(self.finalButton)
+        self.setLayout(vboxlayout)
+        self.setStyleSheet(css)
+
+    def selected_fingerprints(self):
+        fingerprints = []
+        for row in range(self.keysList.count()):
+            item = self.keysList.item(row)
+            if item.checkState() == Qt.Checked:
+                fingerprints.append(item.data(Qt.UserRole))
+        return fingerprints
+
+    def start(self):
+        pin = self.pinEdit.text().strip()
+        fingerprints = self.selected_fingerprints()
+        if self.card is not None and self.card.get("PW1") == 0:
+            self.error_dialog = MessageDialogs.error_dialog(
+                "certifying keys",
+                "User pin is blocked, use the admin pin to reset it.",
+            )
+            self.error_dialog.show()
+            return
+        if len(pin) < 6:
+            self.error_dialog = MessageDialogs.error_dialog(
+                "certifying keys", "User pin must be 6 character or more."
+            )
+            self.error_dialog.show()
+            return
+        if not fingerprints:
+            self.error_dialog = MessageDialogs.error_dialog(
+                "certifying keys", "Please select at least one key."
+            )
+            self.error_dialog.show()
+            return
+        self.progressbar.setRange(0, len(fingerprints))
+        self.progressbar.setValue(0)
+        self.timings.clear()
+        self.busy = True
+        self.finalButton.setEnabled(False)
+        self.crypto.submit(
+            "certify",
+            self.on_done,
+            progress=self.on_progress,
+            fingerprint=self.key.fingerprint,
+            fingerprints=fingerprints,
+            sig_type=CERTIFICATION_TYPES[self.typeBox.currentIndex()][1],
+            pin=pin,
+        )
+
+    def on_progress(self, value):
+        count, total, fingerprint, seconds = value
+        self.progressbar.setValue(count)
+        self.timings.appendPlainText(f"{fingerprint}: {seconds:.2f}s")
+
+    def on_done(self, success, result):
+        self.busy = False
+        if not success:
+            self.on_failed(result)
+            return
+        updated, errors, timings = result
+        self.keys_updated.emit(updated)
+        if errors:
+            msg = "\n".join(f"{fp}: {error}" for fp, error in errors.items())
+            self.on_failed(msg)
+            return
+        self.hide()
+        if self.enable_window:
+            self.enable_window()
+        self.success_dialog = MessageDialogs.success_dialog(
+            "Certified {} key(s) in {:.2f}s.".format(
+                len(updated), sum(timings.values())
+            )
+        )
+        self.success_dialog.show()
+
+    def on_failed(self, msg):
+        self.error_dialog = MessageDialogs.error_dialog("certifying keys", msg)
+        self.error_dialog.show()
+        self.finalButton.setEnabled(True)
+
+
+class PublishKeysDialog(QtWidgets.QDialog):
+    "Dialog to publish the selected or all the public keys to a keyserver"
+
+    def __init__(self, ks: jce.KeyStore, selected_key=None, enable_window=None):
+        super(PublishKeysDialog, self).__init__()
+        self.setModal(True)
+        self.setMinimumWidth(600)
+        self.setWindowTitle("Publish public keys")
+        if enable_window:
+            self.rejected.connect(enable_window)
+        self.enable_window = enable_window
+        self.ks = ks
+        self.selected_key = selected_key
+        self.worker = None
+        self.errors = []
+
+        url, protocol = get_keyserver()
+        layout = QtWidgets.QFormLayout()
+        self.urlEdit = QtWidgets.QLineEdit(url)
+        layout.addRow(QtWidgets.QLabel("Keyserver"), self.urlEdit)
+        self.protocolBox = QtWidgets.QComboBox()
+        self.protocolBox.addItems(["vks", "hkp"])
+        self.protocolBox.setCurrentText(protocol)
+        layout.addRow(QtWidgets.QLabel("Protocol"), self.protocolBox)
+        widget = QtWidgets.QWidget()
+        widget.setLayout(layout)
+
+        self.selectedRadio = QtWidgets.QRadioButton("Selected key")
+        self.allRadio = QtWidgets.QRadioButton("All keys")
+        if selected_key is not None:
+            self.selectedRadio.setChecked(True)
+        else:
+            self.selectedRadio.setEnabled(False)
+            self.allRadio.setChecked(True)
+        hlayout = QtWidgets.QHBoxLayout()
+        hlayout.addWidget(self.selectedRadio)
+        hlayout.addWidget(self.allRadio)
+        radios = QtWidgets.QWidget()
+        radios.setLayout(hlayout)
+
+        self.progressbar = QtWidgets.QProgressBar()
+        self.status_label = QtWidgets.QLabel("")
+        self.finalButton = QtWidgets.QPushButton(text="Publish")
+        self.finalButton.clicked.connect(self.start)
+
+        vboxlayout = QtWidgets.QVBoxLayout()
+        vboxlayout.addWidget(widget)
+        vboxlayout.addWidget(radios)
+        vboxlayout.addWidget(self.progressbar)
+        vboxlayout.addWidget(self.status_label)
+        vboxlayout.addWidget(self.finalButton)
+        self.setLayout(vboxlayout)
+        self.setStyleSheet(css)
+
+    def start(self):
+        url = self.urlEdit.text().strip()
+        if not url:
+            self.error_dialog = MessageDialogs.error_dialog(
+                "publishing keys", "Keyserver cannot be blank."
+            )
+            self.error_dialog.show()
+            return
+        if self.selectedRadio.isChecked():
+            keys = [self.selected_key]
+        else:
+            keys = self.ks.get_all_keys()
+        self.errors = []
+        self.progressbar.setRange(0, len(keys))
+        self.progressbar.setValue(0)
+        self.finalButton.setEnabled(False)
+        self.worker = PublishKeysThread(url, self.protocolBox.currentText(), keys)
+        self.worker.progress.connect(self.on_progress)
+        self.worker.done.connect(self.on_done)
+        self.worker.start()
+
+    def on_progress(self, count, total, fingerprint, error):
+        self.progressbar.setValue(count)
+        self.status_label.setText(f"Published {count}/{total} keys.")
+        if error:
+            self.errors.append(f"{fingerprint}: {error}")
+
+    def on_done(self, failed):
+        self.finalButton.setEnabled(True)
+        if failed:
+            self.error_dialog = MessageDialogs.error_dialog(
+                "publishing keys", "\n".join(self.errors)
+            )
+            self.error_dialog.show()
+            return
+        self.hide()
+        if self.enable_window:
+            self.enable_window()
+        self.success_dialog = MessageDialogs.success_dialog(
+            "Published public keys successfully."
+        )
+        self.success_dialog.show()
+
+
+class ExtendExpiryDialog(BusyDialog):
+    "Dialog to extend the expiry of many keys and their subkeys at once"
+    # fingerprints of the updated keys
+    keys_updated = Signal((list,))
+
+    def __init__(
+        self,
+        ks: jce.KeyStore,
+        keys,
+        crypto: CryptoWorker,
+        keys_updated_slot,
+        enable_window=None,
+    ):
+        super(ExtendExpiryDialog, self).__init__()
+        self.setModal(True)
+        self.setMinimumWidth(600)
+        self.setWindowTitle("Extend expiry")
+        if enable_window:
+            self.rejected.connect(enable_window)
+        self.enable_window = enable_window
+        self.keys_updated.connect(keys_updated_slot)
+        self.ks = ks
+        self.crypto = crypto
+        # Keys still waiting for the update
+        self.keys = keys
+
+        self.keys_label = QtWidgets.QLabel("")
+        self.update_keys_label()
+        layout = QtWidgets.QFormLayout()
+        self.yearsBox = QtWidgets.QSpinBox()
+        self.yearsBox.setRange(1, 10)
+        self.yearsBox.setValue(3)
+        self.yearsBox.setSuffix(" years from today")
+        layout.addRow(QtWidgets.QLabel("New expiry"), self.yearsBox)
+        self.passphraseEdit = PasswordEdit()
+        layout.addRow(QtWidgets.QLabel("Key passphrase"), self.passphraseEdit)
+        widget = QtWidgets.QWidget()
+        widget.setLayout(layout)
+
+        self.progressbar = QtWidgets.QProgressBar()
+        self.finalButton = QtWidgets.QPushButton(text="Extend expiry")
+        self.finalButton.clicked.connect(self.start)
+
+        vboxlayout = QtWidgets.QVBoxLayout()
+        vboxlayout.addWidget(self.keys_label)
+        vboxlayout.addWidget(widget)
+        vboxlayout.addWidget(self.progressbar)
+        vboxlayout.addWidget(self.finalButton)
+        self.setLayout(vboxlayout)
+        self.setStyleSheet(css)
+
+    def update_keys_label(self):
+        self.keys_label.setText(
+            "The passphrase will be used for {} key(s):\n{}".format(
+                len(self.keys), "\n".join(key.fingerprint for key in self.keys)
+            )
+        )
+
+    def start(self):
+        passphrase = self.passphraseEdit.text().strip()
+        if not len(passphrase):
+            self.error_dialog = MessageDialogs.error_dialog(
+                "extending expiry", "Key passphrase cannot be blank."
+            )
+            self.error_dialog.show()
+            return
+        expiration = datetime.datetime.now() + datetime.timedelta(
+            days=self.yearsBox.value() * 365
+        )
+        self.progressbar.setRange(0, len(self.keys))
+        self.progressbar.setValue(0)
+        self.finalButton.setEnabled(False)
+        self.busy = True
+        self.crypto.submit(
+            "extend_expiry",
+            self.on_done,
+            progress=self.on_progress,
+            fingerprints=[key.fingerprint for key in self.keys],
+            expiration=expiration,
+            password=passphrase,
+        )
+
+    def on_progress(self, value):
+        count, total = value
+        self.progressbar.setValue(count)
+
+    def on_done(self, success, result):
+        "Gets the updated fingerprints and the errors from the crypto worker"
+        self.busy = False
+        self.finalButton.setEnabled(True)
+        if success:
+            updated, errors = result
+        else:
+            logger.error("Failed to extend the expiry: %s", result)
+            updated, errors = [], {key.fingerprint: result for key in self.keys}
+        if updated:
+            self.keys_updated.emit(updated)
+        if errors:
+            # Ask again only for the keys which failed, most likely they
+            # have a different passphrase.
+            self.keys = [key for key in self.keys if key.fingerprint in errors]
+            self.update_keys_label()
+            self.passphraseEdit.clear()
+            self.error_dialog = MessageDialogs.error_dialog(
+                "extending expiry",
+                "\n".join(f"{fp}: {msg}" for fp, msg in errors.items()),
+            )
+            self.error_dialog.show()
+            return
+        self.hide()
+        if self.enable_window:
+            self.enable_window()
+        self.success_dialog = MessageDialogs.success_dialog(
+            "Extended the expiry of {} key(s) successfully.".format(len(updated))
+        )
+        self.success_dialog.show()
+
+
+class CardPanel(QtWidgets.QGroupBox):
+    "Shows the cached details of the connected smartcard"
+
+    def __init__(self):
+        super(CardPanel, self).__init__()
+        self.setObjectName("CardPanel")
+        self.details_label = QtWidgets.QLabel("No smartcard connected.")
+        self.details_label.setObjectName("card_details")
+        self.details_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        layout = QtWidgets.QVBoxLayout()
+        layout.addWidget(self.details_label)
+        self.setLayout(layout)
+
+    def update_details(self, card):
+        if card is None:
+            self.details_label.setText("No smartcard connected.")
+            return
+        lines = [
+            "Serial number: {}".format(card.get("serial_number", "")),
+            "Cardholder: {}".format(card_name(card)),
+            "Public URL: {}".format(card.get("url") or ""),
+            "Signature key: {}".format(card_fingerprint(card, "sig_f")),
+            "Encryption key: {}".format(card_fingerprint(card, "enc_f")),
+            "Authentication key: {}".format(card_fingerprint(card, "auth_f")),
+            "Retries left: {}".format(pin_retries_text(card)),
+        ]
+        self.details_label.setText("\n".join(lines))
+
+
+class KeyDetailsPanel(QtWidgets.QGroupBox):
+    "Shows the subkeys and the public key of the selected key"
+
+    def __init__(self):
+        super(KeyDetailsPanel, self).__init__()
+        self.setObjectName("KeyDetailsPanel")
+        self.details_label = QtWidgets.QLabel("No key selected.")
+        self.details_label.setObjectName("key_details")
+        self.details_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.public_key_edit = QtWidgets.QPlainTextEdit()
+        self.public_key_edit.setObjectName("public_key")
+        self.public_key_edit.setReadOnly(True)
+        self.public_key_edit.setMaximumHeight(80)
+        layout = QtWidgets.QVBoxLayout()
+        layout.addWidget(self.details_label)
+        layout.addWidget(self.public_key_edit)
+        self.setLayout(layout)
+
+    def update_details(self, fingerprint, details):
+        if not fingerprint:
+            self.details_label.setText("No key selected.")
+            self.public_key_edit.clear()
+        elif details is None:
+            self.details_label.setText("Loading the key details...")
+            self.public_key_edit.clear()
+        elif "error" in details:
+            self.details_label.setText(
+                "Failed to read the key details: {}".format(details["error"])
+            )
+            self.public_key_edit.clear()
+        else:
+            self.details_label.setText(details_text(details))
+            self.public_key_edit.setPlainText(details["public_key"])
+
+
+class KeyWidget(QtWidgets.QWidget):
+    SPACER = 14
+    BOTTOM_SPACER = 11
+
+    def __init__(self, key: jce.Key):
+        super(KeyWidget, self).__init__()
+        self.setObjectName("KeyWidgetItem")
+        self.setMinimumWidth(400)
+        self.setMinimumHeight(84)
+        self.key = key
+        fingerprint = key.fingerprint
+        self.fingerprint = fingerprint
+        self.keyfingerprint = QtWidgets.QLabel(fingerprint)
+        self.keyfingerprint.setObjectName("keyfingerprint")
+        date = key.creationtime.date()
+        date_label = QtWidgets.QLabel(f"Created at: {date.strftime('%Y-%m-%d')}")
+        date_label.setAlignment(Qt.AlignTop)
+        date_label.setContentsMargins(0, 0, 0, 0)
+
+        # UIDs
+        uid_vboxlayout = QtWidgets.QVBoxLayout()
+        uid_vboxlayout.setSpacing(0)
+        uid_vboxlayout.setContentsMargins(0, 0, 0, 0)
+        for uid in key.uids:
+            uid_label = QtWidgets.QLabel(uid["value"])
+            uid_vboxlayout.addWidget(uid_label)
+        uid_widget = QtWidgets.QWidget()
+        uid_widget.setLayout(uid_vboxlayout)
+
+        # UID and date layout
+        hlayout = QtWidgets.QHBoxLayout()
+        hlayout.addWidget(uid_widget)
+        hlayout.addWidget(date_label)
+        hlayout.setAlignment(Qt.AlignTop)
+        hlayout.setContentsMargins(11, 0, 11, 11)
+        group_widget = QtWidgets.QWidget()
+        group_widget.setLayout(hlayout)
+
+        fp_group_layout = QtWidgets.QVBoxLayout()
+        fp_group_layout.addWidget(self.keyfingerprint)
+        fp_group_layout.addWidget(group_widget)
+
+        self.setLayout(fp_group_layout)
+        self.setToolTip("Double click to export public key")
+        self.setObjectName("keywidget")
+
+    def set_broken(self, problem: str):
+        "Marks the key as broken with the problem found by the integrity check"
+        self.keyfingerprint.setProperty("broken", bool(problem))
+        self.keyfingerprint.style().unpolish(self.keyfingerprint)
+        self.keyfingerprint.style().polish(self.keyfingerprint)
+        if problem:
+            self.setToolTip(f"Broken key: {problem}")
+        else:
+            self.setToolTip("Double click to export public key")
+
+    def set_on_card(self, value: bool):
+        "Highlights the fingerprint when the key is on the connected smartcard"
+        self.keyfingerprint.setProperty("oncard", value)
+        self.keyfingerprint.style().unpolish(self.keyfingerprint)
+        self.keyfingerprint.style().polish(self.keyfingerprint)
+
+    def mouseDoubleClickEvent(self, event):
+        if self.export_public_key(self, self.fingerprint, self.key.get_pub_key()):
+            self.success_dialog = MessageDialogs.success_dialog(
+                "Exported public key successfully!"
+            )
+            self.success_dialog.show()
+
+    @classmethod
+    def export_public_key(cls, widget, fingerprint, public_key):
+        select_path = QtWidgets.QFileDialog.getExistingDirectory(
+            widget,
+            "Select directory to save public key",
+            ".",
+            QtWidgets.QFileDialog.ShowDirsOnly,
+        )
+        if select_path:
+            filepassphrase = f"{fingerprint}.pub"
+            filepath = os.path.join(select_path, filepassphrase)
+            with open(filepath, "w") as fobj:
+                fobj.write(public_key)
+            return True
+        return False
+
+
+class KeyWidgetList(QtWidgets.QListWidget):
+    # Fingerprint of the selected key and its details, None while loading
+    details_changed = Signal((str, object))
+
+    def __init__(self, ks, crypto):
+        super(KeyWidgetList, self).__init__()
+        self.setObjectName("KeyWidgetList")
+        self.ks = ks
+        # The details are computed in the crypto worker
+        self.crypto = crypto
+        # Fingerprint -> key details, so that reselecting a key is instant
+        self.details_cache = LRUCache(64)
+        self.details_running = False
+        # Key selected while the details of another one were computed
+        self.details_next = None
+        # Subkey fingerprints and key ids -> primary fingerprint
+        self.index = KeyIndex()
+        # Primary fingerprint -> QListWidgetItem
+        self.items = {}
+        self.oncard_fingerprint = None
+
+        # Set layout.
+        # self.layout = QtWidgets.QVBoxLayout(self)
+        # self.setLayout(self.layout)
+        self.updateList()
+        self.setSizePolicy(QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Minimum)
+        self.setMinimumHeight(300)
+        self.currentItemChanged.connect(self.on_item_changed)
+
+    def updateList(self):
+        try:
+            keys = self.ks.get_all_keys()
+            keys.sort(key=lambda x: x.creationtime, reverse=True)
+            self.index.clear()
+            self.items.clear()
+            self.details_cache.clear()
+            for key in keys:
+                kw = KeyWidget(key)
+                item = QtWidgets.QListWidgetItem()
+                item.setSizeHint(kw.sizeHint())
+                self.addItem(item)
+                self.setItemWidget(item, kw)
+                self.index.add_key(key)
+                self.items[key.fingerprint] = item
+            if len(keys) > 0:
+                # Select the top most row
+                self.setCurrentRow(0)
+        except Exception:
+            logger.exception("Failed to load the keys from the keystore")
+
+    def on_item_changed(self, current, previous):
+        kw = self.itemWidget(current) if current is not None else None
+        if kw is None:
+            self.details_changed.emit("", None)
+            return
+        details = self.details_cache.get(kw.fingerprint)
+        if details is None:
+            self.request_details(kw.key)
+        self.details_changed.emit(kw.fingerprint, details)
+
+    def request_details(self, key):
+        "Asks the crypto worker for the details of key, one request at a time"
+        if self.details_running:
+            # While scrolling only the latest selection matters
+            self.details_next = key
+            return
+        self.details_running = True
+        self.crypto.submit(
+            "key_details",
+            lambda success, result: self.on_details(key, success, result),
+            fingerprint=key.fingerprint,
+        )
+
+    def on_details(self, key, success, details):
+        self.details_running = False
+        if self.details_next is not None:
+            nextkey, self.details_next = self.details_next, None
+            self.request_details(nextkey)
+        if not success:
+            logger.error(
+                "Failed to read the details of %s: %s", key.fingerprint, details
+            )
+            details = {"error": details}
+        item = self.items.get(key.fingerprint)
+        kw = self.itemWidget(item) if item is not None else None
+        # The key got replaced while its details were computed
+        if kw is None or kw.key is not key:
+            return
+        if "error" not in details:
+            self.details_cache.put(key.fingerprint, details)
+        if item is self.currentItem():
+            self.details_changed.emit(key.fingerprint, details)
+
+    def addnewKey(self, key):
+        kw = KeyWidget(key)
+        item = QtWidgets.QListWidgetItem()
+        item.setSizeHint(kw.sizeHint())
+        self.insertItem(0, item)
+        self.setItemWidget(item, kw)
+        self.index.add_key(key)
+        self.items[key.fingerprint] = item
+        self.setCurrentRow(0)
+
+    def replaceKey(self, key):
+        "Updates the row and the index of an existing key in place"
+        item = self.items.get(key.fingerprint)
+        if item is None:
+            self.addnewKey(key)
+            return
+        oldkw = self.itemWidget(item)
+        self.index.remove_key(oldkw.key)
+        kw = KeyWidget(key)
+        kw.set_on_card(key.fingerprint == self.oncard_fingerprint)
+        item.setSizeHint(kw.sizeHint())
+        self.setItemWidget(item, kw)
+        self.index.add_key(key)
+        self.details_cache.pop(key.fingerprint, None)
+        if item is self.currentItem():
+            self.on_item_changed(item, None)
+
+    def mark_broken(self, broken):
+        "Flags the keys which failed the integrity check"
+        for fingerprint, item in self.items.items():
+            self.itemWidget(item).set_broken(broken.get(fingerprint, ""))
+
+    def highlight_card(self, card):
+        "Highlights and scrolls to the key whose subkeys are on the given card"
+        if self.oncard_fingerprint in self.items:
+            kw = self.itemWidget(self.items[self.oncard_fingerprint])
+            kw.set_on_card(False)
+        self.oncard_fingerprint = None
+        if card is None:
+            return
+        for slot in ("sig_f", "enc_f", "auth_f"):
+            fingerprint = self.index.lookup(card_fingerprint(card, slot))
+            if fingerprint in self.items:
+                item = self.items[fingerprint]
+                self.itemWidget(item).set_on_card(True)
+                self.setCurrentItem(item)
+                self.scrollToItem(item, QtWidgets.QAbstractItemView.PositionAtCenter)
+                self.oncard_fingerprint = fingerprint
+                return
+
+
+class MainWindow(QtWidgets.QMainWindow):
+    def __init__(self, parent=None, config={}):
+        super(MainWindow, self).__init__(parent)
+        self.setWindowTitle("Tumpa: OpenPGP made simple")
+        self.setMinimumWidth(600)
+        self.setMinimumHeight(750)
+        self.setMaximumWidth(600)
+        self.setMaximumHeight(750)
+        self.ks = jce.KeyStore(get_keystore_directory())
+        # Key generation and card operations run in this separate process
+        self.crypto = CryptoWorker(get_keystore_directory())
+        self.vboxlayout_for_keys = QtWidgets.QVBoxLayout()
+        self.widget = KeyWidgetList(self.ks, self.crypto)
+        self.current_fingerprint = ""
+        # Details of the connected smartcard, read once per insertion
+        self.card = None
+        self.cardpanel = CardPanel()
+        self.detailspanel = KeyDetailsPanel()
+        self.widget.details_changed.connect(self.detailspanel.update_details)
+        self.widget.on_item_changed(self.widget.currentItem(), None)
+        self.tabs = QtWidgets.QTabWidget()
+        self.tabs.addTab(self.detailspanel, "Key details")
+        self.tabs.addTab(self.cardpanel, "Smartcard")
+        self.cardcheck_thread = HardwareThread(
+            self.enable_upload, self.update_card_details
+        )
+        self.integrity_running = False
+        # Keys changed while a check was running get checked right after it
+        self.integrity_pending = False
+
+        # File menu
+        exportPubKey = QtWidgets.QAction("&Export public key", self)
+        exportPubKey.triggered.connect(self.export_public_key)
+        encryptFilesAction = QtWidgets.QAction("E&ncrypt files", self)
+        encryptFilesAction.triggered.connect(self.show_encrypt_files_dialog)
+        decryptFilesAction = QtWidgets.QAction("&Decrypt files", self)
+        decryptFilesAction.triggered.connect(self.show_decrypt_files_dialog)
+        publishAction = QtWidgets.QAction("&Publish public keys", self)
+        publishAction.triggered.connect(self.show_publish_keys_dialog)
+        extendExpiryAction = QtWidgets.QAction("Extend expir&y of keys", self)
+        extendExpiryAction.triggered.connect(self.show_extend_expiry_dialog)
+        integrityAction = QtWidgets.QAction("Check keystore &integrity", self)
+        integrityAction.triggered.connect(self.check_integrity)
+        saveLogAction = QtWidgets.QAction("Save debug &log", self)
+        saveLogAction.triggered.connect(self.save_debug_log)
+        exitAction = QtWidgets.QAction("E&xit", self)
+        exitAction.triggered.connect(self.exit_process)
+        menu = self.menuBar()
+        filemenu = menu.addMenu("&File")
+        filemenu.addAction(exportPubKey)
+        filemenu.addAction(encryptFilesAction)
+        filemenu.addAction(decryptFilesAction)
+        filemenu.addAction(publishAction)
+        filemenu.addAction(extendExpiryAction)
+        filemenu.addAction(integrityAction)
+        filemenu.addAction(saveLogAction)
+        filemenu.addAction(exitAction)
+
+        # smartcard menu
+        changepinAction = QtWidgets.QAction("Change user &pin", self)
+        changepinAction.triggered.connect(self.show_change_user_pin_dialog)
+        changeadminpinAction = QtWidgets.QAction("Change &admin pin", self)
+        changeadminpinAction.triggered.connect(self.show_change_admin_pin_dialog)
+        changenameAction = QtWidgets.QAction("Set cardholder &name", self)
+        changenameAction.triggered.connect(self.show_set_name)
+        changeurlAction = QtWidgets.QAction("Set public key &URL", self)
+        changeurlAction.triggered.connect(self.show_set_public_url)
+        signFilesAction = QtWidgets.QAction("Sign &files", self)
+        signFilesAction.triggered.connect(self.show_sign_files_dialog)
+        certifyKeysAction = QtWidgets.QAction("&Certify keys", self)
+        certifyKeysAction.triggered.connect(self.show_certify_keys_dialog)
+        resetYubiKeylAction = QtWidgets.QAction("Reset the YubiKey", self)
+        resetYubiKeylAction.triggered.connect(self.reset_yubikey_dialog)
+        smartcardmenu = menu.addMenu("&SmartCard")
+        smartcardmenu.addAction(changepinAction)
+        smartcardmenu.addAction(changeadminpinAction)
+        smartcardmenu.addAction(changenameAction)
+        smartcardmenu.addAction(changeurlAction)
+        smartcardmenu.addAction(signFilesAction)
+        smartcardmenu.addAction(certifyKeysAction)
+        smartcardmenu.addAction(resetYubiKeylAction)
+
+        self.cwidget = QtWidgets.QWidget()
+        self.generateButton = QtWidgets.QPushButton(text="Generate new key")
+        self.generateButton.clicked.connect(self.show_generate_dialog)
+        self.uploadButton = QtWidgets.QPushButton(text="Upload to SmartCard")
+        self.uploadButton.clicked.connect(self.upload_to_smartcard)
+        self.uploadButton.setEnabled(False)
+        # self.widget.itemSelectionChanged.connect(self.enable_upload)
+
+        hlayout = QtWidgets.QHBoxLayout()
+        hlayout.addWidget(self.generateButton)
+        hlayout.addWidget(self.uploadButton)
+        wd = QtWidgets.QWidget()
+        wd.setLayout(hlayout)
+
+        keyring_label = QtWidgets.QLabel("Available keys")
+        keyring_label.setObjectName("keyring_label")
+        keyring_instruction_label = QtWidgets.QLabel(
+            "Single click on a key to enable writing to smart card. "
+            + "Double click on a key to export the public key."
+        )
+        keyring_instruction_label.setObjectName("keyring_instruction")
+        vboxlayout = QtWidgets.QVBoxLayout()
+        vboxlayout.addWidget(keyring_label)
+        vboxlayout.addWidget(keyring_instruction_label)
+        vboxlayout.addWidget(self.widget)
+        vboxlayout.addWidget(self.tabs)
+        vboxlayout.addWidget(wd)
+        self.cwidget.setLayout(vboxlayout)
+        self.setCentralWidget(self.cwidget)
+        self.setStyleSheet(css)
+        self.cardcheck_thread.start()
+        self.check_integrity()
+
+    def reset_yubikey_dialog(self):
+        "Verify if the user really wants to reset the smartcard"
+        reply = QtWidgets.QMessageBox.question(
+            self,
+            "Are you sure?",
+            "This action will reset your YubiKey. Are you sure to do that?",
+        )
+        if reply != QtWidgets.QMessageBox.StandardButton.Yes:
+            return
+        self.submit_card_operation(
+            "reset_card", "YubiKey reset.", "YubiKey successfully reset."
+        )
+
+    def enable_upload(self, value):
+        "Slot to enable the upload to smartcard button"
+        # If no item is selected on the ListWidget, then
+        # no need to update the uploadButton status.
+        if not self.widget.selectedItems():
+            return
+        self.uploadButton.setEnabled(value)
+
+    def update_card_details(self, card):
+        "Slot to update the cached details of the smartcard"
+        self.card = card
+        self.cardpanel.update_details(card)
+        self.widget.highlight_card(card)
+
+    def show_change_user_pin_dialog(self):
+        "This slot shows the input dialog to change user pin"
+        self.cardcheck_thread.flag = False
+        self.smalldialog = SmartPinDialog(
+            self.change_pin_on_card_slot,
+            "Change user pin",
+            "New User pin",
+            enable_window=self.enable_mainwindow,
+            card=self.card,
+        )
+        self.smalldialog.show()
+
+    def show_set_public_url(self):
+        "This slot shows the input dialog to set public url"
+        self.cardcheck_thread.flag = False
+        self.smalldialog = SmartCardTextDialog(
+            self.set_url_on_card_slot,
+            "Add public URL",
+            "Public URL",
+            enable_window=self.enable_mainwindow,
+            card=self.card,
+            value=(self.card or {}).get("url") or "",
+        )
+        self.smalldialog.show()
+
+    def show_set_name(self):
+        "This slot shows the input dialog to set name"
+        self.cardcheck_thread.flag = False
+        self.smalldialog = SmartCardTextDialog(
+            self.set_name_on_card_slot,
+            "Add Name",
+            "Name",
+            enable_window=self.enable_mainwindow,
+            card=self.card,
+            value=card_name(self.card) if self.card else "",
+        )
+        self.smalldialog.show()
+
+    def show_change_admin_pin_dialog(self):
+        "This slot shows the input dialog to change admin pin"
+        self.cardcheck_thread.flag = False
+        self.smalldialog = SmartPinDialog(
+            self.change_admin_pin_on_card_slot,
+            "Change admin pin",
+            "New Admin pin",
+            enable_window=self.enable_mainwindow,
+            card=self.card,
+        )
+        self.smalldialog.show()
+
+    def change_pin_on_card_slot(self, userpin, adminpin):
+        "Final slot which will try to change the userpin"
+        self.submit_card_operation(
+            "change_user_pin",
+            "changing user pin",
+            "Changed user pin successfully.",
+            adminpin=adminpin,
+            userpin=userpin,
+        )
+
+    def change_admin_pin_on_card_slot(self, userpin, adminpin):
+        "Final slot which will try to change the adminpin"
+        self.submit_card_operation(
+            "change_admin_pin",
+            "changing admin pin",
+            "Changed admin pin successfully.",
+            adminpin=adminpin,
+            newadminpin=userpin,
+        )
+
+    def set_url_on_card_slot(self, publicURL, adminpin):
+        "Final slot which will try to change the publicURL"
+        self.submit_card_operation(
+            "set_card_url",
+            "adding public URL",
+            "Added public URL successfully.",
+            url=publicURL,
+            adminpin=adminpin,
+        )
+
+    def set_name_on_card_slot(self, name, adminpin):
+        "Final slot which will try to change the name"
+        self.submit_card_operation(
+            "set_card_name",
+            "adding name",
+            "Added name successfully.",
+            name=name,
+            adminpin=adminpin,
+        )
+
+    def submit_card_operation(self, operation, where, message, **kwargs):
+        """
+        Runs the card operation in the crypto worker. The main window and the
+        card polling stay disabled until the worker replies.
+        """
+        # The card details and pin retries change in any case
+        self.cardcheck_thread.invalidate()
+        self.disable_cardcheck_thread_slot()
+        self.setEnabled(False)
+        self.crypto.submit(
+            operation,
+            lambda success, result: self.on_card_operation_done(
+                where, message, success, result
+            ),
+            **kwargs,
+        )
+
+    def on_card_operation_done(self, where, message, success, result):
+        "Gets the result of a card operation from the crypto worker"
+        self.enable_mainwindow()
+        if not success:
+            self.error_dialog = MessageDialogs.error_dialog(where, result)
+            self.error_dialog.show()
+            return
+        self.success_dialog = MessageDialogs.success_dialog(message)
+        self.success_dialog.show()
+
+    def show_generate_dialog(self):
+        "Shows the dialog to generate new key"
+        self.disable_cardcheck_thread_slot()
+        self.newd = NewKeyDialog(
+            self.ks,
+            self.crypto,
+            self.widget.addnewKey,
+            self.disable_generate_button,
+            self.enable_generate_button,
+            enable_window=self.enable_mainwindow,
+        )
+        self.newd.show()
+        self.setEnabled(False)
+
+    def disable_generate_button(self):
+        self.cardcheck_thread.flag = False
+        self.generateButton.setEnabled(False)
+        self.update()
+        self.repaint()
+
+    def enable_generate_button(self):
+        self.enable_cardcheck_thread_slot()
+        # Check the new key in the background
+        self.check_integrity()
+        self.setEnabled(True)
+        self.generateButton.setEnabled(True)
+        self.update()
+        self.repaint()
+
+    def enable_mainwindow(self):
+        self.enable_cardcheck_thread_slot()
+        self.setEnabled(True)
+
+    def disable_cardcheck_thread_slot(self):
+        self.cardcheck_thread.flag = False
+
+    def enable_cardcheck_thread_slot(self):
+        self.cardcheck_thread.flag = True
+        self.cardcheck_thread.start()
+
+    def upload_to_smartcard(self):
+        "Shows the userinput dialog to upload the selected key to the smartcard"
+        # This means no key is selected on the list
+        if not self.widget.selectedItems():
+            self.error_dialog = MessageDialogs.error_dialog(
+                "upload to smart card", "Please select a key from the list."
+            )
+            self.error_dialog.show()
+            return
+
+        self.disable_cardcheck_thread_slot()
+        self.setEnabled(False)
+        item = self.widget.selectedItems()[0]
+        kw = self.widget.itemWidget(item)
+        self.current_key = kw.key
+        self.sccd = SmartCardConfirmationDialog(
+            self.get_pins_and_passphrase_and_write,
+            key=kw.key,
+            enable_window=self.enable_mainwindow,
+            card=self.card,
+        )
+        self.sccd.show()
+
+    def get_pins_and_passphrase_and_write(
+        self, passphrase: str, adminpin: str, whichkeys: int
+    ):
+        "This method uploads the cert to the card"
+        self.cardcheck_thread.invalidate()
+        self.crypto.submit(
+            "upload",
+            self.on_uploaded_to_smartcard,
+            fingerprint=self.current_key.fingerprint,
+            adminpin=adminpin,
+            passphrase=passphrase,
+            whichkeys=whichkeys,
+        )
+
+    def on_uploaded_to_smartcard(self, success, result):
+        "Gets the result of the upload from the crypto worker"
+        if not success:
+            self.error_dialog = MessageDialogs.error_dialog(
+                "upload to smartcard.", result
+            )
+            self.error_dialog.show()
+            return
+        self.success_dialog = MessageDialogs.success_dialog(
+            "Uploaded to the smartcard successfully."
+        )
+        self.success_dialog.show()
+        self.setEnabled(True)
+        self.enable_cardcheck_thread_slot()
+
+    def export_public_key(self):
+        # This means no key is selected on the list
+        if not self.widget.selectedItems():
+            self.error_dialog = MessageDialogs.error_dialog(
+                "exporting public key", "Please select a key from the list."
+            )
+            self.error_dialog.show()
+            return
+
+        item = self.widget.selectedItems()[0]
+        kw = self.widget.itemWidget(item)
+        fingerprint = kw.key.fingerprint
+        self.crypto.submit(
+            "export",
+            lambda success, result: self.on_public_key_exported(
+                fingerprint, success, result
+            ),
+            fingerprint=fingerprint,
+        )
+
+    def on_public_key_exported(self, fingerprint, success, result):
+        "Gets the armored public key from the crypto worker and saves it"
+        if not success:
+            self.error_dialog = MessageDialogs.error_dialog(
+                "exporting public key", result
+            )
+            self.error_dialog.show()
+            return
+        if KeyWidget.export_public_key(self, fingerprint, result):
+            self.success_dialog = MessageDialogs.success_dialog(
+                "Exported public key successfully!"
+            )
+            self.success_dialog.show()
+
+    def show_encrypt_files_dialog(self):
+        "Shows the dialog to encrypt files to the selected recipients"
+        self.filed = EncryptFileDialog(
+            self.ks, self.crypto, enable_window=self.enable_mainwindow
+        )
+        self.filed.show()
+        self.setEnabled(False)
+
+    def show_decrypt_files_dialog(self):
+        "Shows the dialog to decrypt files with the selected key"
+        # This means no key is selected on the list
+        if not self.widget.selectedItems():
+            self.error_dialog = MessageDialogs.error_dialog(
+                "decrypting files", "Please select a key from the list."
+            )
+            self.error_dialog.show()
+            return
+
+        item = self.widget.selectedItems()[0]
+        kw = self.widget.itemWidget(item)
+        self.filed = DecryptFileDialog(
+            self.ks, kw.key, self.crypto, enable_window=self.enable_mainwindow
+        )
+        self.filed.show()
+        self.setEnabled(False)
+
+    def show_sign_files_dialog(self):
+        "Shows the dialog to sign files using the smartcard"
+        # This means no key is selected on the list
+        if not self.widget.selectedItems():
+            self.error_dialog = MessageDialogs.error_dialog(
+                "signing files", "Please select a key from the list."
+            )
+            self.error_dialog.show()
+            return
+
+        self.disable_cardcheck_thread_slot()
+        item = self.widget.selectedItems()[0]
+        kw = self.widget.itemWidget(item)
+        # Signing updates the signature counter and maybe the pin retries
+        self.cardcheck_thread.invalidate()
+        self.signd = SignFilesDialog(
+            kw.key, self.crypto, enable_window=self.enable_mainwindow, card=self.card
+        )
+        self.signd.show()
+        self.setEnabled(False)
+
+    def show_certify_keys_dialog(self):
+        "Shows the dialog to certify other keys with the key on the smartcard"
+        fingerprint = self.widget.oncard_fingerprint
+        if fingerprint is None and self.widget.selectedItems():
+            item = self.widget.selectedItems()[0]
+            fingerprint = self.widget.itemWidget(item).fingerprint
+        if fingerprint is None:
+            self.error_dialog = MessageDialogs.error_dialog(
+                "certifying keys", "Please select a key from the list."
+            )
+            self.error_dialog.show()
+            return
+
+        self.disable_cardcheck_thread_slot()
+        # Certifying updates the signature counter and maybe the pin retries
+        self.cardcheck_thread.invalidate()
+        self.certifyd = CertifyKeysDialog(
+            self.ks,
+            self.ks.get_key(fingerprint),
+            self.crypto,
+            self.keys_updated,
+            enable_window=self.enable_mainwindow,
+            card=self.card,
+        )
+        self.certifyd.show()
+        self.setEnabled(False)
+
+    def show_publish_keys_dialog(self):
+        "Shows the dialog to publish public keys to a keyserver"
+        selected_key = None
+        if self.widget.selectedItems():
+            item = self.widget.selectedItems()[0]
+            selected_key = self.widget.itemWidget(item).key
+        self.publishd = PublishKeysDialog(
+            self.ks, selected_key, enable_window=self.enable_mainwindow
+        )
+        self.publishd.show()
+        self.setEnabled(False)
+
+    def show_extend_expiry_dialog(self):
+        "Asks to extend the selected or all keys, and shows the expiry dialog"
+        keys = self.ks.get_all_keys()
+        if not keys:
+            return
+        if self.widget.selectedItems():
+            reply = QtWidgets.QMessageBox.question(
+                self,
+                "Extend expiry",
+                "Extend the expiry of all the keys? Choose No to extend only the selected key.",
+            )
+            if reply != QtWidgets.QMessageBox.StandardButton.Yes:
+                item = self.widget.selectedItems()[0]
+                keys = [self.widget.itemWidget(item).key]
+        self.expiryd = ExtendExpiryDialog(
+            self.ks,
+            keys,
+            self.crypto,
+            self.keys_updated,
+            enable_window=self.enable_mainwindow,
+        )
+        self.expiryd.show()
+        self.setEnabled(False)
+
+    def keys_updated(self, fingerprints):
+        "Slot to refresh only the keys which changed in the keystore"
+        for fingerprint in fingerprints:
+            self.widget.replaceKey(self.ks.get_key(fingerprint))
+        # Only the changed keys get checked again
+        self.check_integrity()
+
+    def check_integrity(self):
+        "Checks the self-signatures of the new or changed keys in the background"
+        if self.integrity_running:
+            self.integrity_pending = True
+            return
+        self.integrity_running = True
+        self.crypto.submit(
+            "integrity",
+            self.integrity_finished,
+            cache_path=os.path.join(get_keystore_directory(), INTEGRITY_CACHE_NAME),
+        )
+
+    def integrity_finished(self, success, result):
+        "Flags the broken keys, and runs the check again if asked for while running"
+        self.integrity_running = False
+        if not success:
+            logger.error("Failed to check the keystore integrity: %s", result)
+        else:
+            for fingerprint, problem in result.items():
+                logger.warning("Key %s is broken: %s", fingerprint, problem)
+            self.widget.mark_broken(result)
+        if self.integrity_pending:
+            self.integrity_pending = False
+            self.check_integrity()
+
+    def save_debug_log(self):
+        "Writes the in-memory log buffer to a file chosen by the user"
+        filepath, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Save debug log", "tumpa.log"
+        )
+        if not filepath:
+            return
+        try:
+            logbuffer.get_handler().dump(filepath)
+        except OSError as e:
+            self.error_dialog = MessageDialogs.error_dialog("saving debug log", str(e))
+            self.error_dialog.show()
+            return
+        self.success_dialog = MessageDialogs.success_dialog(
+            "Saved debug log successfully."
+        )
+        self.success_dialog.show()
+
+    def exit_process(self):
+        self.cardcheck_thread.flag = False
+        self.crypto.stop()
+        time.sleep(1)
+        sys.exit(0)
+
+    def closeEvent(self, event):
+        self.cardcheck_thread.flag = False
+        self.crypto.stop()
+        time.sleep(1)
+        return super().closeEvent(event)
+
+
+def main():
+    logbuffer.install_crash_handler(get_crash_log_file())
+    app = QtWidgets.QApplication(sys.argv)
+    # Records the freezes of the GUI if TUMPA_WATCHDOG_MS is set
+    watchdog.start_from_environment()
+    form = MainWindow()
+    form.show()
+    app.exec_()
+
+
+if __name__ == "__main__":
+    main()
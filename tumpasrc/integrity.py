@@ -0,0 +1,110 @@
+import os
+import json
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import johnnycanencrypt as jce
+import johnnycanencrypt.johnnycanencrypt as rjce
+
+CACHE_NAME = "integrity.json"
+
+
+def _check(
+    certdata: bytes, fingerprint: str, uids: List[str], subkeys: List[str]
+) -> Optional[str]:
+    """
+    Runs in the worker process. Parsing the certificate makes johnnycanencrypt
+    validate the self-signatures and binding signatures with its policy, so
+    the parsed UIDs and subkeys must match the ones stored in the keystore.
+    Returns the problem found, or None if the certificate is fine.
+    """
+    try:
+        parsed_uids, parsed_fingerprint, _, _, _, othervalues = rjce.parse_cert_bytes(
+            certdata
+        )
+    except Exception as e:
+        return f"Invalid certificate: {e}"
+    if parsed_fingerprint.upper() != fingerprint.upper():
+        return f"Fingerprint mismatch, the certificate is {parsed_fingerprint}"
+    values = {uid["value"] for uid in parsed_uids}
+    missing = [uid for uid in uids if uid not in values]
+    if missing:
+        return "No valid self-signature for: {}".format(", ".join(missing))
+    parsed_subkeys = {subkey[1].upper() for subkey in othervalues["subkeys"]}
+    stored_subkeys = {subkey.upper() for subkey in subkeys}
+    missing = sorted(stored_subkeys - parsed_subkeys)
+    if missing:
+        return "No valid binding signature for subkey: {}".format(", ".join(missing))
+    unknown = sorted(parsed_subkeys - stored_subkeys)
+    if unknown:
+        return "Subkey not in the keystore: {}".format(", ".join(unknown))
+    return None
+
+
+def _digest(key: jce.Key) -> str:
+    "Hash of the certificate and of the UIDs and subkeys stored for it"
+    digest = hashlib.sha256(key.keyvalue)
+    for uid in key.uids:
+        digest.update(uid["value"].encode("utf-8") + b"\0")
+    for subkey in key.othervalues.get("subkeys_sorted", []):
+        digest.update(subkey["fingerprint"].encode("utf-8") + b"\0")
+    return digest.hexdigest()
+
+
+def check_keys(
+    keys: List[jce.Key], cache_path: str, jobs: Optional[int] = None
+) -> Dict[str, str]:
+    """
+    Checks every certificate on a process pool and returns fingerprint ->
+    problem for the broken ones. The results are cached by the hash of the
+    certificate content, so only new or changed keys get checked again.
+    """
+    try:
+        with open(cache_path) as fobj:
+            cache = json.load(fobj)
+    except (OSError, ValueError):
+        cache = {}
+
+    digests = {key.fingerprint: _digest(key) for key in keys}
+    # Failures of the check itself are reported but not cached
+    failures = {}
+    todo = [key for key in keys if digests[key.fingerprint] not in cache]
+    if todo:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as executor:
+            futures = [
+                executor.submit(
+                    _check,
+                    key.keyvalue,
+                    key.fingerprint,
+                    [uid["value"] for uid in key.uids if not uid.get("revoked")],
+                    [
+                        subkey["fingerprint"]
+                        for subkey in key.othervalues.get("subkeys_sorted", [])
+                    ],
+                )
+                for key in todo
+            ]
+            for key, future in zip(todo, futures):
+                try:
+                    cache[digests[key.fingerprint]] = future.result()
+                except Exception as e:
+                    failures[key.fingerprint] = f"Check failed: {e}"
+
+    # Forget the results for the keys which are gone or changed
+    current = set(digests.values())
+    cache = {digest: result for digest, result in cache.items() if digest in current}
+    tmppath = cache_path + ".tmp"
+    with open(tmppath, "w") as fobj:
+        json.dump(cache, fobj)
+    os.replace(tmppath, cache_path)
+
+    broken = {
+        fingerprint: cache[digest]
+        for fingerprint, digest in digests.items()
+        if cache.get(digest) is not None
+    }
+    broken.update(failures)
+    return broken
@@ -0,0 +1,213 @@
+import os
+import sys
+import json
+import time
+import getpass
+import hashlib
+import argparse
+import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import johnnycanencrypt as jce
+from tumpasrc.ciphersuites import CIPHERSUITES
+from tumpasrc.configuration import get_keystore_directory
+
+
+class Journal:
+    """
+    An append-only journal of the finished units of a job. Every line is a
+    JSON object, written and synced before the next unit starts, so after a
+    crash at most the unit in progress is lost. The first line describes the
+    job; a half written last line is cut off when the journal is loaded.
+    """
+
+    def __init__(self, path: str, job: str):
+        self.path = path
+        self.job = job
+        self.started: Optional[float] = None
+        self.done: Dict[str, object] = {}
+        self._load()
+        if self.started is None:
+            self.started = time.time()
+            self._append({"job": job, "started": self.started})
+
+    def _load(self):
+        try:
+            with open(self.path, "rb+") as fobj:
+                data = fobj.read()
+                end = data.rfind(b"\n") + 1
+                if end != len(data):
+                    # Torn write from a crash, the unit will run again. Cut it
+                    # off so that the next entry starts on its own line.
+                    data = data[:end]
+                    fobj.truncate(end)
+                    fobj.flush()
+                    os.fsync(fobj.fileno())
+        except FileNotFoundError:
+            return
+        for line in data.decode("utf-8").splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if "job" in entry:
+                if entry["job"] != self.job:
+                    raise ValueError(
+                        f"{self.path} is the journal of the {entry['job']} job."
+                    )
+                self.started = entry["started"]
+            else:
+                self.done[entry["unit"]] = entry["result"]
+
+    def _append(self, entry: dict):
+        with open(self.path, "a") as fobj:
+            fobj.write(json.dumps(entry) + "\n")
+            fobj.flush()
+            os.fsync(fobj.fileno())
+
+    def record(self, unit: str, result: object):
+        "Marks the unit as finished"
+        self._append({"unit": unit, "result": result})
+        self.done[unit] = result
+
+    def remove(self):
+        "Deletes the journal once the whole job finished"
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def run_job(
+    journal: Journal,
+    units: Iterable[Tuple[str, object]],
+    handler: Callable[[object], object],
+    progress: Optional[Callable[[str, int, int, bool], None]] = None,
+) -> Dict[str, object]:
+    """
+    Runs handler(value) for every (unit id, value) which is not in the
+    journal yet, and records the result. progress is called with the unit
+    id, the count, the total and whether the unit was skipped. Returns the
+    results of all the units, including the ones from earlier runs.
+    """
+    units = list(units)
+    results = {}
+    for count, (unit, value) in enumerate(units, start=1):
+        skipped = unit in journal.done
+        if not skipped:
+            journal.record(unit, handler(value))
+        results[unit] = journal.done[unit]
+        if progress:
+            progress(unit, count, len(units), skipped)
+    return results
+
+
+def _all_keys(ks: jce.KeyStore) -> List[jce.Key]:
+    "Returns all the keys, johnnycanencrypt raises instead for an empty keystore"
+    try:
+        return ks.get_all_keys()
+    except jce.KeyNotFoundError:
+        return []
+
+
+def _export_unit(key: jce.Key) -> str:
+    "The fingerprint and the certificate hash, so a changed key gets exported again"
+    return "{}:{}".format(key.fingerprint, hashlib.sha256(key.keyvalue).hexdigest())
+
+
+def _read_roster(path: str) -> Iterable[Tuple[str, str]]:
+    "Yields one (unit id, uid) per non empty line of the roster"
+    with open(path) as fobj:
+        for line in fobj:
+            uid = line.strip()
+            if uid and not uid.startswith("#"):
+                yield uid, uid
+
+
+def _print_progress(unit: str, count: int, total: int, skipped: bool):
+    state = "already done" if skipped else "done"
+    print(f"[{count}/{total}] {unit}: {state}")
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="tumpa-batch",
+        description="Resumable batch jobs, restart the same command to continue.",
+    )
+    parser.add_argument(
+        "--keystore", help="Path to the keystore directory.", default=None
+    )
+    parser.add_argument("--journal", help="Path of the journal file.", default=None)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    generate_parser = subparsers.add_parser(
+        "generate", help="Generate a key for every UID in the roster."
+    )
+    generate_parser.add_argument("roster", help="File with one UID per line.")
+    generate_parser.add_argument(
+        "--ciphersuite",
+        choices=[label for label, _ in CIPHERSUITES],
+        default=CIPHERSUITES[0][0],
+    )
+    generate_parser.add_argument(
+        "--years", type=int, default=1, help="Years until the keys expire."
+    )
+    export_parser = subparsers.add_parser(
+        "export", help="Export every public key to a directory."
+    )
+    export_parser.add_argument("directory", help="Output directory.")
+    options = parser.parse_args(args)
+
+    ks = jce.KeyStore(options.keystore or get_keystore_directory())
+    if options.command == "export":
+        os.makedirs(options.directory, exist_ok=True)
+        journal = Journal(
+            options.journal or os.path.join(options.directory, ".tumpa-journal"),
+            "export",
+        )
+
+        def export(key):
+            path = os.path.join(options.directory, f"{key.fingerprint}.asc")
+            tmppath = path + ".tmp"
+            with open(tmppath, "w") as fobj:
+                fobj.write(key.get_pub_key())
+            os.replace(tmppath, path)
+            return path
+
+        units = ((_export_unit(key), key) for key in _all_keys(ks))
+        run_job(journal, units, export, _print_progress)
+        # Only needed to resume an interrupted export
+        journal.remove()
+        return 0
+
+    journal = Journal(options.journal or options.roster + ".journal", "generate")
+    password = getpass.getpass("Passphrase for the new keys: ")
+    ciphersuite = dict(CIPHERSUITES)[options.ciphersuite]
+    expiration = datetime.datetime.now() + datetime.timedelta(days=365 * options.years)
+    # A key generated right before a crash is in the keystore but not in
+    # the journal, reuse it instead of generating a second one.
+    existing = {}
+    for key in _all_keys(ks):
+        if key.creationtime and key.creationtime.timestamp() >= int(journal.started):
+            for uid in key.uids:
+                existing[uid["value"]] = key.fingerprint
+
+    def generate(uid):
+        if uid in existing:
+            return existing[uid]
+        key = ks.create_key(
+            password,
+            [uid],
+            ciphersuite=ciphersuite,
+            expiration=expiration,
+            subkeys_expiration=True,
+        )
+        return key.fingerprint
+
+    results = run_job(journal, _read_roster(options.roster), generate, _print_progress)
+    for uid, fingerprint in results.items():
+        print(f"{fingerprint} {uid}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+from collections import OrderedDict
+from typing import Optional
+
+import johnnycanencrypt as jce
+import johnnycanencrypt.johnnycanencrypt as rjce
+
+
+class LRUCache(OrderedDict):
+    "A dict which keeps only the most recently used maxsize entries"
+
+    def __init__(self, maxsize: int = 64):
+        super(LRUCache, self).__init__()
+        self.maxsize = maxsize
+
+    def get(self, name, default=None):
+        if name not in self:
+            return default
+        self.move_to_end(name)
+        return self[name]
+
+    def put(self, name, value):
+        self[name] = value
+        self.move_to_end(name)
+        while len(self) > self.maxsize:
+            self.popitem(last=False)
+
+
+def _date(value) -> str:
+    if not value:
+        return "Never"
+    return value.strftime("%Y-%m-%d")
+
+
+def key_details(key: jce.Key) -> dict:
+    "Returns the subkeys, capabilities, algorithms, expiry and armored public key"
+    public_key = key.get_pub_key()
+    try:
+        algorithms = {
+            fingerprint.upper(): f"{algorithm} {bits}"
+            for fingerprint, algorithm, bits in rjce.get_key_cipher_details(
+                key.keyvalue
+            )
+        }
+    except jce.CryptoError:
+        algorithms = {}
+    subkeys = []
+    for subkey in key.othervalues.get("subkeys_sorted", []):
+        fingerprint = subkey["fingerprint"].upper()
+        subkeys.append(
+            {
+                "fingerprint": fingerprint,
+                "capability": subkey.get("keytype", ""),
+                "algorithm": algorithms.get(fingerprint, "Unknown"),
+                "created": _date(subkey.get("creation")),
+                "expires": _date(subkey.get("expiration")),
+                "revoked": bool(subkey.get("revoked")),
+            }
+        )
+    return {
+        "fingerprint": key.fingerprint,
+        "algorithm": algorithms.get(key.fingerprint.upper(), "Unknown"),
+        "created": _date(key.creationtime),
+        "expires": _date(key.expirationtime),
+        "subkeys": subkeys,
+        "public_key": public_key,
+    }
+
+
+def details_text(details: Optional[dict]) -> str:
+    "Returns the details as lines of text for the details pane"
+    if details is None:
+        return "No key selected."
+    lines = [
+        "Primary key: {algorithm}, created {created}, expires {expires}".format(
+            **details
+        )
+    ]
+    for subkey in details["subkeys"]:
+        line = "{capability}: {algorithm}, expires {expires}\n    {fingerprint}".format(
+            **subkey
+        )
+        if subkey["revoked"]:
+            line += " (revoked)"
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,45 @@
+from typing import Dict, Iterator, Optional
+
+import johnnycanencrypt as jce
+
+
+def key_identifiers(key: jce.Key) -> Iterator[str]:
+    "Yields the fingerprints and key ids of the primary key and all of its subkeys"
+    fingerprint = key.fingerprint.upper()
+    yield fingerprint
+    # For v4 keys the key id is the last 16 hex characters of the fingerprint
+    yield fingerprint[-16:]
+    for subkey in key.othervalues.get("subkeys_sorted", []):
+        subfingerprint = subkey["fingerprint"].upper()
+        yield subfingerprint
+        yield subfingerprint[-16:]
+
+
+class KeyIndex(dict):
+    """
+    Maps every fingerprint and key id of a key and its subkeys to the
+    primary key fingerprint.
+    """
+
+    def add_key(self, key: jce.Key):
+        for identifier in key_identifiers(key):
+            self[identifier] = key.fingerprint
+
+    def remove_key(self, key: jce.Key):
+        for identifier in key_identifiers(key):
+            if self.get(identifier) == key.fingerprint:
+                del self[identifier]
+
+    def lookup(self, identifier: str) -> Optional[str]:
+        "Returns the primary fingerprint for the given fingerprint or key id"
+        if not identifier:
+            return None
+        return self.get(identifier.upper())
+
+
+def build_index(ks: jce.KeyStore) -> Dict[str, str]:
+    "Returns the KeyIndex for all the keys in the keystore"
+    index = KeyIndex()
+    for key in ks.get_all_keys():
+        index.add_key(key)
+    return index
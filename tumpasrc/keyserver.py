@@ -0,0 +1,159 @@
+import ssl
+import json
+import time
+import queue
+import logging
+import contextlib
+import http.client
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORTS = {"hkp": 11371, "http": 80, "hkps": 443, "https": 443}
+# Status codes worth another try
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class KeyServerError(Exception):
+    "Raised when the keyserver refuses a key"
+
+
+class ConnectionPool:
+    "A pool of keep-alive HTTP(S) connections to a single host"
+
+    def __init__(self, url: str, timeout: int = 30):
+        parsed = urllib.parse.urlsplit(url)
+        if parsed.scheme not in DEFAULT_PORTS:
+            raise ValueError(f"Unsupported keyserver URL: {url}")
+        self.secure = parsed.scheme in ("hkps", "https")
+        self.host = parsed.hostname
+        self.port = parsed.port or DEFAULT_PORTS[parsed.scheme]
+        self.basepath = parsed.path.rstrip("/")
+        self.timeout = timeout
+        self._connections = queue.LifoQueue()
+
+    def _create(self) -> http.client.HTTPConnection:
+        if self.secure:
+            return http.client.HTTPSConnection(
+                self.host,
+                self.port,
+                timeout=self.timeout,
+                context=ssl.create_default_context(),
+            )
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    @contextlib.contextmanager
+    def connection(self):
+        "Gives an idle connection, which goes back to the pool if it is still usable"
+        try:
+            conn = self._connections.get_nowait()
+        except queue.Empty:
+            conn = self._create()
+        try:
+            yield conn
+        except Exception:
+            conn.close()
+            raise
+        self._connections.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._connections.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class KeyServer:
+    """
+    Publishes public keys to a HKP (/pks/add) or VKS (/vks/v1/upload)
+    keyserver, using at most `concurrency` parallel connections.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        protocol: str = "hkp",
+        concurrency: int = 4,
+        retries: int = 3,
+        backoff: float = 0.5,
+    ):
+        if protocol not in ("hkp", "vks"):
+            raise ValueError(f"Unsupported keyserver protocol: {protocol}")
+        self.protocol = protocol
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.pool = ConnectionPool(url)
+
+    def _request(self, public_key: str) -> Tuple[str, bytes, Dict[str, str]]:
+        if self.protocol == "vks":
+            body = json.dumps({"keytext": public_key}).encode("utf-8")
+            headers = {"Content-Type": "application/json"}
+            path = self.pool.basepath + "/vks/v1/upload"
+        else:
+            body = urllib.parse.urlencode({"keytext": public_key}).encode("utf-8")
+            headers = {"Content-Type": "application/x-www-form-urlencoded"}
+            path = self.pool.basepath + "/pks/add"
+        headers["Connection"] = "keep-alive"
+        return path, body, headers
+
+    def publish(self, public_key: str):
+        "Uploads one armored public key, retrying with exponential backoff"
+        path, body, headers = self._request(public_key)
+        for attempt in range(self.retries + 1):
+            try:
+                with self.pool.connection() as conn:
+                    conn.request("POST", path, body=body, headers=headers)
+                    response = conn.getresponse()
+                    # Read the full body so the connection can be reused
+                    data = response.read()
+                if 200 <= response.status < 300:
+                    return
+                if response.status not in RETRY_STATUS:
+                    raise KeyServerError(
+                        "{} {}: {}".format(
+                            response.status,
+                            response.reason,
+                            data.decode("utf-8", errors="replace")[:200],
+                        )
+                    )
+                error = KeyServerError(f"{response.status} {response.reason}")
+            except (OSError, http.client.HTTPException) as e:
+                error = e
+            if attempt < self.retries:
+                delay = self.backoff * (2 ** attempt)
+                logger.info("Retrying upload in %.1f s after: %s", delay, error)
+                time.sleep(delay)
+        raise error
+
+    def publish_keys(
+        self,
+        keys: List[Tuple[str, str]],
+        progress: Optional[Callable[[int, int, str, Optional[str]], None]] = None,
+    ) -> Dict[str, Optional[str]]:
+        """
+        Publishes the (fingerprint, armored public key) pairs. Returns the
+        error message for every fingerprint, None on success.
+        """
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {
+                executor.submit(self.publish, public_key): fingerprint
+                for fingerprint, public_key in keys
+            }
+            for future in as_completed(futures):
+                fingerprint = futures[future]
+                try:
+                    future.result()
+                    error = None
+                except Exception as e:
+                    error = str(e)
+                    logger.error("Failed to publish %s: %s", fingerprint, error)
+                results[fingerprint] = error
+                if progress:
+                    progress(len(results), len(keys), fingerprint, error)
+        self.pool.close()
+        return results
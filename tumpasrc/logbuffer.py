@@ -0,0 +1,69 @@
+import sys
+import logging
+import collections
+from typing import Optional
+
+LOGGER_NAME = "tumpasrc"
+# Number of records we keep in memory
+LOG_CAPACITY = 2000
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+
+class RingBufferHandler(logging.Handler):
+    """
+    Keeps the last records in a fixed size in-memory buffer. The records are
+    only formatted when the buffer gets dumped, so logging stays cheap on the
+    hot path and the memory use constant.
+    """
+
+    def __init__(self, capacity: int = LOG_CAPACITY):
+        super(RingBufferHandler, self).__init__()
+        self.records = collections.deque(maxlen=capacity)
+        self.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    def emit(self, record: logging.LogRecord):
+        if record.exc_info:
+            # Do not keep the traceback and its frames alive in the buffer
+            record.exc_text = self.formatter.formatException(record.exc_info)
+            record.exc_info = None
+        self.records.append(record)
+
+    def dump(self, path: str):
+        "Writes all the records in the buffer to the given file"
+        with open(path, "w") as fobj:
+            for record in list(self.records):
+                fobj.write(self.format(record) + "\n")
+
+
+_handler: Optional[RingBufferHandler] = None
+
+
+def get_handler() -> RingBufferHandler:
+    "Returns the ring buffer handler, attaching it to the tumpa logger first time"
+    global _handler
+    if _handler is None:
+        _handler = RingBufferHandler()
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.setLevel(logging.DEBUG)
+        logger.addHandler(_handler)
+        # Nothing should end up on the unbuffered terminal
+        logger.propagate = False
+    return _handler
+
+
+def install_crash_handler(path: str):
+    "Dumps the log buffer to the given path on any unhandled exception"
+    handler = get_handler()
+    previous = sys.excepthook
+
+    def excepthook(exctype, value, tb):
+        logging.getLogger(LOGGER_NAME).critical(
+            "Unhandled exception", exc_info=(exctype, value, tb)
+        )
+        try:
+            handler.dump(path)
+        except OSError:
+            pass
+        previous(exctype, value, tb)
+
+    sys.excepthook = excepthook
@@ -0,0 +1,405 @@
+import base64
+import hashlib
+import binascii
+from typing import Dict, Iterator, List, Optional, Tuple
+
+SIGNATURE_PACKET = 2
+PUBLIC_KEY_PACKET = 6
+SECRET_KEY_PACKET = 5
+SECRET_SUBKEY_PACKET = 7
+USER_ID_PACKET = 13
+PUBLIC_SUBKEY_PACKET = 14
+USER_ATTRIBUTE_PACKET = 17
+CREATION_TIME_SUBPACKET = 2
+EXPIRATION_TIME_SUBPACKET = 3
+ISSUER_SUBPACKET = 16
+KEY_FLAGS_SUBPACKET = 27
+REVOCATION_REASON_SUBPACKET = 29
+ISSUER_FINGERPRINT_SUBPACKET = 33
+# Subpacket types defined by RFC 9580, a critical one of any other type
+# makes the signature invalid
+KNOWN_SUBPACKETS = frozenset(
+    (2, 3, 4, 5, 6, 7, 9, 11, 12, 16, 20, 21, 22, 23, 24, 25, 26, 27, 28, 29)
+    + (30, 31, 32, 33, 34, 35, 37, 39)
+)
+
+# Generic, persona, casual and positive certifications of a user ID
+CERTIFICATION_TYPES = (0x10, 0x11, 0x12, 0x13)
+CERTIFICATION_REVOCATION = 0x30
+# Signatures over the primary key alone
+DIRECT_KEY_SIGNATURE = 0x1F
+KEY_REVOCATION = 0x20
+
+# Hash algorithms accepted for certifications, SHA1 and older are not
+HASH_ALGORITHMS = {
+    8: "sha256",
+    9: "sha384",
+    10: "sha512",
+    11: "sha224",
+    12: "sha3_256",
+    14: "sha3_512",
+}
+
+RSA_ALGORITHMS = (1, 2, 3)
+# Curve OIDs, hex encoded
+CURVES = {
+    "2B060104019755010501": "Cv25519",
+    "2B06010401DA470F01": "Ed25519",
+    "2A8648CE3D030107": "NIST P-256",
+    "2B81040022": "NIST P-384",
+    "2B81040023": "NIST P-521",
+}
+
+
+class PacketError(Exception):
+    "Raised when the OpenPGP data can not be parsed"
+
+
+def dearmor(data: bytes) -> bytes:
+    "Returns the binary OpenPGP data, the input can be armored or already binary"
+    stripped = data.lstrip()
+    if not stripped.startswith(b"-----BEGIN PGP"):
+        return data
+    lines = stripped.splitlines()
+    body = []
+    in_headers = True
+    for line in lines[1:]:
+        line = line.strip()
+        if line.startswith(b"-----END PGP"):
+            break
+        if in_headers:
+            # The armor headers end with an empty line
+            if not line:
+                in_headers = False
+            elif b":" not in line:
+                in_headers = False
+                body.append(line)
+            continue
+        if line.startswith(b"="):
+            # The CRC24 checksum
+            continue
+        body.append(line)
+    try:
+        return base64.b64decode(b"".join(body))
+    except binascii.Error as e:
+        raise PacketError(f"Invalid armored data: {e}")
+
+
+def _new_length(data: bytes, pos: int) -> Tuple[int, int]:
+    "Returns the new format length and the position after it"
+    first = data[pos]
+    if first < 192:
+        return first, pos + 1
+    if first < 224:
+        return ((first - 192) << 8) + data[pos + 1] + 192, pos + 2
+    if first == 255:
+        return int.from_bytes(data[pos + 1 : pos + 5], "big"), pos + 5
+    raise PacketError("Partial body lengths are not supported.")
+
+
+def iter_packets(data: bytes) -> Iterator[Tuple[int, bytes]]:
+    "Yields (tag, body) for every packet in the binary OpenPGP data"
+    pos = 0
+    try:
+        while pos < len(data):
+            header = data[pos]
+            if not header & 0x80:
+                raise PacketError("Invalid packet header.")
+            if header & 0x40:
+                tag = header & 0x3F
+                length, pos = _new_length(data, pos + 1)
+            else:
+                tag = (header >> 2) & 0x0F
+                lengthtype = header & 0x03
+                if lengthtype == 3:
+                    length = len(data) - pos - 1
+                    pos += 1
+                else:
+                    size = 1 << lengthtype
+                    length = int.from_bytes(data[pos + 1 : pos + 1 + size], "big")
+                    pos += 1 + size
+            if pos + length > len(data):
+                raise PacketError("Truncated packet.")
+            yield tag, data[pos : pos + length]
+            pos += length
+    except IndexError:
+        raise PacketError("Truncated packet.")
+
+
+def _subpackets(data: bytes) -> Iterator[Tuple[int, bool, bytes]]:
+    "Yields (type, critical, body) for every signature subpacket"
+    pos = 0
+    while pos < len(data):
+        length, pos = _new_length(data, pos)
+        if length == 0 or pos + length > len(data):
+            raise PacketError("Invalid signature subpacket.")
+        yield data[pos] & 0x7F, bool(data[pos] & 0x80), data[pos + 1 : pos + length]
+        pos += length
+
+
+def _subpacket_issuers(data: bytes) -> Iterator[str]:
+    for subtype, _, body in _subpackets(data):
+        if subtype == ISSUER_FINGERPRINT_SUBPACKET:
+            # First byte is the key version
+            yield body[1:].hex().upper()
+        elif subtype == ISSUER_SUBPACKET:
+            yield body.hex().upper()
+
+
+def _signature_type_and_issuers(body: bytes) -> Tuple[int, List[str]]:
+    "Returns the signature type and the issuers of a signature packet body"
+    version = body[0]
+    try:
+        if version == 3:
+            return body[2], [body[7:15].hex().upper()]
+        if version in (4, 5):
+            hashed = int.from_bytes(body[4:6], "big")
+            unhashed_pos = 6 + hashed
+            unhashed = int.from_bytes(body[unhashed_pos : unhashed_pos + 2], "big")
+            issuers = list(_subpacket_issuers(body[6:unhashed_pos]))
+            issuers.extend(
+                _subpacket_issuers(body[unhashed_pos + 2 : unhashed_pos + 2 + unhashed])
+            )
+            return body[1], issuers
+    except IndexError:
+        raise PacketError("Truncated signature packet.")
+    return -1, []
+
+
+def signature_issuers(data: bytes) -> List[str]:
+    """
+    Returns the issuer fingerprints and key ids found in the given signature
+    data, without doing any cryptographic verification.
+    """
+    issuers = []
+    for tag, body in iter_packets(dearmor(data)):
+        if tag != SIGNATURE_PACKET or not body:
+            continue
+        issuers.extend(_signature_type_and_issuers(body)[1])
+    return issuers
+
+
+def _mpis(data: bytes, pos: int, count: int) -> Tuple[List[bytes], int]:
+    "Returns count MPIs starting at pos and the position after them"
+    values = []
+    for _ in range(count):
+        size = (int.from_bytes(data[pos : pos + 2], "big") + 7) // 8
+        value = data[pos + 2 : pos + 2 + size]
+        if len(value) != size:
+            raise PacketError("Truncated MPI.")
+        values.append(value)
+        pos += 2 + size
+    return values, pos
+
+
+def _public_key_body(body: bytes) -> bytes:
+    "Returns the public part of a v4 public or secret key packet body"
+    algorithm = body[5]
+    pos = 6
+    if algorithm in RSA_ALGORITHMS:
+        _, pos = _mpis(body, pos, 2)
+    elif algorithm == 16:
+        _, pos = _mpis(body, pos, 3)
+    elif algorithm == 17:
+        _, pos = _mpis(body, pos, 4)
+    elif algorithm in (18, 19, 22):
+        pos += 1 + body[pos]
+        _, pos = _mpis(body, pos, 1)
+        if algorithm == 18:
+            # The KDF parameters
+            pos += 1 + body[pos]
+    elif algorithm in (25, 27):
+        pos += 32
+    elif algorithm == 26:
+        pos += 56
+    elif algorithm == 28:
+        pos += 57
+    else:
+        raise PacketError(f"Unknown public key algorithm {algorithm}.")
+    if pos > len(body):
+        raise PacketError("Truncated key packet.")
+    return body[:pos]
+
+
+def _signature(key: bytes, uid: bytes, body: bytes) -> Optional[dict]:
+    """
+    Parses a v4 signature over the primary key and the user ID (with its
+    hash prefix), or over the primary key alone when uid is empty. Only the
+    hashed area is used. Returns None for signatures which can not be
+    checked.
+    """
+    if body[0] != 4:
+        return None
+    algorithm = body[2]
+    hashname = HASH_ALGORITHMS.get(body[3])
+    if hashname is None:
+        return None
+    hashed_end = 6 + int.from_bytes(body[4:6], "big")
+    created = None
+    expires = None
+    issuer = None
+    flags = None
+    reason = None
+    for subtype, critical, value in _subpackets(body[6:hashed_end]):
+        if subtype == CREATION_TIME_SUBPACKET:
+            created = int.from_bytes(value, "big")
+        elif subtype == EXPIRATION_TIME_SUBPACKET:
+            expires = int.from_bytes(value, "big") or None
+        elif subtype == ISSUER_FINGERPRINT_SUBPACKET:
+            issuer = value[1:].hex().upper()
+        elif subtype == ISSUER_SUBPACKET:
+            issuer = issuer or value.hex().upper()
+        elif subtype == KEY_FLAGS_SUBPACKET:
+            flags = value[0] if value else 0
+        elif subtype == REVOCATION_REASON_SUBPACKET:
+            reason = value[0] if value else None
+        elif critical and subtype not in KNOWN_SUBPACKETS:
+            return None
+    if created is None or issuer is None:
+        return None
+
+    pos = hashed_end + 2 + int.from_bytes(body[hashed_end : hashed_end + 2], "big")
+    left16 = body[pos : pos + 2]
+    pos += 2
+    if algorithm in RSA_ALGORITHMS:
+        values, _ = _mpis(body, pos, 1)
+    elif algorithm == 22:
+        values, _ = _mpis(body, pos, 2)
+    elif algorithm == 27:
+        values = [body[pos : pos + 64]]
+        if len(values[0]) != 64:
+            raise PacketError("Truncated signature.")
+    else:
+        return None
+
+    digest = hashlib.new(hashname)
+    digest.update(b"\x99" + len(key).to_bytes(2, "big") + key)
+    digest.update(uid)
+    digest.update(body[:hashed_end])
+    digest.update(b"\x04\xff" + hashed_end.to_bytes(4, "big"))
+    digest = digest.digest()
+    if digest[:2] != left16:
+        return None
+    return {
+        "type": body[1],
+        "revocation": body[1] == CERTIFICATION_REVOCATION,
+        "issuer": issuer,
+        "created": created,
+        "expires": created + expires if expires else None,
+        "flags": flags,
+        "reason": reason,
+        "algorithm": algorithm,
+        "hash": hashname,
+        "digest": digest.hex(),
+        "signature": [value.hex() for value in values],
+    }
+
+
+def _signatures(data: bytes) -> Iterator[Tuple[Optional[str], dict]]:
+    """
+    Yields (user ID, signature) for the v4 certifications and certification
+    revocations on the user IDs and user attributes, and (None, signature)
+    for the direct key signatures and key revocations on the primary key.
+    """
+    key = None
+    uid = None
+    # Signatures after a subkey bind the subkey, they are not wanted
+    on_primary = False
+    for tag, body in iter_packets(dearmor(data)):
+        if not body:
+            continue
+        try:
+            if tag in (PUBLIC_KEY_PACKET, SECRET_KEY_PACKET):
+                if key is not None or body[0] != 4:
+                    return
+                key = _public_key_body(body)
+                uid = None
+                on_primary = True
+            elif tag == USER_ID_PACKET:
+                uid = (body.decode("utf-8", "replace"), b"\xb4", body)
+            elif tag == USER_ATTRIBUTE_PACKET:
+                name = "[attribute {}]".format(hashlib.sha256(body).hexdigest()[:16])
+                uid = (name, b"\xd1", body)
+            elif tag in (PUBLIC_SUBKEY_PACKET, SECRET_SUBKEY_PACKET):
+                uid = None
+                on_primary = False
+            elif tag == SIGNATURE_PACKET and key and uid:
+                if body[1] not in CERTIFICATION_TYPES + (CERTIFICATION_REVOCATION,):
+                    continue
+                name, prefix, uidbody = uid
+                signature = _signature(
+                    key, prefix + len(uidbody).to_bytes(4, "big") + uidbody, body
+                )
+                if signature is not None:
+                    yield name, signature
+            elif tag == SIGNATURE_PACKET and key and on_primary:
+                if body[1] not in (DIRECT_KEY_SIGNATURE, KEY_REVOCATION):
+                    continue
+                signature = _signature(key, b"", body)
+                if signature is not None:
+                    yield None, signature
+        except IndexError:
+            raise PacketError("Truncated packet.")
+
+
+def certifications(data: bytes) -> List[dict]:
+    """
+    Returns the v4 certifications and certification revocations on the user
+    IDs and user attributes of the given certificate, including the
+    self-signatures. The issuer comes from the hashed area only, and every
+    entry has the digest the issuer signed; verify them with
+    sigverify.verify_certification before trusting them.
+    """
+    found = []
+    for uid, signature in _signatures(data):
+        if uid is not None:
+            signature["uid"] = uid
+            found.append(signature)
+    return found
+
+
+def key_signatures(data: bytes) -> List[dict]:
+    """
+    Returns the v4 direct key signatures and key revocations on the primary
+    key of the given certificate, not verified either.
+    """
+    return [signature for uid, signature in _signatures(data) if uid is None]
+
+
+def public_keys(data: bytes) -> Dict[str, Tuple[int, List[bytes]]]:
+    """
+    Returns fingerprint -> (algorithm, key material) for the v4 primary key
+    and subkeys in the given certificate. The material is [n, e] for RSA and
+    the 32 byte public key for Ed25519, empty for other algorithms.
+    """
+    keys = {}
+    for tag, body in iter_packets(dearmor(data)):
+        if not body or body[0] != 4:
+            continue
+        if tag not in (
+            PUBLIC_KEY_PACKET,
+            PUBLIC_SUBKEY_PACKET,
+            SECRET_KEY_PACKET,
+            SECRET_SUBKEY_PACKET,
+        ):
+            continue
+        try:
+            body = _public_key_body(body)
+            algorithm = body[5]
+            material: List[bytes] = []
+            if algorithm in RSA_ALGORITHMS:
+                material, _ = _mpis(body, 6, 2)
+            elif algorithm == 22:
+                oid = body[7 : 7 + body[6]].hex().upper()
+                point, _ = _mpis(body, 7 + body[6], 1)
+                # Native point format, prefixed with 0x40
+                if CURVES.get(oid) == "Ed25519" and point[0][:1] == b"\x40":
+                    material = [point[0][1:]]
+            elif algorithm == 27:
+                material = [body[6:38]]
+        except IndexError:
+            raise PacketError("Truncated key packet.")
+        header = b"\x99" + len(body).to_bytes(2, "big")
+        keys[hashlib.sha1(header + body).hexdigest().upper()] = (algorithm, material)
+    return keys
+
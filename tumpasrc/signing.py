@@ -0,0 +1,60 @@
+import os
+import time
+from typing import Callable, Iterable, List, Optional
+
+import johnnycanencrypt.johnnycanencrypt as rjce
+
+SIGNATURE_EXTENSIONS = (".asc", ".sig")
+
+
+def collect_files(paths: Iterable[str]) -> List[str]:
+    "Returns all the files in the given paths, walking into the directories"
+    result = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                for name in sorted(filenames):
+                    if name.endswith(SIGNATURE_EXTENSIONS):
+                        continue
+                    result.append(os.path.join(dirpath, name))
+        elif os.path.isfile(path):
+            result.append(path)
+    return result
+
+
+def signature_path(path: str) -> str:
+    "Returns the path of the detached signature for the file"
+    return path + ".asc"
+
+
+def sign_files_on_card(
+    certdata: bytes,
+    filepaths: List[str],
+    pin: str,
+    progress: Optional[Callable[[int, str], None]] = None,
+) -> float:
+    """
+    Creates detached signatures as <file>.asc for all the given files using
+    the signing subkey on the smartcard. Returns the number of files signed
+    per second.
+
+    The files are signed one after the other, johnnycanencrypt streams each
+    file from the disk and verifies the pin with the card for every file.
+    We stop at the first error, so a wrong pin is tried only once against
+    the card.
+    """
+    pin_bytes = pin.encode("utf-8")
+    start = time.monotonic()
+    done = 0
+    for path in filepaths:
+        signature = rjce.sign_file_detached_on_card(
+            certdata, path.encode("utf-8"), pin_bytes
+        )
+        with open(signature_path(path), "w") as fobj:
+            fobj.write(signature)
+        done += 1
+        if progress:
+            progress(done, path)
+    elapsed = time.monotonic() - start
+    return done / elapsed if elapsed > 0 else float(done)
@@ -0,0 +1,68 @@
+from typing import List
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ed25519, padding, rsa, utils
+
+# Hash names from packets.HASH_ALGORITHMS
+HASHES = {
+    "sha224": hashes.SHA224,
+    "sha256": hashes.SHA256,
+    "sha384": hashes.SHA384,
+    "sha512": hashes.SHA512,
+    "sha3_256": hashes.SHA3_256,
+    "sha3_512": hashes.SHA3_512,
+}
+
+
+def verify_ed25519(public: bytes, message: bytes, signature: bytes) -> bool:
+    "Verifies an Ed25519 signature over the message"
+    try:
+        key = ed25519.Ed25519PublicKey.from_public_bytes(public)
+        key.verify(signature, message)
+    except (InvalidSignature, ValueError):
+        return False
+    return True
+
+
+def verify_rsa(
+    modulus: bytes, exponent: bytes, hashname: str, digest: bytes, signature: bytes
+) -> bool:
+    "Verifies an RSA PKCS#1 v1.5 signature over the digest"
+    algorithm = HASHES.get(hashname)
+    if algorithm is None:
+        return False
+    try:
+        key = rsa.RSAPublicNumbers(
+            int.from_bytes(exponent, "big"), int.from_bytes(modulus, "big")
+        ).public_key()
+        # The MPI drops the leading zero bytes of the signature
+        signature = signature.rjust((key.key_size + 7) // 8, b"\0")
+        key.verify(signature, digest, padding.PKCS1v15(), utils.Prehashed(algorithm()))
+    except (InvalidSignature, ValueError):
+        return False
+    return True
+
+
+def verify_certification(
+    certification: dict, algorithm: int, material: List[bytes]
+) -> bool:
+    """
+    Verifies a signature from packets.certifications or packets.key_signatures
+    with the public key material from packets.public_keys of the issuing key.
+    """
+    if certification["algorithm"] != algorithm or not material:
+        return False
+    digest = bytes.fromhex(certification["digest"])
+    values = [bytes.fromhex(value) for value in certification["signature"]]
+    if algorithm in (1, 3):
+        return verify_rsa(
+            material[0], material[1], certification["hash"], digest, values[0]
+        )
+    if algorithm == 22:
+        # EdDSA keeps the native encoding of R and S in the MPIs
+        signature = values[0].rjust(32, b"\0") + values[1].rjust(32, b"\0")
+        return verify_ed25519(material[0], digest, signature)
+    if algorithm == 27:
+        return verify_ed25519(material[0], digest, values[0])
+    return False
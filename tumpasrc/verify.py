@@ -0,0 +1,143 @@
+import os
+import sys
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import johnnycanencrypt as jce
+from tumpasrc.configuration import get_keystore_directory
+from tumpasrc.keyindex import build_index
+from tumpasrc.packets import signature_issuers
+
+SIGNATURE_EXTENSIONS = (".asc", ".sig")
+
+# Per worker process state, filled by _init_worker
+_keystore = None
+_index: Dict[str, str] = {}
+# fingerprint -> jce.Key, so that every certificate is parsed only once
+# in each worker process.
+_keycache: Dict[str, jce.Key] = {}
+
+
+def find_signed_files(paths: List[str]) -> List[Tuple[str, str]]:
+    "Returns (file, signature) pairs for every signature file found in the paths"
+    pairs = []
+    for path in paths:
+        if os.path.isfile(path):
+            candidates = [path]
+        else:
+            candidates = []
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                for name in sorted(filenames):
+                    candidates.append(os.path.join(dirpath, name))
+        for candidate in candidates:
+            if not candidate.endswith(SIGNATURE_EXTENSIONS):
+                continue
+            filepath = candidate[:-4]
+            if os.path.isfile(filepath):
+                pairs.append((filepath, candidate))
+    return pairs
+
+
+def _init_worker(keystore_path: str, index: Dict[str, str]):
+    global _keystore, _index
+    _keystore = jce.KeyStore(keystore_path)
+    _index = index
+    _keycache.clear()
+
+
+def _get_key(fingerprint: str) -> jce.Key:
+    key = _keycache.get(fingerprint)
+    if key is None:
+        key = _keystore.get_key(fingerprint)
+        _keycache[fingerprint] = key
+    return key
+
+
+def verify_pair(pair: Tuple[str, str]) -> dict:
+    "Verifies one (file, signature) pair, runs inside a worker process"
+    filepath, sigpath = pair
+    result = {"file": filepath, "signature": sigpath, "signer": None, "error": None}
+    try:
+        with open(sigpath, "rb") as fobj:
+            signature = fobj.read()
+        fingerprint = None
+        for issuer in signature_issuers(signature):
+            fingerprint = _index.get(issuer)
+            if fingerprint:
+                break
+        if fingerprint is None:
+            result["status"] = "unknown-key"
+            return result
+        result["signer"] = fingerprint
+        key = _get_key(fingerprint)
+        # False for a bad signature, unreadable data raises
+        if _keystore.verify_file_detached(key, filepath, sigpath):
+            result["status"] = "pass"
+        else:
+            result["status"] = "fail"
+    except (Exception, jce.CryptoError) as e:
+        # Not a bad signature, we could not check it at all
+        result["status"] = "error"
+        result["error"] = str(e)
+    return result
+
+
+def verify_files(
+    pairs: List[Tuple[str, str]],
+    keystore_path: str,
+    jobs: Optional[int] = None,
+) -> dict:
+    "Verifies all the pairs on a process pool and returns the report"
+    ks = jce.KeyStore(keystore_path)
+    index = build_index(ks)
+    jobs = jobs or os.cpu_count() or 1
+    chunksize = max(1, len(pairs) // (jobs * 4))
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=(keystore_path, index)
+    ) as executor:
+        results = list(executor.map(verify_pair, pairs, chunksize=chunksize))
+    statuses = [result["status"] for result in results]
+    return {
+        "total": len(results),
+        "passed": statuses.count("pass"),
+        "failed": statuses.count("fail"),
+        "errors": statuses.count("error"),
+        "unknown": statuses.count("unknown-key"),
+        "results": results,
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="tumpa-verify",
+        description="Verifies detached signatures (.asc or .sig) against the keys in the keystore.",
+    )
+    parser.add_argument("paths", nargs="+", help="Files or directories to verify.")
+    parser.add_argument(
+        "--keystore", help="Path to the keystore directory.", default=None
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None, help="Number of worker processes."
+    )
+    parser.add_argument(
+        "-o", "--output", default="-", help="Write the JSON report to this file."
+    )
+    options = parser.parse_args(args)
+
+    keystore_path = options.keystore or get_keystore_directory()
+    pairs = find_signed_files(options.paths)
+    report = verify_files(pairs, keystore_path, options.jobs)
+    if options.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(options.output, "w") as fobj:
+            json.dump(report, fobj, indent=2)
+    return 0 if report["passed"] == report["total"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
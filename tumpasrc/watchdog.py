@@ -0,0 +1,132 @@
+import os
+import sys
+import time
+import atexit
+import logging
+import datetime
+import threading
+import traceback
+import collections
+from typing import Optional
+
+from PySide2.QtCore import QObject, Signal, Qt
+
+# Set this to the threshold in milliseconds to enable the watchdog
+WATCHDOG_ENV = "TUMPA_WATCHDOG_MS"
+
+logger = logging.getLogger(__name__)
+
+
+class _Pinger(QObject):
+    "Lives in the GUI thread and answers the pings from the monitor thread"
+
+    ping = Signal()
+
+    def __init__(self, event: threading.Event):
+        super(_Pinger, self).__init__()
+        self.event = event
+        self.ping.connect(self.pong, Qt.QueuedConnection)
+
+    def pong(self):
+        self.event.set()
+
+
+class Watchdog:
+    """
+    Pings the Qt event loop from a monitor thread. Whenever the reply takes
+    longer than the threshold, the Python stack of the GUI thread and the
+    duration of the stall are recorded in a bounded log.
+
+    Must be created from the GUI thread.
+    """
+
+    def __init__(self, threshold_ms: int = 100, interval_ms: int = 50, maxlen=200):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        # (time of the stall, duration in seconds, stack of the GUI thread)
+        self.stalls = collections.deque(maxlen=maxlen)
+        self.total_stalls = 0
+        self.total_time = 0.0
+        self.longest = 0.0
+        self.gui_thread_id = threading.get_ident()
+        self._reply = threading.Event()
+        self._stop = threading.Event()
+        self._pinger = _Pinger(self._reply)
+        self._thread = threading.Thread(
+            target=self._run, name="tumpa-watchdog", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._reply.clear()
+            start = time.monotonic()
+            self._pinger.ping.emit()
+            if not self._reply.wait(self.threshold):
+                # The event loop is blocked, find out what the GUI thread is doing
+                frame = sys._current_frames().get(self.gui_thread_id)
+                stack = "".join(traceback.format_stack(frame)) if frame else ""
+                while not self._reply.wait(0.5):
+                    if self._stop.is_set():
+                        return
+                duration = time.monotonic() - start
+                self.stalls.append((datetime.datetime.now(), duration, stack))
+                self.total_stalls += 1
+                self.total_time += duration
+                self.longest = max(self.longest, duration)
+                logger.warning("Event loop stalled for %.0f ms", duration * 1000)
+            self._stop.wait(self.interval)
+
+    def summary(self) -> str:
+        "Returns the summary of the stalls, the worst stacks first"
+        lines = [
+            "Event loop stalls over {:.0f} ms: {}, total {:.2f} s, longest {:.0f} ms".format(
+                self.threshold * 1000,
+                self.total_stalls,
+                self.total_time,
+                self.longest * 1000,
+            )
+        ]
+        # Group the recorded stalls by the stack where the GUI thread was blocked
+        stacks = collections.defaultdict(list)
+        for _, duration, stack in self.stalls:
+            stacks[stack].append(duration)
+        worst = sorted(stacks.items(), key=lambda item: sum(item[1]), reverse=True)
+        for stack, durations in worst[:5]:
+            lines.append(
+                "\n{} stall(s), total {:.0f} ms, longest {:.0f} ms at:".format(
+                    len(durations), sum(durations) * 1000, max(durations) * 1000
+                )
+            )
+            lines.append(stack.rstrip())
+        return "\n".join(lines)
+
+    def report(self):
+        "Stops the watchdog and writes the summary to the log and stderr"
+        self.stop()
+        if self._thread.is_alive():
+            self._thread.join(1)
+        if self.total_stalls:
+            summary = self.summary()
+            logger.warning(summary)
+            sys.stderr.write(summary + "\n")
+
+
+def start_from_environment() -> Optional[Watchdog]:
+    "Starts the watchdog if TUMPA_WATCHDOG_MS is set, reports at exit"
+    value = os.environ.get(WATCHDOG_ENV)
+    if not value:
+        return None
+    try:
+        threshold = int(value)
+    except ValueError:
+        threshold = 100
+    watchdog = Watchdog(threshold)
+    watchdog.start()
+    atexit.register(watchdog.report)
+    return watchdog
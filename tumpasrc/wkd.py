@@ -0,0 +1,199 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+from typing import Dict, List
+
+import johnnycanencrypt as jce
+from tumpasrc.configuration import get_keystore_directory
+from tumpasrc.packets import dearmor
+
+ZBASE32_ALPHABET = "ybndrfg8ejkmcpqxot1uwisza345h769"
+# Old manifest name, inside the published tree
+MANIFEST_NAME = ".tumpa-manifest.json"
+
+
+def zbase32(data: bytes) -> str:
+    "Returns the z-base-32 encoding of the data"
+    bits = int.from_bytes(data, "big")
+    length = len(data) * 8
+    # Pad to a multiple of 5 bits
+    padding = (5 - length % 5) % 5
+    bits <<= padding
+    length += padding
+    result = []
+    for shift in range(length - 5, -1, -5):
+        result.append(ZBASE32_ALPHABET[(bits >> shift) & 0x1F])
+    return "".join(result)
+
+
+def wkd_hash(localpart: str) -> str:
+    "Returns the WKD hash for the local part of an email address"
+    return zbase32(hashlib.sha1(localpart.lower().encode("utf-8")).digest())
+
+
+def uid_email(uid: dict) -> str:
+    "Returns the email address of the UID, or an empty string"
+    email = uid.get("email") or ""
+    if not email:
+        value = uid.get("value", "")
+        if "<" in value and value.endswith(">"):
+            email = value[value.rindex("<") + 1 : -1]
+    return email.strip()
+
+
+def group_keys(keys: List[jce.Key], domain: str) -> Dict[str, List[jce.Key]]:
+    "Returns WKD hash -> keys for every UID on the domain"
+    domain = domain.lower()
+    groups: Dict[str, List[jce.Key]] = {}
+    for key in keys:
+        for uid in key.uids:
+            if uid.get("revoked"):
+                continue
+            email = uid_email(uid)
+            if "@" not in email:
+                continue
+            localpart, _, emaildomain = email.rpartition("@")
+            if emaildomain.lower() != domain:
+                continue
+            entry = groups.setdefault(wkd_hash(localpart), [])
+            if all(other.fingerprint != key.fingerprint for other in entry):
+                entry.append(key)
+    return groups
+
+
+def _write_atomic(path: str, data: bytes):
+    tmppath = path + ".tmp"
+    with open(tmppath, "wb") as fobj:
+        fobj.write(data)
+    os.replace(tmppath, path)
+
+
+def default_manifest_path(
+    keystore_path: str, output: str, domain: str, advanced: bool = False
+) -> str:
+    "Returns the manifest path in the keystore directory for this WKD tree"
+    tree = "{}|{}|{}".format(os.path.abspath(output), domain.lower(), advanced)
+    name = hashlib.sha256(tree.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(keystore_path, "wkd", f"{name}.json")
+
+
+def generate_wkd(
+    keys: List[jce.Key],
+    domain: str,
+    output: str,
+    manifest_path: str,
+    advanced: bool = False,
+) -> Dict[str, int]:
+    """
+    Creates or updates the WKD tree for the domain inside the output directory.
+    Only the entries whose keys changed since the last run are written again,
+    using the manifest of content hashes. The manifest lists the published
+    addresses, so it must be kept outside of the served directory.
+    Returns the number of written, removed and unchanged entries.
+    """
+    basedir = os.path.join(output, ".well-known", "openpgpkey")
+    if advanced:
+        basedir = os.path.join(basedir, domain.lower())
+    hudir = os.path.join(basedir, "hu")
+    os.makedirs(hudir, exist_ok=True)
+    policy = os.path.join(basedir, "policy")
+    if not os.path.exists(policy):
+        open(policy, "w").close()
+
+    old_manifest_path = os.path.join(basedir, MANIFEST_NAME)
+    manifest = {}
+    for path in (old_manifest_path, manifest_path):
+        try:
+            with open(path) as fobj:
+                manifest = json.load(fobj)
+            break
+        except (OSError, ValueError):
+            continue
+
+    # Hash every key only once, even if it has many UIDs on the domain
+    keydigests: Dict[str, str] = {}
+
+    def keydigest(key: jce.Key) -> str:
+        if key.fingerprint not in keydigests:
+            keydigests[key.fingerprint] = hashlib.sha256(key.keyvalue).hexdigest()
+        return keydigests[key.fingerprint]
+
+    stats = {"written": 0, "removed": 0, "unchanged": 0}
+    new_manifest = {}
+    for name, group in group_keys(keys, domain).items():
+        group.sort(key=lambda key: key.fingerprint)
+        digest = hashlib.sha256(
+            "".join(key.fingerprint + keydigest(key) for key in group).encode("utf-8")
+        ).hexdigest()
+        new_manifest[name] = digest
+        path = os.path.join(hudir, name)
+        if manifest.get(name) == digest and os.path.exists(path):
+            stats["unchanged"] += 1
+            continue
+        # Only now we pay for armoring and dearmoring the public keys
+        data = b"".join(dearmor(key.get_pub_key().encode("utf-8")) for key in group)
+        _write_atomic(path, data)
+        stats["written"] += 1
+
+    for name in manifest:
+        if name not in new_manifest:
+            try:
+                os.remove(os.path.join(hudir, name))
+            except FileNotFoundError:
+                pass
+            stats["removed"] += 1
+
+    os.makedirs(os.path.dirname(os.path.abspath(manifest_path)), exist_ok=True)
+    _write_atomic(
+        manifest_path, json.dumps(new_manifest, indent=2, sort_keys=True).encode()
+    )
+    # Stop publishing the manifest written by earlier versions
+    if os.path.exists(old_manifest_path):
+        os.remove(old_manifest_path)
+    return stats
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="tumpa-wkd",
+        description="Generates or updates the Web Key Directory for a domain from the keystore.",
+    )
+    parser.add_argument("output", help="Directory to create .well-known inside.")
+    parser.add_argument("-d", "--domain", required=True, help="The email domain.")
+    parser.add_argument(
+        "--advanced",
+        action="store_true",
+        help="Use the advanced method layout (openpgpkey/<domain>/hu).",
+    )
+    parser.add_argument(
+        "--manifest",
+        help="Where to keep the manifest, outside of the served directory.",
+        default=None,
+    )
+    parser.add_argument(
+        "--keystore", help="Path to the keystore directory.", default=None
+    )
+    options = parser.parse_args(args)
+
+    keystore_path = options.keystore or get_keystore_directory()
+    ks = jce.KeyStore(keystore_path)
+    manifest_path = options.manifest or default_manifest_path(
+        keystore_path, options.output, options.domain, options.advanced
+    )
+    stats = generate_wkd(
+        ks.get_all_keys(),
+        options.domain,
+        options.output,
+        manifest_path,
+        options.advanced,
+    )
+    print(
+        "{written} written, {removed} removed, {unchanged} unchanged.".format(**stats)
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
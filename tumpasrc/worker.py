@@ -0,0 +1,206 @@
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Reply kinds sent back from the worker process
+PROGRESS = "progress"
+DONE = "done"
+ERROR = "error"
+
+
+def _generate(ks, progress, password, uids, ciphersuite, expiration, whichkeys):
+    key = ks.create_key(
+        password,
+        uids,
+        ciphersuite=ciphersuite,
+        expiration=expiration,
+        subkeys_expiration=True,
+        whichkeys=whichkeys,
+    )
+    return key.fingerprint
+
+
+def _upload(ks, progress, fingerprint, adminpin, passphrase, whichkeys):
+    import johnnycanencrypt.johnnycanencrypt as rjce
+
+    key = ks.get_key(fingerprint)
+    rjce.upload_to_smartcard(
+        key.keyvalue, adminpin.encode("utf-8"), passphrase, whichkeys
+    )
+
+
+def _export(ks, progress, fingerprint):
+    return ks.get_key(fingerprint).get_pub_key()
+
+
+def _sign(ks, progress, fingerprint, filepaths, pin):
+    from tumpasrc.signing import sign_files_on_card
+
+    key = ks.get_key(fingerprint)
+    start = time.monotonic()
+
+    def report(count, path):
+        elapsed = time.monotonic() - start
+        progress((count, len(filepaths), count / elapsed if elapsed > 0 else 0.0))
+
+    return sign_files_on_card(key.keyvalue, filepaths, pin, report)
+
+
+def _certify(ks, progress, fingerprint, fingerprints, sig_type, pin):
+    from tumpasrc.certify import certify_and_commit
+
+    certifier = ks.get_key(fingerprint)
+    keys = [ks.get_key(otherfingerprint) for otherfingerprint in fingerprints]
+
+    def report(*value):
+        progress(value)
+
+    return certify_and_commit(
+        ks, certifier, keys, sig_type, pin, oncard=True, progress=report
+    )
+
+
+def _file_crypto(ks, progress, jobs, recipients=None, fingerprint=None, password=""):
+    """
+    Encrypts the files to the recipient fingerprints, or decrypts them with
+    the key of fingerprint. Reports ("started", input, output) and
+    ("finished", input, output, size, seconds) for every file.
+    """
+    keys = [ks.get_key(recipient) for recipient in recipients or []]
+    key = ks.get_key(fingerprint) if fingerprint else None
+    for inputpath, outputpath in jobs:
+        progress(("started", inputpath, outputpath))
+        start = time.monotonic()
+        try:
+            if keys:
+                # One pass over the file for all the recipients
+                ks.encrypt_file(keys, inputpath, outputpath, armor=False)
+            else:
+                ks.decrypt_file(key, inputpath, outputpath, password)
+        except Exception as e:
+            raise RuntimeError("{}: {}".format(inputpath, e)) from e
+        progress(
+            (
+                "finished",
+                inputpath,
+                outputpath,
+                os.path.getsize(inputpath),
+                time.monotonic() - start,
+            )
+        )
+
+
+def _extend_expiry(ks, progress, fingerprints, expiration, password):
+    from tumpasrc.expiry import commit_certificates, extend_expiry
+
+    keys = [ks.get_key(fingerprint) for fingerprint in fingerprints]
+    passwords = {fingerprint: password for fingerprint in fingerprints}
+
+    def report(count, total):
+        progress((count, total))
+
+    updated, errors = extend_expiry(keys, expiration, passwords, report)
+    # All the successful updates get written in one go at the end
+    commit_certificates(ks, updated)
+    return list(updated), errors
+
+
+def _integrity(ks, progress, cache_path):
+    import johnnycanencrypt as jce
+    from tumpasrc.integrity import check_keys
+
+    try:
+        keys = ks.get_all_keys()
+    except jce.KeyNotFoundError:
+        # Empty keystore
+        return {}
+    return check_keys(keys, cache_path)
+
+
+def _key_details(ks, progress, fingerprint):
+    from tumpasrc.keydetails import key_details
+
+    return key_details(ks.get_key(fingerprint))
+
+
+def _reset_card(ks, progress):
+    import johnnycanencrypt.johnnycanencrypt as rjce
+
+    rjce.reset_yubikey()
+
+
+def _change_user_pin(ks, progress, adminpin, userpin):
+    import johnnycanencrypt.johnnycanencrypt as rjce
+
+    rjce.change_user_pin(adminpin.encode("utf-8"), userpin.encode("utf-8"))
+
+
+def _change_admin_pin(ks, progress, adminpin, newadminpin):
+    import johnnycanencrypt.johnnycanencrypt as rjce
+
+    rjce.change_admin_pin(adminpin.encode("utf-8"), newadminpin.encode("utf-8"))
+
+
+def _set_card_url(ks, progress, url, adminpin):
+    import johnnycanencrypt.johnnycanencrypt as rjce
+
+    rjce.set_url(url.encode("utf-8"), adminpin.encode("utf-8"))
+
+
+def _set_card_name(ks, progress, name, adminpin):
+    import johnnycanencrypt.johnnycanencrypt as rjce
+
+    # If input is "First Middle Last",
+    # the name on the card should be "Last<<Middle<<First"
+    name = "<<".join(name.split()[::-1])
+    rjce.set_name(name.encode("utf-8"), adminpin.encode("utf-8"))
+
+
+HANDLERS = {
+    "generate": _generate,
+    "upload": _upload,
+    "export": _export,
+    "sign": _sign,
+    "certify": _certify,
+    "file_crypto": _file_crypto,
+    "extend_expiry": _extend_expiry,
+    "integrity": _integrity,
+    "key_details": _key_details,
+    "reset_card": _reset_card,
+    "change_user_pin": _change_user_pin,
+    "change_admin_pin": _change_admin_pin,
+    "set_card_url": _set_card_url,
+    "set_card_name": _set_card_name,
+}
+
+
+def serve(conn, keystore_path: str):
+    """
+    The loop running in the worker process. Every request is a tuple of
+    (request id, operation, keyword arguments), every reply a tuple of
+    (request id, kind, value) where kind is progress, done or error.
+    """
+    import johnnycanencrypt as jce
+
+    ks = jce.KeyStore(keystore_path)
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            # The GUI went away
+            return
+        if request is None:
+            return
+        request_id, operation, kwargs = request
+
+        def progress(value, request_id=request_id):
+            conn.send((request_id, PROGRESS, value))
+
+        try:
+            result = HANDLERS[operation](ks, progress, **kwargs)
+        except Exception as e:
+            conn.send((request_id, ERROR, str(e)))
+        else:
+            conn.send((request_id, DONE, result))
@@ -0,0 +1,523 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import johnnycanencrypt as jce
+import johnnycanencrypt.johnnycanencrypt as rjce
+from tumpasrc.configuration import get_keystore_directory
+from tumpasrc.keyindex import key_identifiers
+from tumpasrc.packets import (
+    KEY_REVOCATION,
+    PacketError,
+    certifications,
+    key_signatures,
+    public_keys,
+)
+from tumpasrc.sigverify import verify_certification
+
+CACHE_NAME = "wot.json"
+# Bumped when the cached records change
+CACHE_VERSION = 2
+# Key flag of keys which may certify other keys
+CERTIFY_FLAG = 0x01
+# Key superseded and key retired; the key stays valid for what it signed
+# before the revocation. Any other reason means it never was.
+SOFT_REVOCATION_REASONS = (1, 3)
+
+
+class TrustGraph:
+    """
+    Who certified whom across all the keys in the keystore. Every primary
+    fingerprint gets a small integer id, and the edges are kept as sets of
+    ids in both directions, so that a key can be updated without touching
+    the rest of the graph.
+
+    Certifications by keys which are not added yet are kept by their issuer
+    fingerprint or key id, and turn into edges when the certifying key gets
+    added.
+    """
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.fingerprints: List[str] = []
+        # certifier id -> ids of the keys it certified
+        self.certified: List[Set[int]] = []
+        # key id -> ids of its certifiers
+        self.certifiers: List[Set[int]] = []
+        # fingerprint or key id of the key -> primary fingerprint
+        self.identifiers: Dict[str, str] = {}
+        # unknown issuer -> ids of the keys it certified
+        self.unresolved: Dict[str, Set[int]] = {}
+        # key id -> its issuers, as found in the certificate
+        self.issuers: Dict[int, List[str]] = {}
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def _id(self, fingerprint: str) -> int:
+        if fingerprint not in self.ids:
+            self.ids[fingerprint] = len(self.fingerprints)
+            self.fingerprints.append(fingerprint)
+            self.certified.append(set())
+            self.certifiers.append(set())
+        return self.ids[fingerprint]
+
+    def _unlink(self, node: int):
+        "Removes all the certifications on the key"
+        for certifier in self.certifiers[node]:
+            self.certified[certifier].discard(node)
+        self.certifiers[node] = set()
+        for issuer in self.issuers.pop(node, []):
+            targets = self.unresolved.get(issuer)
+            if targets is not None:
+                targets.discard(node)
+                if not targets:
+                    del self.unresolved[issuer]
+
+    def update_key(
+        self, fingerprint: str, identifiers: Iterable[str], issuers: List[str]
+    ):
+        """
+        Adds the key or replaces its certifications, for a new, imported or
+        re-certified key. issuers are the fingerprints or key ids of all the
+        certifications on the key.
+        """
+        fingerprint = fingerprint.upper()
+        node = self._id(fingerprint)
+        self._unlink(node)
+        self.issuers[node] = issuers
+
+        # Other keys waiting for this key as their certifier
+        for identifier in identifiers:
+            identifier = identifier.upper()
+            self.identifiers[identifier] = fingerprint
+            for target in self.unresolved.pop(identifier, ()):
+                if target != node:
+                    self.certified[node].add(target)
+                    self.certifiers[target].add(node)
+
+        for issuer in issuers:
+            certifier = self.identifiers.get(issuer)
+            if certifier is None:
+                self.unresolved.setdefault(issuer, set()).add(node)
+                continue
+            certifier = self.ids[certifier]
+            # Self-signatures are not edges
+            if certifier != node:
+                self.certified[certifier].add(node)
+                self.certifiers[node].add(certifier)
+
+    def remove_key(self, fingerprint: str):
+        "Removes the key, the certifications on it and the ones it made"
+        fingerprint = fingerprint.upper()
+        node = self.ids.pop(fingerprint, None)
+        if node is None:
+            return
+        self._unlink(node)
+        for target in self.certified[node]:
+            self.certifiers[target].discard(node)
+        self.certified[node] = set()
+        self.identifiers = {
+            identifier: value
+            for identifier, value in self.identifiers.items()
+            if value != fingerprint
+        }
+
+    def shortest_path(self, source: str, target: str) -> Optional[List[str]]:
+        "Returns the shortest certification path from source to target, or None"
+        start = self.ids.get(source.upper())
+        goal = self.ids.get(target.upper())
+        if start is None or goal is None:
+            return None
+        parents = {start: start}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            if node == goal:
+                path = [node]
+                while path[-1] != start:
+                    path.append(parents[path[-1]])
+                return [self.fingerprints[node] for node in reversed(path)]
+            for neighbour in self.certified[node]:
+                if neighbour not in parents:
+                    parents[neighbour] = node
+                    queue.append(neighbour)
+        return None
+
+    def valid_keys(self, roots: Iterable[str], depth: int) -> Dict[str, int]:
+        """
+        Returns fingerprint -> distance for every key reachable from the root
+        keys over at most depth certifications. Every valid key is trusted
+        as an introducer, there are no trust amounts.
+        """
+        distances = {}
+        queue = deque()
+        for root in roots:
+            node = self.ids.get(root.upper())
+            if node is not None and node not in distances:
+                distances[node] = 0
+                queue.append(node)
+        while queue:
+            node = queue.popleft()
+            if distances[node] == depth:
+                continue
+            for neighbour in self.certified[node]:
+                if neighbour not in distances:
+                    distances[neighbour] = distances[node] + 1
+                    queue.append(neighbour)
+        return {
+            self.fingerprints[node]: distance for node, distance in distances.items()
+        }
+
+
+def _timestamp(value) -> Optional[int]:
+    return int(value.timestamp()) if value else None
+
+
+def _listed(parsed: dict) -> Set[Tuple[str, str, int]]:
+    """
+    Returns (user ID, issuer, creation time) for the third party
+    certifications johnnycanencrypt finds on the not revoked user IDs
+    """
+    listed = set()
+    for uid in parsed["uids"]:
+        if uid.get("revoked"):
+            continue
+        for certification in uid["certifications"]:
+            created = _timestamp(certification["creation"])
+            for _, issuer in certification["issuers"]:
+                listed.add((uid["userid"], issuer.upper(), created))
+    return listed
+
+
+def _signer_state(
+    fingerprint: str, parsed: dict, material: list, own: List[dict]
+) -> dict:
+    """
+    Returns what decides if the key could certify at a given time: its
+    creation and expiration, the certify key flag of its newest verified
+    self-signature, and the time from which it is revoked. A revocation
+    without a reason or for a compromised key counts from the creation of
+    the key, for a superseded or retired key from the revocation.
+    """
+    algorithm, values = material
+    values = [bytes.fromhex(value) for value in values]
+    mine = (fingerprint, fingerprint[-16:])
+    flags = None
+    flags_created = -1
+    revoked = None
+    for signature in own:
+        if signature["issuer"] not in mine or signature["revocation"]:
+            continue
+        if not verify_certification(signature, algorithm, values):
+            continue
+        if signature["type"] == KEY_REVOCATION:
+            if signature["reason"] in SOFT_REVOCATION_REASONS:
+                since = signature["created"]
+            else:
+                since = 0
+            revoked = since if revoked is None else min(revoked, since)
+        elif signature["flags"] is not None and signature["created"] > flags_created:
+            flags = signature["flags"]
+            flags_created = signature["created"]
+    return {
+        "created": _timestamp(parsed["creation"]) or 0,
+        "expires": _timestamp(parsed["expiration"]),
+        "certify": bool(flags is not None and flags & CERTIFY_FLAG),
+        "revoked": revoked,
+    }
+
+
+def _record(key: jce.Key, digest: str) -> dict:
+    """
+    Parses the certificate into what the graph needs: the identifiers of the
+    key, its public key material and signer state, and the certifications
+    on its user IDs. johnnycanencrypt decides which third party
+    certifications exist; the packets only add the signed digest and the
+    signature values to verify, and the certification revocations, which
+    johnnycanencrypt does not list.
+    """
+    fingerprint = key.fingerprint.upper()
+    record = {
+        "digest": digest,
+        "identifiers": list(key_identifiers(key)),
+        "material": [0, []],
+        "signer": {"created": 0, "expires": None, "certify": False, "revoked": None},
+        "certifications": [],
+        "certifiers": [],
+        "valid_until": None,
+    }
+    try:
+        parsed = rjce.exp_parse_cert_bytes(key.keyvalue)
+        found = certifications(key.keyvalue)
+        own = key_signatures(key.keyvalue)
+        algorithm, material = public_keys(key.keyvalue).get(fingerprint, (0, []))
+    except (jce.CryptoError, PacketError):
+        return record
+    record["material"] = [algorithm, [value.hex() for value in material]]
+    mine = (fingerprint, fingerprint[-16:])
+    record["signer"] = _signer_state(
+        fingerprint,
+        parsed,
+        record["material"],
+        own + [signature for signature in found if signature["issuer"] in mine],
+    )
+    listed = _listed(parsed)
+    record["certifications"] = [
+        certification
+        for certification in found
+        if certification["issuer"] not in mine
+        and (
+            certification["revocation"]
+            or (certification["uid"], certification["issuer"], certification["created"])
+            in listed
+        )
+    ]
+    return record
+
+
+class WebOfTrust:
+    """
+    The trust graph of a keystore together with the parsed certificates and
+    the verification results it was built from. A new, imported or
+    re-certified key only updates its own certifiers and the keys it
+    certified; the records are cached by the hash of every certificate, so
+    the next run only parses the keys which changed.
+
+    Only certifications by primary keys are accepted, and only if the
+    issuer had the certify key flag, existed, was not expired and was not
+    revoked at the time of the certification.
+    """
+
+    def __init__(self, cache_path: Optional[str] = None):
+        self.cache_path = cache_path
+        self.graph = TrustGraph()
+        # primary fingerprint -> record, see _record
+        self.records: Dict[str, dict] = {}
+        # primary fingerprint or key id -> primary fingerprint
+        self.signers: Dict[str, str] = {}
+        # issuer fingerprint or key id -> the keys with its certifications
+        self.targets: Dict[str, Set[str]] = {}
+        if cache_path:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_path) as fobj:
+                cache = json.load(fobj)
+        except (OSError, ValueError):
+            return
+        if cache.get("version") != CACHE_VERSION:
+            return
+        self.records = cache["records"]
+        for fingerprint, record in self.records.items():
+            self._index(fingerprint, record)
+        now = int(time.time())
+        for fingerprint, record in self.records.items():
+            if record["valid_until"] and record["valid_until"] <= now:
+                # A certification expired since the last run
+                self._link(fingerprint)
+            else:
+                self.graph.update_key(
+                    fingerprint, record["identifiers"], record["certifiers"]
+                )
+
+    def save(self):
+        if not self.cache_path:
+            return
+        tmppath = self.cache_path + ".tmp"
+        with open(tmppath, "w") as fobj:
+            json.dump({"version": CACHE_VERSION, "records": self.records}, fobj)
+        os.replace(tmppath, self.cache_path)
+
+    def _index(self, fingerprint: str, record: dict):
+        self.signers[fingerprint] = fingerprint
+        self.signers[fingerprint[-16:]] = fingerprint
+        for certification in record["certifications"]:
+            self.targets.setdefault(certification["issuer"], set()).add(fingerprint)
+
+    def _unindex(self, fingerprint: str, record: dict):
+        for identifier in (fingerprint, fingerprint[-16:]):
+            if self.signers.get(identifier) == fingerprint:
+                del self.signers[identifier]
+        for certification in record["certifications"]:
+            targets = self.targets.get(certification["issuer"])
+            if targets is not None:
+                targets.discard(fingerprint)
+                if not targets:
+                    del self.targets[certification["issuer"]]
+
+    def _issuer(self, certification: dict) -> Optional[str]:
+        "Returns the primary fingerprint of the issuer if the certification is valid"
+        signer = self.signers.get(certification["issuer"])
+        if signer is None:
+            return None
+        record = self.records[signer]
+        state = record["signer"]
+        created = certification["created"]
+        if not state["certify"] or created < state["created"]:
+            return None
+        if state["expires"] and created >= state["expires"]:
+            return None
+        if state["revoked"] is not None and created >= state["revoked"]:
+            return None
+        # The result only depends on the signature and the issuer's
+        # fingerprint, which covers its key material
+        verified = certification.setdefault("verified", {})
+        if signer not in verified:
+            algorithm, material = record["material"]
+            verified[signer] = verify_certification(
+                certification, algorithm, [bytes.fromhex(value) for value in material]
+            )
+        return signer if verified[signer] else None
+
+    def _link(self, fingerprint: str):
+        """
+        Finds the keys with a valid certification on any UID of the key and
+        updates its edges. Per issuer and UID the newest valid certification
+        or revocation wins, a revocation on the same second too.
+        """
+        record = self.records[fingerprint]
+        now = int(time.time())
+        latest: Dict[Tuple[str, str], Tuple[int, bool]] = {}
+        valid_until = None
+        for certification in record["certifications"]:
+            expires = certification["expires"]
+            if expires and expires <= now:
+                continue
+            issuer = self._issuer(certification)
+            if issuer is None or issuer == fingerprint:
+                continue
+            if expires:
+                valid_until = min(valid_until or expires, expires)
+            slot = (issuer, certification["uid"])
+            state = (certification["created"], certification["revocation"])
+            if slot not in latest or state > latest[slot]:
+                latest[slot] = state
+        record["certifiers"] = sorted(
+            {issuer for (issuer, _), (_, revoked) in latest.items() if not revoked}
+        )
+        record["valid_until"] = valid_until
+        self.graph.update_key(fingerprint, record["identifiers"], record["certifiers"])
+
+    def _relink_targets(self, fingerprint: str):
+        "Updates the keys certified by the key, after it changed or went away"
+        targets = self.targets.get(fingerprint, set()) | self.targets.get(
+            fingerprint[-16:], set()
+        )
+        for target in targets:
+            if target != fingerprint and target in self.records:
+                self._link(target)
+
+    def update_key(self, key: jce.Key):
+        "Adds a new, imported or re-certified key, unchanged keys are skipped"
+        fingerprint = key.fingerprint.upper()
+        digest = hashlib.sha256(key.keyvalue).hexdigest()
+        old = self.records.get(fingerprint)
+        if old is not None:
+            if old["digest"] == digest:
+                return
+            self._unindex(fingerprint, old)
+        record = _record(key, digest)
+        self.records[fingerprint] = record
+        self._index(fingerprint, record)
+        self._link(fingerprint)
+        # Its certifications on other keys may have become valid or invalid
+        self._relink_targets(fingerprint)
+
+    def remove_key(self, fingerprint: str):
+        "Removes a deleted key and the certifications it made"
+        fingerprint = fingerprint.upper()
+        record = self.records.pop(fingerprint, None)
+        if record is None:
+            return
+        self._unindex(fingerprint, record)
+        self.graph.remove_key(fingerprint)
+        self._relink_targets(fingerprint)
+
+    def sync(self, keys: List[jce.Key]):
+        "Brings the graph in line with all the keys of the keystore"
+        current = {key.fingerprint.upper() for key in keys}
+        for fingerprint in [fp for fp in self.records if fp not in current]:
+            self.remove_key(fingerprint)
+        for key in keys:
+            self.update_key(key)
+
+
+def build_graph(keys: List[jce.Key], cache_path: Optional[str] = None) -> TrustGraph:
+    """
+    Returns the graph of all the keys from the verified certifications. With
+    a cache path only new or changed keys get parsed and verified again.
+    """
+    web = WebOfTrust(cache_path)
+    web.sync(keys)
+    web.save()
+    return web.graph
+
+
+def update_graph(keystore_path: str, keys: List[jce.Key]) -> TrustGraph:
+    """
+    Updates the cached graph of the keystore for the given new, imported or
+    re-certified keys only, and returns it.
+    """
+    web = WebOfTrust(os.path.join(keystore_path, CACHE_NAME))
+    for key in keys:
+        web.update_key(key)
+    web.save()
+    return web.graph
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="tumpa-wot",
+        description="Certification paths and key validity in the keystore.",
+    )
+    parser.add_argument(
+        "--keystore", help="Path to the keystore directory.", default=None
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    path_parser = subparsers.add_parser(
+        "path", help="Shortest certification path between two keys."
+    )
+    path_parser.add_argument("source", help="Fingerprint of the starting key.")
+    path_parser.add_argument("target", help="Fingerprint of the key to reach.")
+    valid_parser = subparsers.add_parser(
+        "valid", help="Keys valid from the given keys within a trust depth."
+    )
+    valid_parser.add_argument(
+        "roots", nargs="+", help="Fingerprints of the fully trusted keys."
+    )
+    valid_parser.add_argument(
+        "-d", "--depth", type=int, default=1, help="Maximum trust depth."
+    )
+    options = parser.parse_args(args)
+
+    keystore_path = options.keystore or get_keystore_directory()
+    ks = jce.KeyStore(keystore_path)
+    try:
+        keys = ks.get_all_keys()
+    except jce.KeyNotFoundError:
+        keys = []
+    graph = build_graph(keys, os.path.join(keystore_path, CACHE_NAME))
+
+    if options.command == "path":
+        path = graph.shortest_path(options.source, options.target)
+        if path is None:
+            print("No certification path found.", file=sys.stderr)
+            return 1
+        print(" -> ".join(path))
+        return 0
+
+    valid = graph.valid_keys(options.roots, options.depth)
+    for fingerprint, distance in sorted(valid.items(), key=lambda item: item[1]):
+        print(f"{distance} {fingerprint}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())